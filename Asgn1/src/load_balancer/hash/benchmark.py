@@ -0,0 +1,47 @@
+# benchmark of batch lookups (find_many) against scalar lookups (find)
+# run from the service directory: python -m hash.benchmark
+
+
+import random
+import time
+
+from .hash_ds import ConsistentHashMap
+from .hash_functions import requestHashList, serverHashList
+
+
+N_SERVERS = 6
+SIZES = [10**3, 10**4, 10**5, 10**6]
+
+
+def lookupsPerSecond(lookup, request_ids: list[int]) -> float:
+    start = time.perf_counter()
+    lookup(request_ids)
+    return len(request_ids) / (time.perf_counter() - start)
+
+
+def main():
+    random.seed(0)
+
+    for hash_num in range(len(requestHashList)):
+        ds = ConsistentHashMap(request_hash=requestHashList[hash_num],
+                               server_hash=serverHashList[hash_num])
+        for server_idx in range(len(ds), N_SERVERS):
+            ds.add(f'Server-{server_idx + 1}')
+
+        print(f'Hash functions: Batch {hash_num}')
+        print(f'{"ids":>10} {"find (/s)":>14} {"find_many (/s)":>16} {"speedup":>9}')
+
+        for size in SIZES:
+            request_ids = [random.randint(100000, 999999) for _ in range(size)]
+
+            scalar = lookupsPerSecond(
+                lambda ids: [ds.find(request_id) for request_id in ids], request_ids)
+            batch = lookupsPerSecond(ds.find_many, request_ids)
+
+            print(f'{size:>10} {scalar:>14,.0f} {batch:>16,.0f} {batch / scalar:>8.1f}x')
+
+        print()
+
+
+if __name__ == '__main__':
+    main()
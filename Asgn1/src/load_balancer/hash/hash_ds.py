@@ -1,4 +1,9 @@
-from typing import Callable
+from typing import Callable, Iterable
+import math
+
+import numpy as np
+
+from .hash_functions import requestHashMany
 
 # consistent hashing data structure
 
@@ -13,15 +18,19 @@ class ConsistentHashMap:
         hostnames=None,
         n_slots: int = 512,
         n_virtual: int = 9,
-        probing: str = 'linear'
+        probing: str = 'linear',
+        epsilon: None | float = None
     ):
 
         # assign the hash functions
         self.requestHash = request_hash
+        self.requestHashMany = requestHashMany(request_hash)
         self.serverHash = server_hash
 
         # map: server-name -> server-index
         self.servers: dict[str, int] = {}
+        # map: server-name -> number of virtual copies, by capacity weight
+        self.copies: dict[str, int] = {}
 
         # slots
         self.slots: list[None | str] = [None] * n_slots
@@ -31,6 +40,20 @@ class ConsistentHashMap:
 
         # number of virtual copies to keep
         self.n_virtual = n_virtual
+
+        # bounded loads: a server takes at most ceil((1 + epsilon) * average load)
+        # requests in flight (times its weight), None to disable the bound
+        self.epsilon = epsilon
+        # map: server-name -> requests in flight
+        self.load: dict[str, int] = {}
+        # map: server-name -> capacity weight
+        self.weights: dict[str, float] = {}
+
+        # owner array for batch lookups, built on demand
+        # slot -> index into owner_names of the cyclically next server
+        self.owners: None | np.ndarray = None
+        self.owner_names: None | np.ndarray = None
+
         if hostnames is None:
             # default hostnames
             hostnames = ["Server-1", "Server-2", "Server-3"]
@@ -51,13 +74,18 @@ class ConsistentHashMap:
         return hashval + i
 
     # add a server (by hostname)
-    def add(self, hostname: str):
+    # the server gets n_virtual * weight virtual copies, at least one
+    def add(self, hostname: str, weight: float = 1):
         '''
-            If empty slots < n_virtual, cannot add new server: raise error
+            If weight is not positive: raise error
+            Else If empty slots < virtual copies, cannot add new server: raise error
             Else If server's hostname is present, cannot duplicate: raise error
             Else add all virtual copies of the server to the slots
         '''
-        if self.slots.count(None) < self.n_virtual:
+        if weight <= 0:
+            raise ValueError("Weight must be positive")
+        n_copies = max(1, round(self.n_virtual * weight))
+        if self.slots.count(None) < n_copies:
             raise IndexError("Insufficient slots to add new server")
         if hostname in self.servers.keys():
             raise KeyError("Hostname already present")
@@ -68,8 +96,11 @@ class ConsistentHashMap:
                 break
             server_idx += 1
         self.servers[hostname] = server_idx
+        self.copies[hostname] = n_copies
+        self.weights[hostname] = weight
+        self.owners = None
 
-        for virtual_idx in range(self.n_virtual):
+        for virtual_idx in range(n_copies):
             server_hash = (self.serverHash(
                 server_idx + 1, virtual_idx + 1)) % self.n_slots
             # Probe if there is collision
@@ -92,8 +123,10 @@ class ConsistentHashMap:
             raise KeyError("Hostname not found")
         server_idx = self.servers[hostname]
         self.servers.pop(hostname)
+        self.weights.pop(hostname)
+        self.owners = None
 
-        for virtual_idx in range(self.n_virtual):
+        for virtual_idx in range(self.copies.pop(hostname)):
             server_hash = (self.serverHash(
                 server_idx + 1, virtual_idx + 1)) % self.n_slots
             # Probing if there is collision
@@ -115,11 +148,72 @@ class ConsistentHashMap:
         if len(self.servers) == 0:
             raise KeyError("No servers alive")
         request_hash = (self.requestHash(request_id)) % self.n_slots
+        if self.epsilon is not None:
+            return self.findBounded(request_hash)
         # Here linear probing is required since nearest server is required
         while self.slots[request_hash] is None:
             request_hash = (request_hash + 1) % self.n_slots
         return self.slots[request_hash]
 
+    # walk clockwise from the slot to the first server below capacity
+    def findBounded(self, request_hash: int) -> str:
+        capacity = self.capacity()
+        for i in range(self.n_slots):
+            hostname = self.slots[(request_hash + i) % self.n_slots]
+            if hostname is not None and self.load.get(hostname, 0) < \
+                    math.ceil(capacity * self.weights[hostname]):
+                return hostname
+        # not reached: some server is always below the average load
+        raise KeyError("No servers alive")
+
+    # max number of requests in flight per unit weight a server may have to take one more
+    def capacity(self) -> float:
+        total = sum(self.load.get(hostname, 0) for hostname in self.servers)
+        return (1 + self.epsilon) * (total + 1) / sum(self.weights.values())
+
+    # count a request in flight to the server
+    def acquire(self, hostname: str):
+        self.load[hostname] = self.load.get(hostname, 0) + 1
+
+    # count a request to the server as done
+    def release(self, hostname: str):
+        if self.load.get(hostname, 0) > 0:
+            self.load[hostname] -= 1
+
+    # find the servers (by hostname) to which to route a batch of requests
+    # (bounded loads are not applied, since a batch has no requests in flight)
+    def find_many(self, request_ids: Iterable[int]) -> list[str]:
+        '''
+            If no server present, cannot map requests: raise error
+            Else, hash all the request ids at once and gather their
+            cyclically next servers from the owner array in one operation
+        '''
+        if len(self.servers) == 0:
+            raise KeyError("No servers alive")
+
+        request_ids = np.asarray(request_ids, dtype=np.int64)
+        request_hash = self.requestHashMany(request_ids, self.n_slots)
+
+        owners, owner_names = self.ownerArray()
+        return owner_names[owners[request_hash]].tolist()
+
+    # build the owner array from the slots, if outdated
+    def ownerArray(self) -> tuple[np.ndarray, np.ndarray]:
+        if self.owners is None:
+            hostnames = list(self.servers.keys())
+            index = {hostname: idx for idx, hostname in enumerate(hostnames)}
+            self.owners = np.zeros(self.n_slots, dtype=np.int32)
+            # walk the slots backwards twice, so that the owner wraps around
+            owner = None
+            for i in reversed(range(2 * self.n_slots)):
+                if self.slots[i % self.n_slots] is not None:
+                    owner = index[self.slots[i % self.n_slots]]
+                if owner is not None and i < self.n_slots:
+                    self.owners[i] = owner
+            self.owner_names = np.array(hostnames, dtype=object)
+
+        return self.owners, self.owner_names
+
     # get list of all hostnames of servers
     def getServerList(self):
         return list(self.servers.keys())
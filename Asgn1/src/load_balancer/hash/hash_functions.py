@@ -2,6 +2,9 @@
 
 
 import hashlib
+from typing import Callable
+
+import numpy as np
 
 
 '''
@@ -66,3 +69,53 @@ def serverHash3(i: int, j: int) -> int:
 # Lists to store the functions
 requestHashList = [requestHash1, requestHash2, requestHash3]
 serverHashList = [serverHash1, serverHash2, serverHash3]
+
+
+'''
+    Vectorized request hash functions
+    Note about vectorized hash functions:
+    Each one hashes an array of request ids at once and returns the slots,
+    i.e. the hash modulo n_slots, equal to those of the scalar function.
+    The polynomials are evaluated modulo n_slots at every step (Horner's rule),
+    so that int64 does not overflow for n_slots < 2^31.
+'''
+
+
+def polyHashMany(ids: np.ndarray, coeffs: tuple[int, ...], n_slots: int) -> np.ndarray:
+    ids = ids % n_slots
+    hash_arr = np.zeros(len(ids), dtype=np.int64)
+    for coeff in coeffs:
+        hash_arr = (hash_arr * ids + coeff % n_slots) % n_slots
+    return hash_arr
+
+
+def requestHash1Many(ids: np.ndarray, n_slots: int) -> np.ndarray:
+    return polyHashMany(ids, (1, 2, 17), n_slots)
+
+
+def requestHash2Many(ids: np.ndarray, n_slots: int) -> np.ndarray:
+    return polyHashMany(ids, (1427, 2503, 2003), n_slots)
+
+
+# SHA-256 cannot be vectorized, so the ids are hashed one at a time
+def requestHash3Many(ids: np.ndarray, n_slots: int) -> np.ndarray:
+    return np.fromiter((requestHash3(int(i)) % n_slots for i in ids),
+                       dtype=np.int64, count=len(ids))
+
+
+requestHashManyList = [requestHash1Many, requestHash2Many, requestHash3Many]
+
+
+# get the vectorized version of a request hash function
+def requestHashMany(
+    request_hash: Callable[[int], int]
+) -> Callable[[np.ndarray, int], np.ndarray]:
+    if request_hash in requestHashList:
+        return requestHashManyList[requestHashList.index(request_hash)]
+
+    # unknown hash function: hash the ids one at a time
+    def hashMany(ids: np.ndarray, n_slots: int) -> np.ndarray:
+        return np.fromiter((request_hash(int(i)) % n_slots for i in ids),
+                           dtype=np.int64, count=len(ids))
+
+    return hashMany
@@ -1,5 +1,6 @@
 import aiohttp
 import asyncio
+import math
 import os
 import random
 import sys
@@ -17,6 +18,8 @@ lock = FifoLock()
 
 DEBUG = os.environ.get('DEBUG', 'false').lower() == 'true'
 HASH_NUM = int(os.environ.get('HASH_NUM', 0))
+BOUNDED_LOAD = os.environ.get('BOUNDED_LOAD', 'false').lower() == 'true'
+LOAD_EPSILON = float(os.environ.get('LOAD_EPSILON', 0.25))
 
 ic.configureOutput(prefix='[LB] | ')
 
@@ -27,7 +30,8 @@ if not DEBUG:
 # List to store web server replica hostnames
 replicas = ConsistentHashMap(
     request_hash=requestHashList[HASH_NUM],
-    server_hash=serverHashList[HASH_NUM])
+    server_hash=serverHashList[HASH_NUM],
+    epsilon=LOAD_EPSILON if BOUNDED_LOAD else None)
 
 # Map to store heartbeat fail counts for each server replica.
 heartbeat_fail_count: dict[str, int] = {}
@@ -96,15 +100,20 @@ async def add():
         Return an error message.
     If `n > remaining slots`:
         Return an error message.
+    If some weight in `weights` is not positive or not of a hostname in `hostnames`:
+        Return an error message.
     If `hostname` in `hostnames` already exists in `replicas`:
         Do not add any replicas to the list.
         Return an error message.
 
     Random hostnames are generated using the `random_hostname()` function.
+    A server of weight `w` gets `w` times the virtual copies, and so `w` times
+    the requests, of a server of weight 1. Random hostnames get weight 1.
 
     `Request payload:`
         `n: number of servers to add`
         `hostnames: list of server replica hostnames to add (<= n) [optional]`
+        `weights: dict of hostname -> capacity weight [optional, default 1]`
 
     `Response payload:`
         `message:`
@@ -149,6 +158,18 @@ async def add():
         if len(hostnames) != len(set(hostnames)):
             raise Exception('Hostname list contains duplicates')
 
+        # Get the capacity weights of the servers
+        weights: dict[str, float] = {
+            hostname: float(weight)
+            for hostname, weight in dict(payload.get('weights', {})).items()}
+
+        if not set(weights.keys()).issubset(hostnames):
+            raise Exception(
+                f'Weights given for unknown hostnames `{set(weights.keys()) - set(hostnames)}`')
+
+        if any(weight <= 0 for weight in weights.values()):
+            raise Exception('Weights must be positive')
+
         # Generate `n - len(hostnames)` random hostnames
         new_hostnames: set[str] = set()
         while len(new_hostnames) < n - len(hostnames):
@@ -159,7 +180,10 @@ async def add():
 
         async with lock(Write):
             # Check is slots are available
-            if n > replicas.remaining():
+            # (a server of weight `w` takes at most the slots of `ceil(w)` servers)
+            n_slots = sum(math.ceil(weights.get(hostname, 1))
+                          for hostname in hostnames)
+            if n_slots > replicas.remaining():
                 raise Exception(
                     f'Insufficient slots. Only {replicas.remaining()} slots left')
 
@@ -241,7 +265,7 @@ async def add():
 
                 # Add the hostnames to the list
                 for hostname in hostnames:
-                    replicas.add(hostname)
+                    replicas.add(hostname, weights.get(hostname, 1))
 
                     # Edit the flatline map
                     heartbeat_fail_count[hostname] = 0
@@ -450,6 +474,9 @@ async def home():
     """
     Load balance the request to the server replicas.
 
+    If bounded loads are enabled, the request counts towards the load of
+    the server until the server answers.
+
     `Response payload:`
         `message: message from server`
         `status: status of the request`
@@ -471,6 +498,8 @@ async def home():
 
         async with lock(Read):
             server_name = replicas.find(request_id)
+            if server_name is not None and BOUNDED_LOAD:
+                replicas.acquire(server_name)
 
         if server_name is None:
             raise Exception('No servers are available')
@@ -492,12 +521,17 @@ async def home():
 
         # Convert to aiohttp request
         timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            tasks = [asyncio.create_task(wrapper(session, server_name))]
-            serv_response = await asyncio.gather(*tasks, return_exceptions=True)
-            serv_response = serv_response[0] if not isinstance(
-                serv_response[0], BaseException) else None
-        # END async with
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                tasks = [asyncio.create_task(wrapper(session, server_name))]
+                serv_response = await asyncio.gather(*tasks, return_exceptions=True)
+                serv_response = serv_response[0] if not isinstance(
+                    serv_response[0], BaseException) else None
+            # END async with
+        finally:
+            if BOUNDED_LOAD:
+                replicas.release(server_name)
+        # END try-finally
 
         if serv_response is None:
             raise Exception('Server did not respond')
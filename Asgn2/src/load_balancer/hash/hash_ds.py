@@ -1,8 +1,10 @@
-from typing import Callable
+from typing import Callable, Iterable
 import bisect
 
+import numpy as np
+
 from consts import HASH_NUM
-from .hash_functions import requestHashList, serverHashList
+from .hash_functions import requestHashList, requestHashMany, serverHashList
 
 # consistent hashing data structure
 
@@ -20,6 +22,7 @@ class ConsistentHashMap:
 
         # assign the hash functions
         self.requestHash = request_hash
+        self.requestHashMany = requestHashMany(request_hash)
         self.serverHash = server_hash
 
         # map: server-name -> server-id
@@ -39,6 +42,11 @@ class ConsistentHashMap:
         # number of virtual copies to keep
         self.n_virtual = n_virtual
 
+        # owner array for batch lookups, built on demand
+        # slot -> index into owner_names of the next server
+        self.owners: None | np.ndarray = None
+        self.owner_names: None | np.ndarray = None
+
     # length
     def __len__(self):
         return len(self.servers)
@@ -67,6 +75,7 @@ class ConsistentHashMap:
 
         self.servers[hostname] = hostid
         self.replicas[hostname] = []
+        self.owners = None
 
         for virtual_idx in range(self.n_virtual):
             server_hash = (self.serverHash(
@@ -103,6 +112,7 @@ class ConsistentHashMap:
             raise KeyError("Hostname not found")
         hostid = self.servers[hostname]
         self.servers.pop(hostname)
+        self.owners = None
 
         if (len(self.servers) == 0):
             self.next_server = [None] * self.n_slots
@@ -144,6 +154,35 @@ class ConsistentHashMap:
         # Here linear probing is necessary since nearest server is required
         return ret
 
+    # find the servers (by hostname) to which to route a batch of requests
+    # Time Complexity : O(len(request_ids)), vectorized
+    def find_many(self, request_ids: Iterable[int]) -> list[str]:
+        '''
+            If no server present, cannot map requests: raise error
+            Else, hash all the request ids at once and gather their
+            cyclically next servers from the owner array in one operation
+        '''
+        if len(self.servers) == 0:
+            raise RuntimeError("No servers alive")
+
+        request_ids = np.asarray(request_ids, dtype=np.int64)
+        request_hash = self.requestHashMany(request_ids, self.n_slots)
+
+        owners, owner_names = self.ownerArray()
+        return owner_names[owners[request_hash]].tolist()
+
+    # build the owner array from next_server, if outdated
+    # Time Complexity : O(n_slots)
+    def ownerArray(self) -> tuple[np.ndarray, np.ndarray]:
+        if self.owners is None:
+            hostnames = list(dict.fromkeys(self.next_server))
+            index = {hostname: idx for idx, hostname in enumerate(hostnames)}
+            self.owners = np.fromiter((index[hostname] for hostname in self.next_server),
+                                      dtype=np.int32, count=self.n_slots)
+            self.owner_names = np.array(hostnames, dtype=object)
+
+        return self.owners, self.owner_names
+
     # get list of all hostnames of servers
     def getServerList(self):
         return list(self.servers.keys())
@@ -1,16 +1,82 @@
+import json
+import os
+import sys
+
 from matplotlib import pyplot as plt
-import numpy as np
 
-d = [None]*5
+# plots of the results of the hash suite
+# generate the results from ./src/shard_manager: python -m hash.suite ../../plots/results.json
+# then run: python graphs.py [results.json]
+# results.json is committed --no-timings, so the plots of the timings are only
+# redrawn from a run with them [find, find-many, add and remove]
+
+here = os.path.dirname(os.path.abspath(__file__))
+path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(here, 'results.json')
+
+with open(path) as f:
+    suite = json.load(f)
+
+config = suite['config']
+results = suite['results']
+
+
+def series(hash_num: int, key: str):
+    rows = [r for r in results if r['hash_num'] == hash_num]
+    return [r['servers'] for r in rows], [r[key] for r in rows]
+
+
+def save(name: str):
+    plt.tight_layout()
+    plt.savefig(os.path.join(here, name))
+    plt.close()
+
+
+# load of each server for 3 servers, per hash function
+for hash_num in config['hash_nums']:
+    row = next(r for r in results if r['hash_num'] == hash_num and r['servers'] == 3)
+    plt.bar(range(1, 4), row['loads'])
+    plt.xticks(range(1, 4), [f'Server-{i}' for i in range(1, 4)])
+    plt.ylabel('requests')
+    plt.title(f'Load of 3 servers, hash {hash_num}')
+    save(f'plot-3-{hash_num}.jpg')
+
+# standard deviation of the load, per hash function
+for hash_num in config['hash_nums']:
+    plt.plot(*series(hash_num, 'load_std'))
+    plt.xlabel('servers')
+    plt.ylabel('standard deviation of the load')
+    plt.title(f'Hash {hash_num}, {config["requests"]} requests')
+    save(f'SD-{hash_num}.jpg')
+
+# the other metrics, all hash functions together
+metrics = [
+    ('max_mean', 'max / mean load', 'max-mean.jpg', False),
+    ('find_per_s', 'find (lookups/s)', 'find.jpg', True),
+    ('find_many_per_s', 'find_many (lookups/s)', 'find-many.jpg', True),
+    ('add_ms', 'add a server (ms)', 'add.jpg', False),
+    ('remove_ms', 'remove a server (ms)', 'remove.jpg', False),
+    ('moved_add', 'keys moved by adding a server', 'moved-add.jpg', False),
+    ('moved_remove', 'keys moved by removing a server', 'moved-remove.jpg', False),
+]
+
+for key, label, name, log in metrics:
+    if key not in results[0]:
+        print(f'{name}: no `{key}` in the results, not redrawn', file=sys.stderr)
+        continue
+
+    for hash_num in config['hash_nums']:
+        plt.plot(*series(hash_num, key), label=f'hash {hash_num}')
 
-d[0] = {0: 0, 1: 4566, 2: 5434}
-d[1] = {0: 0, 1: 2522, 2: 4354, 3: 3124}
-d[2] = {0: 0, 1: 2164, 2: 3662, 3: 2212, 4: 1962}
-d[3] = {0: 0, 1: 1461, 2: 2645, 3: 1963, 4: 1705, 5: 2226}
-d[4] = {0: 0, 1: 1177, 2: 1823, 3: 1259, 4: 1678, 5: 1927, 6: 2136} 
+    # a perfectly balanced ring moves 1/(N + 1) of the keys to a new server
+    # and 1/(N + 1) of the keys of a removed one
+    if key.startswith('moved'):
+        servers = config['servers']
+        plt.plot(servers, [1 / (n + 1) for n in servers], 'k--', label='ideal')
 
-x = [i for i in range(2, 7)]
-y = [np.std(list(d[i].values())[1:]) for i in range(5)]
+    if log:
+        plt.yscale('log')
 
-plt.plot(x, y)
-plt.savefig('SD-1.jpg')
\ No newline at end of file
+    plt.xlabel('servers')
+    plt.ylabel(label)
+    plt.legend()
+    save(name)
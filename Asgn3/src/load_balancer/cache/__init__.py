@@ -0,0 +1 @@
+from .read_cache import *
@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# LRU cache of per shard read results
+
+class ReadCache:
+
+    # constructor
+    def __init__(
+        self,
+        max_rows: int = 100000
+    ):
+
+        # max number of rows over all the cached results [0 disables the cache]
+        self.max_rows = max_rows
+
+        # map: (shard_id, valid_at, low, high) -> rows, least recently used first
+        self.entries: OrderedDict[Tuple[str, int, int, int],
+                                  List[Dict[str, Any]]] = OrderedDict()
+
+        # map: shard_id -> (valid_at, cached ranges) of the cached results
+        self.ranges: Dict[str, Tuple[int, List[Tuple[int, int]]]] = {}
+
+        # number of rows over all the cached results
+        self.n_rows = 0
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # length
+    def __len__(self):
+        return len(self.entries)
+
+    # get the rows of a shard with stud_id in [low, high] at valid_at
+    # Time Complexity : O(cached ranges of the shard + rows of the result)
+    def get(
+        self,
+        shard_id: str,
+        valid_at: int,
+        low: int,
+        high: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        '''
+            If the range is cached: return the cached rows
+            Else If a superset of the range is cached: return its rows within the range
+            Else: return None
+        '''
+        key = (shard_id, valid_at, low, high)
+
+        rows = self.entries.get(key)
+        if rows is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+        shard_ranges = self.ranges.get(shard_id)
+        if shard_ranges is not None and shard_ranges[0] == valid_at:
+            for cached_low, cached_high in shard_ranges[1]:
+                if cached_low <= low and high <= cached_high:
+                    cached_key = (shard_id, valid_at, cached_low, cached_high)
+                    self.entries.move_to_end(cached_key)
+                    self.hits += 1
+                    return [row for row in self.entries[cached_key]
+                            if low <= row["stud_id"] <= high]
+
+        self.misses += 1
+        return None
+
+    # cache the rows of a shard with stud_id in [low, high] at valid_at
+    # Time Complexity : O(evicted entries)
+    def put(
+        self,
+        shard_id: str,
+        valid_at: int,
+        low: int,
+        high: int,
+        rows: List[Dict[str, Any]]
+    ):
+        '''
+            If the cache is disabled, the result is larger than the cache,
+                or older than the cached valid_at: do not cache
+            If the shard was cached at an older valid_at: drop those results
+            Evict least recently used results until the rows fit
+        '''
+        if self.max_rows <= 0 or len(rows) > self.max_rows:
+            return
+
+        shard_ranges = self.ranges.get(shard_id)
+        if shard_ranges is not None:
+            if shard_ranges[0] > valid_at:
+                return
+            if shard_ranges[0] < valid_at:
+                for cached_low, cached_high in list(shard_ranges[1]):
+                    self._remove((shard_id, shard_ranges[0],
+                                  cached_low, cached_high))
+
+        key = (shard_id, valid_at, low, high)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+
+        while self.n_rows + len(rows) > self.max_rows:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+        self.entries[key] = rows
+        self.n_rows += len(rows)
+        self.ranges.setdefault(shard_id, (valid_at, []))[1].append((low, high))
+
+    # remove a cached result
+    def _remove(self, key: Tuple[str, int, int, int]):
+        rows = self.entries.pop(key)
+        self.n_rows -= len(rows)
+
+        shard_id, _, low, high = key
+        shard_ranges = self.ranges[shard_id][1]
+        shard_ranges.remove((low, high))
+        if len(shard_ranges) == 0:
+            del self.ranges[shard_id]
+
+    # get the counters of the cache
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'rows': self.n_rows,
+            'max_rows': self.max_rows,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import json
 import random
 import sys
+import time
+from array import array
+from collections import deque
 from typing import Any, Dict, List, Optional, Set, Tuple
 
 import aiohttp
@@ -10,13 +15,19 @@ import asyncpg
 from colorama import Fore, Style
 from icecream import ic
 
+from cache import ReadCache
 from consts import *
+from hash import ConsistentHashMap, ServerIds, newRouter
 
 
 # Postgres connection pool
 pool: asyncpg.Pool[asyncpg.Record]
 
 
+# Shared http session [created in `before_serving`]
+session: aiohttp.ClientSession
+
+
 # Configure icecream output
 ic.configureOutput(prefix='[LB] | ')
 
@@ -29,3 +40,53 @@ if not DEBUG:
 # seed random number generator in DEBUG mode
 if DEBUG:
     random.seed(RANDOM_SEED)
+
+
+# Local copy of the routing table of the shard manager
+# Shard Name to ConsistentHashMap
+shard_map: Dict[str, ConsistentHashMap] = {}
+
+
+# primary server for each shard
+shard_primary: Dict[str, str] = {}
+
+
+# Epoch of the local routing table [-1 if it needs to be fetched]
+epoch: int = -1
+
+
+# Lock to serialize routing table refreshes
+routing_lock = asyncio.Lock()
+
+
+# Interval index of ShardT sorted by stud_id_low
+# (stud_id_low array, shard_size array, shard_id list) [None if it needs to be loaded]
+shard_index: Optional[Tuple[array, array, List[str]]] = None
+
+
+# Bumped on every invalidation of the interval index
+shard_index_version: int = 0
+
+
+# Lock to serialize interval index loads
+shard_index_lock = asyncio.Lock()
+
+
+# Per shard read results, keyed by (shard_id, valid_at, low, high)
+read_cache = ReadCache(READ_CACHE_ROWS)
+
+
+# Exponentially weighted moving average of read latency of each server in seconds
+server_latency: Dict[str, float] = {}
+
+
+# Number of requests in flight to each server
+server_inflight: Dict[str, int] = {}
+
+
+# Recent read latencies in seconds, for the hedge delay
+read_latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+
+# Connection warm ups to the new owners of moved ranges still in flight [see `refresh_routing`]
+warmups: Set[asyncio.Task[None]] = set()
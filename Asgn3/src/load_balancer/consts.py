@@ -6,6 +6,49 @@ DEBUG = os.environ.get('DEBUG', 'false').lower() == 'true'
 # which hash function to use
 HASH_NUM = int(os.environ.get('HASH_NUM', 0))
 
+# router mapping requests to servers: 'ring', 'rendezvous' or 'jump'
+ROUTER = os.environ.get('ROUTER', 'ring').lower()
+
+# consistent hash ring [router 'ring']: 'dense' (512 slots) or 'sparse' (2^32 keyspace)
+RING_MODE = os.environ.get('RING_MODE', 'dense').lower()
+
+# number of virtual copies of each server on the sparse ring
+SPARSE_VIRTUAL = int(os.environ.get('SPARSE_VIRTUAL', 100))
+
+# if consistent hashing with bounded loads is enabled
+BOUNDED_LOAD = os.environ.get('BOUNDED_LOAD', 'false').lower() == 'true'
+
+# a server takes at most (1 + LOAD_EPSILON) times the average load
+LOAD_EPSILON = float(os.environ.get('LOAD_EPSILON', 0.25))
+
+# max number of cached request id -> slot entries of the SHA-256 hash function,
+# per ring configuration [0 disables the cache]
+SLOT_CACHE_SIZE = int(os.environ.get('SLOT_CACHE_SIZE', 2**16))
+
+# route with the local copy of the routing table instead of asking the shard manager
+LOCAL_ROUTING = os.environ.get('LOCAL_ROUTING', 'true').lower() == 'true'
+
+# number of shard streams a streamed read keeps open at once [the one being read and those prefetched]
+STREAM_WINDOW = max(1, int(os.environ.get('STREAM_WINDOW', 2)))
+
+# max number of rows in the read result cache [0 disables the cache]
+READ_CACHE_ROWS = int(os.environ.get('READ_CACHE_ROWS', 100000))
+
+# weight of the newest sample in the per server latency average
+EWMA_ALPHA = float(os.environ.get('EWMA_ALPHA', 0.3))
+
+# latency percentile after which a read is hedged to another replica [0 disables hedging]
+HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE', 95))
+
+# number of recent read latencies to take the percentile over
+LATENCY_WINDOW = int(os.environ.get('LATENCY_WINDOW', 1000))
+
+# number of read latencies needed before the percentile is used
+HEDGE_MIN_SAMPLES = int(os.environ.get('HEDGE_MIN_SAMPLES', 20))
+
+# hedge delay in seconds until there are enough read latencies
+HEDGE_DEFAULT_DELAY = float(os.environ.get('HEDGE_DEFAULT_DELAY', 0.1))
+
 # max number of consecutive heartbeat fails
 MAX_HEARTBEAT_FAIL_COUNT = 5
 
@@ -24,6 +67,19 @@ STOP_TIMEOUT = 5
 # timeout for requests in seconds
 REQUEST_TIMEOUT = 1
 
+# max number of open connections in the shared http session
+SESSION_LIMIT = int(os.environ.get('SESSION_LIMIT', 100))
+
+# max number of open connections to a single host in the shared http session [0 for no limit]
+# [requests over it wait for a free connection, without timing out]
+SESSION_LIMIT_PER_HOST = int(os.environ.get('SESSION_LIMIT_PER_HOST', 10))
+
+# time to cache resolved hostnames in seconds
+DNS_CACHE_TTL = int(os.environ.get('DNS_CACHE_TTL', 10))
+
+# time to keep idle connections alive in seconds
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', 30))
+
 # number of requests to send in a batch
 REQUEST_BATCH_SIZE = 20
 
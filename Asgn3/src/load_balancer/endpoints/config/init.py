@@ -1,6 +1,7 @@
 from quart import Blueprint, jsonify, request
 
-from utils import *
+from routing import *
+from shard_index import *
 
 blueprint = Blueprint('init', __name__)
 
@@ -21,6 +22,10 @@ async def init():
         Return an error message.
     If `n > remaining slots`:
         Return an error message.
+    If some weight in `weights` is not positive or not of a server in `servers`:
+        Return an error message.
+    If some shard has no slots left for its new servers by weight:
+        Return an error message.
     If some shard for some server in `servers` does not exist in `shards`:
         Return an error message.
 
@@ -31,6 +36,7 @@ async def init():
             `shard_id: name of the shard`
             `shard_size: size of the shard`
         `servers: dict of server hostname -> list of shard names to add [new shard names must be define in `shards`]`
+        `weights: dict of server hostname -> capacity weight [optional, default 1]`
 
     `Response payload:`
         `message:`
@@ -46,13 +52,19 @@ async def init():
     await asyncio.sleep(0)
 
     try:
-        timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(f'http://Shard-Manager:5000/init',
-                                    json=await request.get_json()) as response:
-                return (await response.content.read(),
-                        response.status,
-                        dict(response.headers))
+        session = common.session
+        async with session.post(f'http://Shard-Manager:5000/init',
+                                json=await request.get_json()) as response:
+            content = await response.content.read()
+
+        # The shard layout may have changed, fetch the routing table
+        # and load the shard index on next use
+        invalidate_routing()
+        invalidate_shard_index()
+
+        return (content,
+                response.status,
+                dict(response.headers))
 
     except Exception as e:
         return jsonify(ic(err_payload(e))), 400
@@ -1,6 +1,6 @@
 from quart import Blueprint, current_app, jsonify, request
 
-from utils import *
+from routing import *
 
 blueprint = Blueprint('rm', __name__)
 
@@ -37,6 +37,7 @@ async def rm():
         `message:`
             `N: number of replicas`
             `replicas: list of replica hostnames`
+            `moved: dict of shard name -> fraction of its ring that moved [ring routers only]`
         `status: status of the request`
 
     `Error payload:`
@@ -47,13 +48,17 @@ async def rm():
     await asyncio.sleep(0)
 
     try:
-        timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.delete(f'http://Shard-Manager:5000/rm',
-                                   json=await request.get_json()) as response:
-                return (await response.content.read(),
-                        response.status,
-                        dict(response.headers))
+        session = common.session
+        async with session.delete(f'http://Shard-Manager:5000/rm',
+                               json=await request.get_json()) as response:
+            content = await response.content.read()
+
+        # The shard layout may have changed, fetch the routing table on next use
+        invalidate_routing()
+
+        return (content,
+                response.status,
+                dict(response.headers))
 
     except Exception as e:
         return jsonify(ic(err_payload(e))), 400
@@ -20,13 +20,12 @@ async def status():
     await asyncio.sleep(0)
 
     try:
-        timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            # Get the list of replicas
-            async with session.get(f'http://Shard-Manager:5000/status') as response:
-                return (await response.content.read(),
-                        response.status,
-                        dict(response.headers))
+        session = common.session
+        # Get the list of replicas
+        async with session.get(f'http://Shard-Manager:5000/status') as response:
+            return (await response.content.read(),
+                    response.status,
+                    dict(response.headers))
 
     except Exception as e:
         return jsonify(ic(err_payload(e))), 400
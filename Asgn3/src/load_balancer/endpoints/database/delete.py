@@ -1,6 +1,7 @@
 from quart import Blueprint, jsonify, request
 
-from utils import *
+from routing import *
+from shard_index import *
 
 blueprint = Blueprint('delete', __name__)
 
@@ -29,30 +30,18 @@ async def delete():
 
     async def del_put_wrapper(
         session: aiohttp.ClientSession,
-        request_id: int,
         shard_id: str,
         json_payload: Dict
     ):
         # To allow other tasks to run
         await asyncio.sleep(0)
 
-        async with session.get(f'http://Shard-Manager:5000/get_primary',
-                               json={'request_id': request_id,
-                                     'shard': shard_id}) as response:
-            await response.read()
-
-        server_info = await response.json()
-        server_name = server_info.get('primary')
-        secondary = server_info.get('secondary')
-
-        json_payload["is_primary"] = True
-        json_payload["secondary_servers"] = secondary
-
-        async with session.delete(f'http://{server_name}:5000/del',
-                                  json=json_payload) as response:
-            await response.read()
-
-        return response
+        return await send_to_shard(session=session,
+                                   method='DELETE',
+                                   shard_id=shard_id,
+                                   endpoint='del',
+                                   json_payload=json_payload,
+                                   to_primary=True)
     # END del_put_wrapper
 
     try:
@@ -72,53 +61,51 @@ async def delete():
         if stud_id == -1:
             raise Exception('Payload does not contain `stud_id` field')
 
-        # Get the shard name containing the entry
+        # Get the shard name containing the entry from the shard index
+        index = await get_shard_index()
+        shard_id = find_shard(index, stud_id)
+
+        if shard_id is None:
+            raise Exception(f'stud_id {stud_id} does not exist')
 
         async with common.pool.acquire() as conn:
             async with conn.transaction():
-                record = await conn.fetchrow(
+                valid_at = await conn.fetchval(
                     '''--sql
                     SELECT
-                        shard_id,
                         valid_at
                     FROM
                         ShardT
                     WHERE
-                        (stud_id_low <= ($1::INTEGER)) AND
-                        (($1::INTEGER) < stud_id_low + shard_size)
+                        shard_id = ($1::TEXT)
                     FOR UPDATE;
                     ''',
-                    stud_id)
+                    shard_id)
 
-                if record is None:
+                if valid_at is None:
                     raise Exception(f'stud_id {stud_id} does not exist')
 
-                shard_id: str = record["shard_id"]
                 # new log to be inserted at valid_at + 1
-                shard_valid_at: int = record["valid_at"] + 1
+                shard_valid_at: int = valid_at + 1
 
                 # Convert to aiohttp request
-                timeout = aiohttp.ClientTimeout(
-                    connect=REQUEST_TIMEOUT)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    tasks = [asyncio.create_task(
-                        del_put_wrapper(
-                            session=session,
-                            request_id=get_request_id(),
-                            shard_id=shard_id,
-                            json_payload={
-                                "shard": shard_id,
-                                "stud_id": stud_id,
-                                "term": shard_valid_at
-                            }
-                        ))]
-
-                    serv_response = await asyncio.gather(*tasks, return_exceptions=True)
-                    serv_response = [None
-                                     if isinstance(r, BaseException)
-                                     else r for r in serv_response]
-                    serv_response = serv_response[0]
-                # END async with aiohttp.ClientSession
+                session = common.session
+                tasks = [asyncio.create_task(
+                    del_put_wrapper(
+                        session=session,
+                        shard_id=shard_id,
+                        json_payload={
+                            "shard": shard_id,
+                            "stud_id": stud_id,
+                            "term": shard_valid_at
+                        }
+                    ))]
+
+                serv_response = await asyncio.gather(*tasks, return_exceptions=True)
+                serv_response = [None
+                                 if isinstance(r, BaseException)
+                                 else r for r in serv_response]
+                serv_response = serv_response[0]
 
                 # If all replicas are not updated, then return an error
                 if serv_response is None or serv_response.status != 200:
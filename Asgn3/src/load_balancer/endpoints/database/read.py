@@ -1,6 +1,7 @@
-from quart import Blueprint, jsonify, request
+from quart import Blueprint, Response, jsonify, request
 
-from utils import *
+from routing import *
+from shard_index import *
 
 blueprint = Blueprint('read', __name__)
 
@@ -10,13 +11,25 @@ async def read():
     """
     Read data entries from shard replicas across all server containers.
 
+    The entries are returned in `stud_id` order.
+
     If `low` > `high`:
         Return an error message.
+    If `limit` is given:
+        Return at most `limit` entries, and a continuation token if there may be more.
+    If `token` is given:
+        Resume the read after the last entry of the previous page.
+    If `stream` is true:
+        Stream the entries as NDJSON, one entry per line,
+        followed by a last line with the continuation token and the status.
 
     `Request payload:`
         `stud_id: dict for range of student ids`
             `low: lower limit of student id`
             `high: upper limit of student id`
+        `limit: max number of entries to return [optional]`
+        `token: continuation token from the previous page [optional]`
+        `stream: stream the entries as NDJSON [optional]`
 
     `Response payload:`
         `shards_queried: list of shard names containing the required entries`
@@ -24,8 +37,13 @@ async def read():
             `stud_id: student id`
             `stud_name: student name`
             `stud_marks: student marks`
+        `next: continuation token for the next page [null if there are no more entries]`
         `status: status of the request`
 
+    `Stream payload:`
+        `{stud_id, stud_name, stud_marks}` per line
+        `{next, status}` on the last line [or `{message, status}` on failure]
+
     `Error payload:`
         `message: error message`
         `status: status of the request`
@@ -35,28 +53,150 @@ async def read():
 
     async def read_get_wrapper(
         session: aiohttp.ClientSession,
-        request_id: int,
         shard_id: str,
-        json_payload: Dict
+        target: Tuple[str, List[str], int],
+        json_payload: Dict,
+        stream: bool = False
     ):
 
         # To allow other tasks to run
         await asyncio.sleep(0)
 
-        async with session.get(f'http://Shard-Manager:5000/get_server',
-                               json={'request_id': request_id,
-                                     'shard': shard_id}) as response:
-            await response.read()
+        return await send_to_shard(session=session,
+                                   method='GET',
+                                   shard_id=shard_id,
+                                   endpoint='read',
+                                   json_payload=json_payload,
+                                   target=target,
+                                   stream=stream)
+    # END read_get_wrapper
 
-        server_name = await response.json()
-        server_name = server_name.get('server')
+    async def get_valid_ats(
+        conn: asyncpg.Connection,
+        range_shard_ids: List[str]
+    ):
+        # Lock the shards for the whole read, so that no write moves their terms
+        valid_ats: Dict[str, int] = {}
+
+        async for record in conn.cursor(
+            '''--sql
+            SELECT
+                shard_id,
+                valid_at
+            FROM
+                ShardT
+            WHERE
+                shard_id = ANY($1::TEXT[])
+            ORDER BY
+                shard_id
+            FOR SHARE;
+            ''',
+                range_shard_ids):
+
+            valid_ats[record["shard_id"]] = record["valid_at"]
+        # END async for record in conn.cursor
+
+        return valid_ats
+    # END get_valid_ats
+
+    def next_token(
+        n_rows: int,
+        last_stud_id: int
+    ):
+        # A full page may be followed by more entries
+        if limit is None or n_rows < limit or last_stud_id >= high:
+            return None
 
-        async with session.get(f'http://{server_name}:5000/read',
-                               json=json_payload) as response:
-            await response.read()
+        return encode_token(last_stud_id)
+    # END next_token
 
-        return response
-    # END read_get_wrapper
+    async def stream_read(
+        range_shard_ids: List[str]
+    ):
+        n_rows = 0
+        last_stud_id = low - 1
+        tasks = []
+
+        try:
+            async with common.pool.acquire() as conn:
+                async with conn.transaction():
+                    valid_ats = await get_valid_ats(conn, range_shard_ids)
+                    shard_ids = [shard_id for shard_id in range_shard_ids
+                                 if shard_id in valid_ats]
+
+                    session = common.session
+                    # Resolve the servers for all the shards at once
+                    targets = await resolve_shards(session, shard_ids)
+
+                    def open_stream(shard_id: str):
+                        return asyncio.create_task(
+                            read_get_wrapper(
+                                session=session,
+                                shard_id=shard_id,
+                                target=targets[shard_id],
+                                json_payload={
+                                    "shard": shard_id,
+                                    "stud_id": {"low": low, "high": high},
+                                    "term": valid_ats[shard_id],
+                                    "limit": limit,
+                                    "stream": True
+                                },
+                                stream=True
+                            )
+                        )
+                    # END open_stream
+
+                    # The shards hold disjoint ranges of stud_id, so the streams
+                    # merged in stud_id order are the streams one after the other.
+                    # Only the streams of the next `STREAM_WINDOW` shards are open at once,
+                    # as each holds a connection here and a database connection on its server
+                    for shard_idx, shard_id in enumerate(shard_ids):
+                        while len(tasks) < min(shard_idx + STREAM_WINDOW, len(shard_ids)):
+                            tasks.append(open_stream(shard_ids[len(tasks)]))
+
+                        r = await tasks[shard_idx]
+
+                        if r.status != 200:
+                            raise Exception('Failed to read data entry')
+
+                        async for line in r.content:
+                            if limit is not None and n_rows >= limit:
+                                break
+
+                            if len(line.strip()) == 0:
+                                continue
+
+                            yield line
+                            n_rows += 1
+                            last_stud_id = int(json.loads(line)["stud_id"])
+                        # END async for line in r.content
+
+                        r.release()
+
+                        if limit is not None and n_rows >= limit:
+                            break
+                    # END for shard_idx, shard_id in enumerate(shard_ids)
+                # END async with conn.transaction()
+            # END async with common.pool.acquire()
+
+            yield (json.dumps({
+                'next': next_token(n_rows, last_stud_id),
+                'status': 'success'
+            }) + '\n').encode()
+
+        except Exception as e:
+            yield (json.dumps(err_payload(e)) + '\n').encode()
+
+        finally:
+            # Close the streams that were not read till the end
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    task.result().release()
+            # END for task in tasks
+        # END try-except-finally
+    # END stream_read
 
     try:
         # Convert the reponse to json object
@@ -88,83 +228,117 @@ async def read():
         if low > high:
             raise Exception('`low` cannot be greater than `high`')
 
-        # Get the shard names and valid ats containing the entries
+        limit = payload.get('limit', None)
+        limit = None if limit is None else int(limit)
+
+        if limit is not None and limit <= 0:
+            raise Exception('`limit` must be positive')
+
+        stream = str(payload.get('stream', 'false')).lower() == 'true'
+
+        # Resume after the last entry of the previous page
+        token = payload.get('token', None)
+        if token is not None:
+            low = max(low, decode_token(str(token)) + 1)
+
+        # Get the shard names containing the entries from the shard index
+        index = await get_shard_index()
+        range_shard_ids = find_shards_in_range(index, low, high)
+
+        if len(range_shard_ids) == 0 and token is None:
+            raise Exception('No data entries found')
+
+        if stream:
+            return Response(stream_read(range_shard_ids), status=200,
+                            mimetype='application/x-ndjson')
+
+        # Get the shard names and valid ats of the shards
         shard_ids: List[str] = []
-        shard_valid_ats: List[int] = []
+        data: List[Dict[str, Any]] = []
 
         async with common.pool.acquire() as conn:
             async with conn.transaction():
-                async for record in conn.cursor(
-                    '''--sql
-                    SELECT
-                        shard_id,
-                        valid_at
-                    FROM
-                        ShardT
-                    WHERE
-                        (stud_id_low <= ($2::INTEGER)) AND
-                        (($1::INTEGER) < stud_id_low + shard_size)
-                    ORDER BY
-                        shard_id
-                    FOR SHARE;
-                    ''',
-                        low, high):
-
-                    shard_ids.append(record["shard_id"])
-                    shard_valid_ats.append(record["valid_at"])
-                # END async for record in conn.cursor
-
-                if len(shard_ids) == 0:
-                    raise Exception('No data entries found')
+                valid_ats = await get_valid_ats(conn, range_shard_ids)
 
-                data = []
-                tasks = []
+                # shard names in stud_id order
+                shard_ids = [shard_id for shard_id in range_shard_ids
+                             if shard_id in valid_ats]
 
-                # Convert to aiohttp request
-                timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    for shard_id, shard_valid_at in zip(shard_ids, shard_valid_ats):
-                        # if len(shard_map[shard_id]) == 0:
-                        #     continue
-
-                        # # TODO: Change to ConsistentHashMap
-                        # server_name = shard_map[shard_id].find(
-                        #     get_request_id())
+                if len(shard_ids) == 0 and token is None:
+                    raise Exception('No data entries found')
 
-                        tasks.append(asyncio.create_task(
-                            read_get_wrapper(
-                                session=session,
-                                request_id=get_request_id(),
-                                shard_id=shard_id,
-                                json_payload={
-                                    "shard": shard_id,
-                                    "stud_id": stud_id,
-                                    "term": shard_valid_at
-                                }
-                            )
-                        ))
-                    # END for shard_id, shard_valid_at in zip(shard_ids, shard_valid_ats)
+                # Serve the shards from the read cache where possible
+                # [shard_id] -> list of entries
+                shard_data: Dict[str, List[Dict[str, Any]]] = {}
+                missed: List[Tuple[str, int]] = []
+
+                for shard_id in shard_ids:
+                    rows = common.read_cache.get(shard_id, valid_ats[shard_id],
+                                                 low, high)
+                    if rows is None:
+                        missed.append((shard_id, valid_ats[shard_id]))
+                    else:
+                        shard_data[shard_id] = rows
+                # END for shard_id in shard_ids
+
+                if len(missed) > 0:
+                    # Convert to aiohttp request
+                    session = common.session
+                    # Resolve the servers for all the missed shards at once
+                    targets = await resolve_shards(
+                        session, [shard_id for shard_id, _ in missed])
+
+                    tasks = [asyncio.create_task(
+                        read_get_wrapper(
+                            session=session,
+                            shard_id=shard_id,
+                            target=targets[shard_id],
+                            json_payload={
+                                "shard": shard_id,
+                                "stud_id": {"low": low, "high": high},
+                                "term": shard_valid_at,
+                                "limit": limit
+                            }
+                        )
+                    ) for shard_id, shard_valid_at in missed]
 
                     serv_response = await asyncio.gather(*tasks, return_exceptions=True)
                     serv_response = [None if isinstance(r, BaseException)
                                      else r for r in serv_response]
-                # END async with aiohttp.ClientSession(timeout=timeout) as session
 
-                for r in serv_response:
-                    if r is None or r.status != 200:
-                        raise Exception('Failed to read data entry')
+                    for (shard_id, shard_valid_at), r in zip(missed, serv_response):
+                        if r is None or r.status != 200:
+                            raise Exception('Failed to read data entry')
 
-                    _r = dict(await r.json())
-                    data.extend(_r["data"])
-                # END for r in serv_response
+                        _r = dict(await r.json())
+                        shard_data[shard_id] = _r["data"]
+
+                        # Only cache complete results
+                        if limit is None or len(_r["data"]) < limit:
+                            common.read_cache.put(shard_id, shard_valid_at,
+                                                  low, high, _r["data"])
+                    # END for (shard_id, shard_valid_at), r in zip(missed, serv_response)
+                # END if len(missed) > 0
+
+                for shard_id in shard_ids:
+                    data.extend(shard_data[shard_id])
+
+                    if limit is not None and len(data) >= limit:
+                        break
+                # END for shard_id in shard_ids
 
             # END async with conn.transaction()
         # END async with common.pool.acquire()
 
+        if limit is not None:
+            data = data[:limit]
+
         # Return the response payload
         return jsonify(ic({
-            'shards_queried': shard_ids,
+            'shards_queried': sorted(shard_ids),
             'data': data,
+            'next': next_token(len(data),
+                               data[-1]["stud_id"] if len(data) > 0 else low - 1),
             'status': 'success'
         })), 200
 
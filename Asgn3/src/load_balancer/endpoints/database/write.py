@@ -1,6 +1,7 @@
 from quart import Blueprint, jsonify, request
 
-from utils import *
+from routing import *
+from shard_index import *
 
 blueprint = Blueprint('write', __name__)
 
@@ -23,36 +24,36 @@ async def write():
     `Error payload:`
         `message: error message`
         `status: status of the request`
+
+    `Partial failure payload:`
+        `message: error message with the number of data entries added`
+        `committed: list of shard names whose entries were added`
+        `failed: list of shard names whose entries were not added`
+        `status: status of the request`
     """
 
     await asyncio.sleep(0)
 
+    semaphore = asyncio.Semaphore(REQUEST_BATCH_SIZE)
+
     async def write_post_wrapper(
         session: aiohttp.ClientSession,
-        request_id: int,
         shard_id: str,
+        target: Tuple[str, List[str], int],
         json_payload: Dict
     ):
         # To allow other tasks to run
         await asyncio.sleep(0)
 
-        async with session.get(f'http://Shard-Manager:5000/get_primary',
-                               json={'request_id': request_id,
-                                     'shard': shard_id}) as response:
-            await response.read()
-
-        server_info = await response.json()
-        server_name = server_info.get('primary')
-        secondary = server_info.get('secondary')
-
-        json_payload["is_primary"] = True
-        json_payload["secondary_servers"] = secondary
-
-        async with session.post(f'http://{server_name}:5000/write',
-                                json=json_payload) as response:
-            await response.read()
-
-        return response
+        async with semaphore:
+            return await send_to_shard(session=session,
+                                       method='POST',
+                                       shard_id=shard_id,
+                                       endpoint='write',
+                                       json_payload=json_payload,
+                                       to_primary=True,
+                                       target=target)
+        # END async with semaphore
     # END write_post_wrapper
 
     try:
@@ -84,95 +85,113 @@ async def write():
         # [shard_id] -> (list of entries, valid_at)
         shard_data: Dict[str, Tuple[List[Dict[str, Any]], int]] = {}
 
+        # Classify all the entries in one pass over the shard index
+        index = await get_shard_index()
+        entry_shards = classify_stud_ids(index,
+                                         [int(entry["stud_id"]) for entry in data])
+
+        for entry, shard_id in zip(data, entry_shards):
+            if shard_id is None:
+                raise Exception(
+                    f'Shard for stud_id = {entry["stud_id"]} does not exist')
+
+            if shard_id not in shard_data:
+                shard_data[shard_id] = ([], 0)
+
+            shard_data[shard_id][0].append(entry)
+        # END for entry, shard_id in zip(data, entry_shards)
+
         async with common.pool.acquire() as conn:
             async with conn.transaction():
-                get_shard_id_stmt = await conn.prepare(
+                update_shard_info_stmt = await conn.prepare(
                     '''--sql
-                    SELECT
-                        shard_id
-                    FROM
+                    UPDATE
                         ShardT
+                    SET
+                        valid_at = ($1::INTEGER)
                     WHERE
-                        (stud_id_low <= ($1::INTEGER)) AND
-                        (($1::INTEGER) < stud_id_low + shard_size);
+                        shard_id = ($2::TEXT);
                     ''')
 
-                get_valid_at_stmt = await conn.prepare(
+                # Allocate the terms of all the shards at once
+                # To prevent deadlocks in the database, lock the rows in shard_id order
+                async for record in conn.cursor(
                     '''--sql
                     SELECT
+                        shard_id,
                         valid_at
                     FROM
                         ShardT
                     WHERE
-                        shard_id = $1::TEXT
+                        shard_id = ANY($1::TEXT[])
+                    ORDER BY
+                        shard_id
                     FOR UPDATE;
-                    ''')
-
-                update_shard_info_stmt = await conn.prepare(
-                    '''--sql
-                    UPDATE
-                        ShardT
-                    SET
-                        valid_at = ($1::INTEGER)
-                    WHERE
-                        shard_id = ($2::TEXT);
-                    ''')
-
-                for entry in data:
-                    stud_id = int(entry["stud_id"])
-                    record = await get_shard_id_stmt.fetchrow(stud_id)
-
-                    if record is None:
-                        raise Exception(
-                            f'Shard for {stud_id = } does not exist')
+                    ''',
+                        list(shard_data.keys())):
 
                     shard_id: str = record["shard_id"]
-
-                    if shard_id not in shard_data:
-                        shard_data[shard_id] = ([], 0)
-
-                    shard_data[shard_id][0].append(entry)
-                # END for entry in data
-
-                # To prevent deadlocks in the database, sort the shard_ids
-                for shard_id in sorted(shard_data.keys()):
-                    shard_valid_at: int = await get_valid_at_stmt.fetchval(shard_id) + 1
                     shard_data[shard_id] = (shard_data[shard_id][0],
-                                            shard_valid_at)
-
-                timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    for shard_id in shard_data:
-                        # Convert to aiohttp request
-                        tasks = [asyncio.create_task(
-                            write_post_wrapper(
-                                session=session,
-                                request_id=get_request_id(),
-                                shard_id=shard_id,
-                                json_payload={
-                                    "shard": shard_id,
-                                    "data": shard_data[shard_id][0],
-                                    "term": shard_data[shard_id][1],
-                                }
-                            )
-                        )]
-
-                        serv_response = await asyncio.gather(*tasks, return_exceptions=True)
-                        serv_response = [None if isinstance(r, BaseException)
-                                         else r for r in serv_response]
-                        serv_response = serv_response[0]
-
-                        # If all replicas are not updated, then return an error
-                        if serv_response is None or serv_response.status != 200:
-                            raise Exception('Failed to write all data entries')
-
-                        await update_shard_info_stmt.executemany(
-                            [(shard_data[shard_id][1], shard_id)])
-                    # END for shard_id in shard_data
-                # END async with aiohttp.ClientSession
+                                            record["valid_at"] + 1)
+                # END async for record in conn.cursor
+
+                shard_ids = list(shard_data.keys())
+
+                session = common.session
+                # Resolve the primaries for all the shards at once
+                targets = await resolve_shards(session,
+                                               shard_ids,
+                                               to_primary=True)
+
+                # Write to all the shards concurrently
+                tasks = [asyncio.create_task(
+                    write_post_wrapper(
+                        session=session,
+                        shard_id=shard_id,
+                        target=targets[shard_id],
+                        json_payload={
+                            "shard": shard_id,
+                            "data": shard_data[shard_id][0],
+                            "term": shard_data[shard_id][1],
+                        }
+                    )
+                ) for shard_id in shard_ids]
+
+                serv_response = await asyncio.gather(*tasks, return_exceptions=True)
+                serv_response = [None if isinstance(r, BaseException)
+                                 else r for r in serv_response]
+
+                # A shard is committed only if all its replicas are updated
+                committed: List[str] = []
+                failed: List[str] = []
+
+                for shard_id, r in zip(shard_ids, serv_response):
+                    if r is None or r.status != 200:
+                        failed.append(shard_id)
+                    else:
+                        committed.append(shard_id)
+                # END for shard_id, r in zip(shard_ids, serv_response)
+
+                # Advance the terms of the committed shards only
+                await update_shard_info_stmt.executemany(
+                    [(shard_data[shard_id][1], shard_id)
+                     for shard_id in committed])
             # END async with conn.transaction()
         # END async with common.pool.acquire() as conn
 
+        # If some shards are not updated, then report which ones are
+        if len(failed) > 0:
+            n_added = sum(len(shard_data[shard_id][0])
+                          for shard_id in committed)
+
+            return jsonify(ic({
+                'message': f"Failed to write all data entries, "
+                           f"{n_added}/{len(data)} data entries added",
+                'committed': sorted(committed),
+                'failed': sorted(failed),
+                'status': 'failure'
+            })), 400
+
         # Return the response payload
         return jsonify(ic({
             'message': f"{len(data)} data entries added",
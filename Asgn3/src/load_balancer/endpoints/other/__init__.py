@@ -1,10 +1,14 @@
 from quart import Blueprint
 
 from .catch_all import blueprint as catch_all_blueprint
+from .connections import blueprint as connections_blueprint
 from .home import blueprint as home_blueprint
+from .read_cache import blueprint as read_cache_blueprint
 
 blueprint = Blueprint('other', __name__)
 
 # Register the blueprints
 blueprint.register_blueprint(catch_all_blueprint)
+blueprint.register_blueprint(connections_blueprint)
 blueprint.register_blueprint(home_blueprint)
+blueprint.register_blueprint(read_cache_blueprint)
@@ -0,0 +1,30 @@
+from quart import Blueprint, jsonify
+
+from utils import *
+
+blueprint = Blueprint('connections', __name__)
+
+
+@blueprint.route('/connections', methods=['GET'])
+async def connections():
+    """
+    Return the connection stats of the shared http session.
+
+    `Response Payload`
+        `limit`: int
+        `limit_per_host`: int
+        `closed`: bool
+        `acquired`: int [connections held by requests]
+        `queued`: int [requests waiting for a free connection]
+        `created`: int [connections opened in total]
+        `reused`: int [keep-alive connections reused in total]
+    """
+
+    await asyncio.sleep(0)
+
+    try:
+        return jsonify(ic(session_stats())), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
+# END connections
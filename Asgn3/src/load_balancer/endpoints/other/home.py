@@ -1,4 +1,4 @@
-from quart import Blueprint, jsonify
+from quart import Blueprint, current_app, jsonify
 
 from utils import *
 
@@ -10,6 +10,9 @@ async def home():
     """
     Load balance the request to the server replicas.
 
+    If the shard manager counted the request towards the load of the server
+    [bounded loads], the request is released once the server has answered.
+
     `Response payload:`
         `message: message from server`
         `status: status of the request`
@@ -31,17 +34,16 @@ async def home():
 
         # server_name = replicas.find(request_id)
 
-        timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(f'http://Shard-Manager:5000/get_server',
-                                   json={'request_id': request_id}) as response:
-                await response.read()
+        session = common.session
+        async with session.get(f'http://Shard-Manager:5000/get_server',
+                               json={'request_id': request_id}) as response:
+            await response.read()
 
         if response.status != 200:
             raise Exception('No servers are available')
 
-        server_name = await response.json()
-        server_name = server_name.get('server_name')
+        server_info = dict(await response.json())
+        server_name = server_info.get('server')
 
         if server_name is None:
             raise Exception('No servers are available')
@@ -50,6 +52,18 @@ async def home():
 
         ic(server_name)
 
+        async def release_server_wrapper(
+            session: aiohttp.ClientSession,
+            server_name: str
+        ):
+            # To allow other tasks to run
+            await asyncio.sleep(0)
+
+            async with session.post('http://Shard-Manager:5000/release_server',
+                                    json={'server': server_name}) as response:
+                await response.read()
+        # END release_server_wrapper
+
         async def get_home_wrapper(
             session: aiohttp.ClientSession,
             server_name: str
@@ -64,19 +78,23 @@ async def home():
         # END get_home_wrapper
 
         # Convert to aiohttp request
-        timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            task = asyncio.create_task(
-                get_home_wrapper(
-                    session,
-                    server_name
-                )
+        session = common.session
+        task = asyncio.create_task(
+            get_home_wrapper(
+                session,
+                server_name
             )
+        )
+
+        serv_response = await asyncio.gather(*[task], return_exceptions=True)
+        serv_response = serv_response[0] if not isinstance(
+            serv_response[0], BaseException) else None
 
-            serv_response = await asyncio.gather(*[task], return_exceptions=True)
-            serv_response = serv_response[0] if not isinstance(
-                serv_response[0], BaseException) else None
-        # END async with
+        if server_info.get('acquired', False):
+            # The server has answered, release without delaying the response
+            current_app.add_background_task(release_server_wrapper,
+                                            common.session,
+                                            server_name)
 
         if serv_response is None:
             raise Exception('Server did not respond')
@@ -0,0 +1,29 @@
+from quart import Blueprint, jsonify
+
+from utils import *
+
+blueprint = Blueprint('read_cache', __name__)
+
+
+@blueprint.route('/read_cache', methods=['GET'])
+async def read_cache():
+    """
+    Return the counters of the read result cache.
+
+    `Response Payload`
+        `entries`: int
+        `rows`: int
+        `max_rows`: int
+        `hits`: int
+        `misses`: int
+        `evictions`: int
+    """
+
+    await asyncio.sleep(0)
+
+    try:
+        return jsonify(ic(common.read_cache.stats())), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
+# END read_cache
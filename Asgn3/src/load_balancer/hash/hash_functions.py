@@ -0,0 +1,241 @@
+# hash functions for request and server in 4 pairs
+
+
+import functools
+import hashlib
+from typing import Callable
+
+import numpy as np
+
+
+'''
+    Hash functions: Batch 0
+    Note about hash functions: 
+    As provided in problem statement
+'''
+
+
+def requestHash1(i: int) -> int:
+    hash_int = i*i + 2*i + 17
+    return hash_int
+
+
+def serverHash1(i: int, j: int) -> int:
+    hash_int = i*i + j*j + 2*j + 25
+    return hash_int
+
+
+'''
+    Hash functions: Batch 1
+    Note about hash functions: 
+    The coefficients are - 
+        1) Large : To cover the whole slot-space nearly uniformly with larger distance b/w virtual copies
+        2) Prime : So finally taking modulo by any slot size does not reduce randomness
+'''
+
+
+def requestHash2(i: int) -> int:
+    hash_int = 1427*i*i + 2503*i + 2003
+    return hash_int
+
+
+def serverHash2(i: int, j: int) -> int:
+    hash_int = 1249*i*i + 2287*j*j + 1663*j + 2287
+    return hash_int
+
+
+'''
+    Hash functions: Batch 2
+    Note about hash functions: 
+    Popular cryptographic hash algorithm SHA-256 has been used
+'''
+
+
+def requestHash3(i: int) -> int:
+    hash_int = i*i + 2*i + 17
+    length = (hash_int.bit_length() + 7) // 8
+    hash_bytes = hashlib.sha256(hash_int.to_bytes(length, 'big')).digest()
+    hash_int = int.from_bytes(hash_bytes, 'big')
+    return hash_int
+
+
+def serverHash3(i: int, j: int) -> int:
+    hash_int = i*i + j*j + 2*j + 25
+    length = (hash_int.bit_length() + 7) // 8
+    hash_bytes = hashlib.sha256(hash_int.to_bytes(length, 'big')).digest()
+    hash_int = int.from_bytes(hash_bytes, 'big')
+    return hash_int
+
+
+'''
+    64-bit mixing function (splitmix64 finalizer)
+    Note about the mixing function:
+    Used to spread request ids and server ids uniformly over 64 bits for the
+    routers that need uniform keys (rendezvous and jump hashing), where the
+    polynomial hash functions are too regular.
+'''
+
+MASK64 = (1 << 64) - 1
+
+
+def mix64(x: int) -> int:
+    x &= MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def mix64Many(x: np.ndarray) -> np.ndarray:
+    x = x.astype(np.uint64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+'''
+    Hash functions: Batch 3
+    Note about hash functions:
+    The splitmix64 finalizer, a bijection of 64-bit integers where every input
+    bit flips every output bit with probability close to 1/2. It spreads the ids
+    as uniformly as SHA-256 over any number of slots, without the conversions
+    to bytes and back, and is vectorized in NumPy.
+'''
+
+
+def requestHash4(i: int) -> int:
+    hash_int = mix64(i)
+    return hash_int
+
+
+def serverHash4(i: int, j: int) -> int:
+    hash_int = mix64(mix64(i) + j)
+    return hash_int
+
+
+# Lists to store the functions
+requestHashList = [requestHash1, requestHash2, requestHash3, requestHash4]
+serverHashList = [serverHash1, serverHash2, serverHash3, serverHash4]
+
+
+'''
+    Vectorized request hash functions
+    Note about vectorized hash functions:
+    Each one hashes an array of request ids at once and returns the slots,
+    i.e. the hash modulo n_slots, equal to those of the scalar function.
+    The polynomials are evaluated modulo n_slots at every step (Horner's rule)
+    in uint64, so that nothing overflows for n_slots <= 2^32.
+'''
+
+
+def polyHashMany(ids: np.ndarray, coeffs: tuple[int, ...], n_slots: int) -> np.ndarray:
+    ids = (ids % n_slots).astype(np.uint64)
+    modulus = np.uint64(n_slots)
+    hash_arr = np.zeros(len(ids), dtype=np.uint64)
+    for coeff in coeffs:
+        hash_arr = (hash_arr * ids + np.uint64(coeff % n_slots)) % modulus
+    return hash_arr.astype(np.int64)
+
+
+def requestHash1Many(ids: np.ndarray, n_slots: int) -> np.ndarray:
+    return polyHashMany(ids, (1, 2, 17), n_slots)
+
+
+def requestHash2Many(ids: np.ndarray, n_slots: int) -> np.ndarray:
+    return polyHashMany(ids, (1427, 2503, 2003), n_slots)
+
+
+# SHA-256 cannot be vectorized, so the ids are hashed one at a time
+def requestHash3Many(ids: np.ndarray, n_slots: int) -> np.ndarray:
+    return np.fromiter((requestHash3(int(i)) % n_slots for i in ids),
+                       dtype=np.int64, count=len(ids))
+
+
+def requestHash4Many(ids: np.ndarray, n_slots: int) -> np.ndarray:
+    return (mix64Many(ids) % np.uint64(n_slots)).astype(np.int64)
+
+
+requestHashManyList = [requestHash1Many, requestHash2Many, requestHash3Many,
+                       requestHash4Many]
+
+
+# get the vectorized version of a request hash function
+def requestHashMany(
+    request_hash: Callable[[int], int]
+) -> Callable[[np.ndarray, int], np.ndarray]:
+    if request_hash in requestHashList:
+        return requestHashManyList[requestHashList.index(request_hash)]
+
+    # unknown hash function: hash the ids one at a time
+    def hashMany(ids: np.ndarray, n_slots: int) -> np.ndarray:
+        return np.fromiter((request_hash(int(i)) % n_slots for i in ids),
+                           dtype=np.int64, count=len(ids))
+
+    return hashMany
+
+
+'''
+    Memoized hashing
+    Note about memoization:
+    SHA-256 converts the id to bytes, digests them and converts the digest back
+    to an integer on every call. The slots of the request ids are cached in a
+    bounded LRU, shared by all the rings with the same hash function and number
+    of slots, and the slots of the virtual copies of a server are computed once,
+    however many rings the server is added to.
+'''
+
+# request hash functions worth caching
+cachedHashList = [requestHash3]
+
+# max number of servers whose virtual copy slots are cached
+SERVER_SLOT_CACHE_SIZE = 4096
+
+
+# get the request id -> slot function of a request hash function
+@functools.cache
+def requestSlot(
+    request_hash: Callable[[int], int],
+    n_slots: int,
+    cache_size: int
+) -> Callable[[int], int]:
+    def slot(request_id: int) -> int:
+        return request_hash(request_id) % n_slots
+
+    if request_hash in cachedHashList and cache_size > 0:
+        return functools.lru_cache(maxsize=cache_size)(slot)
+
+    return slot
+
+
+# get the request ids -> slots function of a request hash function
+def requestSlotMany(
+    request_hash: Callable[[int], int],
+    n_slots: int,
+    cache_size: int
+) -> Callable[[np.ndarray], np.ndarray]:
+    slot = requestSlot(request_hash, n_slots, cache_size)
+
+    # the cached ids are looked up one at a time
+    if hasattr(slot, 'cache_info'):
+        def slotMany(ids: np.ndarray) -> np.ndarray:
+            return np.fromiter(map(slot, ids.tolist()), dtype=np.int64, count=len(ids))
+
+        return slotMany
+
+    hash_many = requestHashMany(request_hash)
+
+    def hashMany(ids: np.ndarray) -> np.ndarray:
+        return hash_many(ids, n_slots)
+
+    return hashMany
+
+
+# slots of the virtual copies of a server, before probing
+@functools.lru_cache(maxsize=SERVER_SLOT_CACHE_SIZE)
+def serverSlots(
+    server_hash: Callable[[int, int], int],
+    hostid: int,
+    n_copies: int,
+    n_slots: int
+) -> tuple[int, ...]:
+    return tuple(server_hash(hostid, virtual_idx + 1) % n_slots
+                 for virtual_idx in range(n_copies))
@@ -0,0 +1,403 @@
+from typing import Callable, Iterable
+import math
+import random
+import sys
+import time
+
+import numpy as np
+
+from consts import BOUNDED_LOAD, LOAD_EPSILON, RING_MODE, ROUTER
+from .hash_ds import BoundedLoads, ConsistentHashMap, ServerIds, virtualCopies
+from .hash_functions import mix64, mix64Many
+from .sparse_ds import SparseConsistentHashMap
+
+# routers: interchangeable ways of mapping requests to servers
+# every router offers the interface of ConsistentHashMap:
+#   add(hostname, hostid, weight), remove(hostname), find(request_id),
+#   find_many(request_ids), getServerList(), remaining(), len(), memory()
+#   and acquire/release for bounded loads
+# add and remove of the rings also return the slot ranges that moved
+# (RingDelta), the other routers do not partition the keys into ranges
+# and return None
+# the rendezvous and jump routers key the requests by the request id mixed
+# with splitmix64, the hash functions of HASH_NUM only concern the rings
+
+# number of request ids scored at once by find_many of the rendezvous router
+SCORE_BATCH_SIZE = 2**16
+
+
+# weighted rendezvous score of a 64-bit score: weight / -ln(u), u the score
+# as a fraction in (0, 1), so that a server wins in proportion to its weight
+# (for equal weights the order is that of the scores)
+def weightedScore(score: int, weight: float) -> float:
+    return weight / -math.log(((score >> 12) + 0.5) / 2**52)
+
+
+# weighted rendezvous scores of an array of 64-bit scores, one weight per column
+def weightedScoreMany(scores: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    fraction = ((scores >> np.uint64(12)).astype(np.float64) + 0.5) / 2.0**52
+    return weights / -np.log(fraction)
+
+
+# rendezvous (highest random weight) hashing data structure
+# a request goes to the server with the highest score mix64(key ^ server key),
+# weighted by the capacity weights of the servers if they differ
+
+class RendezvousHashMap(BoundedLoads):
+
+    # constructor
+    def __init__(
+        self,
+        epsilon: None | float = None,
+        load: None | dict[str, int] = None
+    ):
+        super().__init__(epsilon, load)
+
+        # map: server-name -> server-id
+        self.servers: dict[str, int] = {}
+
+        # server-names and their keys, in the same order
+        # (the keys as an array for batch lookups, as a list for single ones)
+        self.hostnames: list[str] = []
+        self.server_keys = np.zeros(0, dtype=np.uint64)
+        self.server_key_list: list[int] = []
+        # weights of the servers, in the same order
+        self.server_weights = np.zeros(0, dtype=np.float64)
+        # whether the weights differ, else the plain scores decide
+        self.weighted = False
+
+        # server-names as an array, for batch lookups, built on demand
+        self.owner_names: None | np.ndarray = None
+
+    # length
+    def __len__(self):
+        return len(self.servers)
+
+    # add a server (by hostname and hostid)
+    # Time Complexity : O(servers)
+    def add(self, hostname: str, hostid: int, weight: float = 1):
+        '''
+            If weight is not positive: raise error
+            Else If server's hostname or hostid is present, cannot duplicate: raise error
+            Else add the server with its key and weight
+        '''
+        if weight <= 0:
+            raise ValueError("Weight must be positive")
+        if hostname in self.servers.keys():
+            raise KeyError("Hostname already present")
+        if hostid in self.servers.values():
+            raise KeyError("Hostid already present")
+
+        self.servers[hostname] = hostid
+        if weight != 1:
+            self.weights[hostname] = weight
+        self.hostnames.append(hostname)
+        self.server_key_list.append(mix64(hostid))
+        self.server_keys = np.array(self.server_key_list, dtype=np.uint64)
+        self.updateWeights()
+        self.owner_names = None
+
+    # remove a server (by hostname)
+    # Time Complexity : O(servers)
+    def remove(self, hostname: str):
+        '''
+            If server's hostname is not found, cannot remove: raise error
+            Else remove the server with its key
+        '''
+        if hostname not in self.servers.keys():
+            raise KeyError("Hostname not found")
+        self.servers.pop(hostname)
+        self.weights.pop(hostname, None)
+
+        idx = self.hostnames.index(hostname)
+        self.hostnames.pop(idx)
+        self.server_key_list.pop(idx)
+        self.server_keys = np.array(self.server_key_list, dtype=np.uint64)
+        self.updateWeights()
+        self.owner_names = None
+
+    # rebuild the weights array from the weights of the servers
+    def updateWeights(self):
+        self.server_weights = np.array(
+            [self.weights.get(hostname, 1) for hostname in self.hostnames], dtype=np.float64)
+        self.weighted = len(set(self.server_weights.tolist())) > 1
+
+    # scores of the servers for each key, one row per key
+    def scores(self, keys: np.ndarray) -> np.ndarray:
+        scores = mix64Many(keys[:, None] ^ self.server_keys[None, :])
+        if self.weighted:
+            return weightedScoreMany(scores, self.server_weights[None, :])
+
+        return scores
+
+    # find the server (by hostname) to which to route the request
+    # Time Complexity : O(servers)
+    def find(self, request_id: int):
+        '''
+            If no server present, cannot map request: raise error
+            Else, return the hostname of the server with the highest score
+        '''
+        if len(self.servers) == 0:
+            raise RuntimeError("No servers alive")
+
+        # a handful of servers is scored faster without NumPy
+        key = mix64(request_id)
+        scores = [mix64(key ^ server_key) for server_key in self.server_key_list]
+        if self.weighted:
+            scores = [weightedScore(score, self.weights.get(hostname, 1))
+                      for score, hostname in zip(scores, self.hostnames)]
+
+        if self.epsilon is not None:
+            # the servers by decreasing score, the first below capacity wins
+            capacity = self.capacity()
+            for idx in sorted(range(len(scores)), key=scores.__getitem__, reverse=True):
+                if self.belowCapacity(self.hostnames[idx], capacity):
+                    return self.hostnames[idx]
+
+        return self.hostnames[max(range(len(scores)), key=scores.__getitem__)]
+
+    # find the servers (by hostname) to which to route a batch of requests
+    # (bounded loads are not applied, since a batch has no requests in flight)
+    # Time Complexity : O(len(request_ids) * servers), vectorized
+    def find_many(self, request_ids: Iterable[int]) -> list[str]:
+        '''
+            If no server present, cannot map requests: raise error
+            Else, score all the servers for batches of request ids at once
+        '''
+        if len(self.servers) == 0:
+            raise RuntimeError("No servers alive")
+
+        keys = mix64Many(np.asarray(request_ids, dtype=np.int64))
+
+        owners = np.concatenate([
+            np.argmax(self.scores(keys[i:i + SCORE_BATCH_SIZE]), axis=1)
+            for i in range(0, len(keys), SCORE_BATCH_SIZE)
+        ]) if len(keys) > 0 else np.zeros(0, dtype=np.int64)
+
+        if self.owner_names is None:
+            self.owner_names = np.array(self.hostnames, dtype=object)
+
+        return self.owner_names[owners].tolist()
+
+    # get list of all hostnames of servers
+    def getServerList(self):
+        return list(self.servers.keys())
+
+    # get remaining servers, i.e. maximum number of servers that can be added
+    def remaining(self):
+        return sys.maxsize
+
+    # memory footprint in bytes
+    def memory(self):
+        return (sys.getsizeof(self.servers) + sys.getsizeof(self.hostnames) +
+                sys.getsizeof(self.server_key_list) + self.server_keys.nbytes)
+
+
+# jump consistent hash of a 64-bit key into one of n buckets
+# (Lamping and Veach, "A Fast, Minimal Memory, Consistent Hash Algorithm")
+def jumpHash(key: int, n: int) -> int:
+    b, j = -1, 0
+    while j < n:
+        b = j
+        key = (key * 2862933555777941757 + 1) & ((1 << 64) - 1)
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+# jump consistent hash of an array of 64-bit keys, all keys stepping at once
+# the number of steps is O(log(n)), so is the number of array operations
+def jumpHashMany(keys: np.ndarray, n: int) -> np.ndarray:
+    keys = keys.astype(np.uint64)
+    b = np.full(len(keys), -1, dtype=np.int64)
+    j = np.zeros(len(keys), dtype=np.int64)
+
+    active = j < n
+    while active.any():
+        b[active] = j[active]
+        keys[active] = keys[active] * np.uint64(2862933555777941757) + np.uint64(1)
+        j[active] = ((b[active] + 1) *
+                     (float(1 << 31) / ((keys[active] >> np.uint64(33)) + np.uint64(1))
+                      .astype(np.float64))).astype(np.int64)
+        active = j < n
+
+    return b
+
+
+# jump consistent hashing data structure
+# the servers are the buckets 0..n-1, in insertion order, a server of
+# weight w taking round(w) buckets (at least one)
+# removing a server moves the last server into its bucket, which moves the
+# keys of both, since jump hashing can only shrink from the end
+
+class JumpHashMap(BoundedLoads):
+
+    # constructor
+    def __init__(
+        self,
+        epsilon: None | float = None,
+        load: None | dict[str, int] = None
+    ):
+        super().__init__(epsilon, load)
+
+        # map: server-name -> server-id
+        self.servers: dict[str, int] = {}
+
+        # bucket -> server-name
+        self.buckets: list[str] = []
+
+        # server-names as an array, for batch lookups, built on demand
+        self.owner_names: None | np.ndarray = None
+
+    # length
+    def __len__(self):
+        return len(self.servers)
+
+    # add a server (by hostname and hostid)
+    # Time Complexity : O(weight)
+    def add(self, hostname: str, hostid: int, weight: float = 1):
+        '''
+            If server's hostname or hostid is present, cannot duplicate: raise error
+            Else add the server as the last bucket(s)
+        '''
+        n_buckets = virtualCopies(1, weight)
+        if hostname in self.servers.keys():
+            raise KeyError("Hostname already present")
+        if hostid in self.servers.values():
+            raise KeyError("Hostid already present")
+
+        self.servers[hostname] = hostid
+        if weight != 1:
+            self.weights[hostname] = weight
+        self.buckets.extend([hostname] * n_buckets)
+        self.owner_names = None
+
+    # remove a server (by hostname)
+    # Time Complexity : O(servers)
+    def remove(self, hostname: str):
+        '''
+            If server's hostname is not found, cannot remove: raise error
+            Else move the last servers into the buckets of the server
+        '''
+        if hostname not in self.servers.keys():
+            raise KeyError("Hostname not found")
+        self.servers.pop(hostname)
+        self.weights.pop(hostname, None)
+
+        # from the last bucket of the server, so that the bucket moved in
+        # is never one of the server's own
+        for idx in reversed([idx for idx, bucket in enumerate(self.buckets)
+                             if bucket == hostname]):
+            self.buckets[idx] = self.buckets[-1]
+            self.buckets.pop()
+        self.owner_names = None
+
+    # find the server (by hostname) to which to route the request
+    # Time Complexity : O(log(servers))
+    def find(self, request_id: int):
+        '''
+            If no server present, cannot map request: raise error
+            Else, return the hostname of the bucket of the request
+        '''
+        if len(self.servers) == 0:
+            raise RuntimeError("No servers alive")
+
+        bucket = jumpHash(mix64(request_id), len(self.buckets))
+
+        if self.epsilon is not None:
+            # walk the buckets from the request's bucket to the first below capacity
+            capacity = self.capacity()
+            for i in range(len(self.buckets)):
+                hostname = self.buckets[(bucket + i) % len(self.buckets)]
+                if self.belowCapacity(hostname, capacity):
+                    return hostname
+
+        return self.buckets[bucket]
+
+    # find the servers (by hostname) to which to route a batch of requests
+    # (bounded loads are not applied, since a batch has no requests in flight)
+    # Time Complexity : O(len(request_ids) * log(servers)), vectorized
+    def find_many(self, request_ids: Iterable[int]) -> list[str]:
+        '''
+            If no server present, cannot map requests: raise error
+            Else, jump hash all the request ids at once
+        '''
+        if len(self.servers) == 0:
+            raise RuntimeError("No servers alive")
+
+        keys = mix64Many(np.asarray(request_ids, dtype=np.int64))
+
+        if self.owner_names is None:
+            self.owner_names = np.array(self.buckets, dtype=object)
+
+        return self.owner_names[jumpHashMany(keys, len(self.buckets))].tolist()
+
+    # get list of all hostnames of servers
+    def getServerList(self):
+        return list(self.servers.keys())
+
+    # get remaining servers, i.e. maximum number of servers that can be added
+    def remaining(self):
+        return sys.maxsize
+
+    # memory footprint in bytes
+    def memory(self):
+        return sys.getsizeof(self.servers) + sys.getsizeof(self.buckets)
+
+
+# create a router of the configured kind
+# `load` is the map of requests in flight per server, shared by all the routers
+# `server_ids` is shared with the dense rings only, the others key the servers by hostname
+def newRouter(
+    load: None | dict[str, int] = None,
+    server_ids: None | ServerIds = None
+) -> ConsistentHashMap | SparseConsistentHashMap | RendezvousHashMap | JumpHashMap:
+    epsilon = LOAD_EPSILON if BOUNDED_LOAD else None
+
+    if ROUTER == 'rendezvous':
+        return RendezvousHashMap(epsilon=epsilon, load=load)
+
+    if ROUTER == 'jump':
+        return JumpHashMap(epsilon=epsilon, load=load)
+
+    if RING_MODE == 'sparse':
+        return SparseConsistentHashMap(epsilon=epsilon, load=load)
+
+    return ConsistentHashMap(epsilon=epsilon, load=load, server_ids=server_ids)
+
+
+# measure a router: lookup cost, memory footprint and keys moved on add/remove
+# `new_router` creates an empty router, which gets `n_servers` servers
+def routerMetrics(
+    new_router: Callable[[], object],
+    n_servers: int,
+    request_ids: list[int]
+) -> dict[str, float]:
+    router = new_router()
+    hostids = random.sample(range(100000, 999999), n_servers + 1)
+    for server_idx in range(n_servers):
+        router.add(f'Server-{server_idx + 1}', hostids[server_idx])
+
+    start = time.perf_counter()
+    for request_id in request_ids:
+        router.find(request_id)
+    find_ns = (time.perf_counter() - start) * 1e9 / len(request_ids)
+
+    start = time.perf_counter()
+    before = router.find_many(request_ids)
+    find_many_ns = (time.perf_counter() - start) * 1e9 / len(request_ids)
+
+    memory = router.memory()
+
+    # keys moved by adding a server, then by removing a server from the middle
+    router.add(f'Server-{n_servers + 1}', hostids[n_servers])
+    after_add = router.find_many(request_ids)
+    router.remove(f'Server-{n_servers // 2 + 1}')
+    after_remove = router.find_many(request_ids)
+
+    return {
+        'find_ns': find_ns,
+        'find_many_ns': find_many_ns,
+        'memory': memory,
+        'moved_on_add': sum(a != b for a, b in zip(before, after_add)) / len(request_ids),
+        'moved_on_remove': sum(a != b for a, b in zip(after_add, after_remove)) / len(request_ids),
+    }
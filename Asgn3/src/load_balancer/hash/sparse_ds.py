@@ -0,0 +1,286 @@
+from typing import Callable, Iterable
+import sys
+
+import numpy as np
+
+from consts import HASH_NUM, SLOT_CACHE_SIZE, SPARSE_VIRTUAL
+from .hash_ds import BoundedLoads, RingDelta, compactDelta, cyclicRanges, virtualCopies
+from .hash_functions import (requestHashList, requestSlot, requestSlotMany,
+                             serverHashList, serverSlots)
+
+# sparse consistent hashing data structure
+# only the positions of the virtual copies are stored, sorted, and requests
+# are mapped by binary search, so memory is O(servers * n_virtual)
+# irrespective of the size of the keyspace
+
+class SparseConsistentHashMap(BoundedLoads):
+
+    # constructor
+    def __init__(
+        self,
+        request_hash: Callable[[int], int] = requestHashList[HASH_NUM],
+        server_hash: Callable[[int, int], int] = serverHashList[HASH_NUM],
+        n_slots: int = 2**32,
+        n_virtual: int = SPARSE_VIRTUAL,
+        epsilon: None | float = None,
+        load: None | dict[str, int] = None,
+        slot_cache: int = SLOT_CACHE_SIZE
+    ):
+        super().__init__(epsilon, load)
+
+        if n_slots > 2**32:
+            raise ValueError("Keyspace must fit in 32 bits")
+
+        # the polynomial hash functions [HASH_NUM 0 and 1] place all the virtual copies
+        # of a server next to each other on such a large keyspace, i.e. one range each
+        if request_hash in requestHashList[:2] or server_hash in serverHashList[:2]:
+            raise ValueError("Sparse ring needs the SHA-256 or splitmix64 hash functions "
+                             "(HASH_NUM 2 or 3)")
+
+        # assign the hash functions
+        self.requestHash = request_hash
+        self.serverHash = server_hash
+        # request id(s) -> position(s), memoized for the SHA-256 hash function
+        self.requestSlot = requestSlot(request_hash, n_slots, slot_cache)
+        self.requestSlotMany = requestSlotMany(request_hash, n_slots, slot_cache)
+
+        # map: server-name -> server-id
+        self.servers: dict[str, int] = {}
+        # map: server-name -> positions of virtual replicas
+        self.replicas: dict[str, list[int]] = {}
+
+        # map: server-name -> owner id, the index into hostnames
+        self.owner_ids: dict[str, int] = {}
+        # map: owner id -> server-name (None if freed)
+        self.hostnames: list[None | str] = []
+        # owner ids freed by removed servers, to be reused
+        self.free_ids: list[int] = []
+
+        # sorted positions of the virtual replicas and their owner ids
+        self.positions = np.zeros(0, dtype=np.uint32)
+        self.owners = np.zeros(0, dtype=np.int32)
+        self.n_slots = n_slots
+
+        # number of virtual copies to keep
+        self.n_virtual = n_virtual
+
+        # owner id -> server-name, for batch lookups, built on demand
+        self.owner_names: None | np.ndarray = None
+
+    # length
+    def __len__(self):
+        return len(self.servers)
+
+    # check if a position is taken by a virtual replica
+    # Time Complexity : O(log(n_virtual * servers))
+    def isOccupied(self, position: int) -> bool:
+        idx = np.searchsorted(self.positions, np.uint32(position))
+        return bool(idx < len(self.positions) and self.positions[idx] == position)
+
+    # owner (by hostname) of an owner id, None if no server
+    def ownerName(self, owner_id: int) -> None | str:
+        return None if owner_id < 0 else self.hostnames[owner_id]
+
+    # add a server (by hostname and hostid)
+    # the server gets n_virtual * weight virtual copies
+    # Time Complexity : O(n_virtual * log(n_virtual * servers)) plus one merge
+    def add(self, hostname: str, hostid: int, weight: float = 1) -> RingDelta:
+        '''
+            If empty positions < virtual copies, cannot add new server: raise error
+            Else If server's hostname or hostid is present, cannot duplicate: raise error
+            Else add all virtual copies of the server to the ring,
+            return the hash ranges that moved to the server
+        '''
+        n_copies = virtualCopies(self.n_virtual, weight)
+        if self.n_slots - len(self.positions) < n_copies:
+            raise RuntimeError("Insufficient slots to add new server")
+        if hostname in self.servers.keys():
+            raise KeyError("Hostname already present")
+        if hostid in self.servers.values():
+            raise KeyError("Hostid already present")
+
+        self.servers[hostname] = hostid
+        if weight != 1:
+            self.weights[hostname] = weight
+        self.owner_names = None
+
+        if len(self.free_ids) > 0:
+            owner_id = self.free_ids.pop()
+            self.hostnames[owner_id] = hostname
+        else:
+            owner_id = len(self.hostnames)
+            self.hostnames.append(hostname)
+        self.owner_ids[hostname] = owner_id
+
+        new_positions: set[int] = set()
+        for position in serverSlots(self.serverHash, hostid, n_copies, self.n_slots):
+            # Probe linearly if there is collision
+            while position in new_positions or self.isOccupied(position):
+                position = (position + 1) % self.n_slots
+            new_positions.add(position)
+
+        self.replicas[hostname] = sorted(new_positions)
+
+        # merge the new positions into the sorted positions
+        added = np.array(self.replicas[hostname], dtype=np.uint32)
+        idx = np.searchsorted(self.positions, added)
+
+        # the range up to each new position belonged to the next old position
+        old_ids = (self.owners[idx % len(self.positions)] if len(self.positions) > 0
+                   else np.full(len(added), -1, dtype=np.int32))
+
+        self.positions = np.insert(self.positions, idx, added)
+        self.owners = np.insert(self.owners, idx, owner_id)
+
+        prev = self.positions[idx + np.arange(len(added)) - 1]
+
+        return compactDelta([
+            (slot_range, self.ownerName(old_id), hostname)
+            for low, high, old_id in zip(prev.tolist(), added.tolist(), old_ids.tolist())
+            for slot_range in cyclicRanges(low, high, self.n_slots)
+        ])
+
+    # remove a server (by hostname)
+    # Time Complexity : O(n_virtual * servers), one pass
+    def remove(self, hostname: str) -> RingDelta:
+        '''
+            If server's hostname is not found, cannot remove: raise error
+            Else remove all virtual copies of the server from the ring,
+            return the hash ranges that moved away from the server
+        '''
+        if hostname not in self.servers.keys():
+            raise KeyError("Hostname not found")
+        self.servers.pop(hostname)
+        self.weights.pop(hostname, None)
+        self.replicas.pop(hostname)
+        self.owner_names = None
+
+        owner_id = self.owner_ids.pop(hostname)
+        self.hostnames[owner_id] = None
+        self.free_ids.append(owner_id)
+
+        keep = self.owners != owner_id
+        removed = np.flatnonzero(~keep)
+        prev = self.positions[removed - 1]
+        removed_positions = self.positions[removed]
+
+        self.positions = self.positions[keep]
+        self.owners = self.owners[keep]
+
+        if len(self.positions) == 0:
+            return [(range(0, self.n_slots), hostname, None)]
+
+        # the range up to each removed position goes to the next kept position
+        new_ids = self.owners[np.searchsorted(self.positions, removed_positions)
+                              % len(self.positions)]
+
+        return compactDelta([
+            (slot_range, hostname, self.hostnames[new_id])
+            for low, high, new_id in zip(prev.tolist(), removed_positions.tolist(),
+                                         new_ids.tolist())
+            for slot_range in cyclicRanges(low, high, self.n_slots)
+        ])
+
+    # find the server (by hostname) to which to route the request
+    # Time Complexity : O(log(n_virtual * servers))
+    def find(self, request_id: int):
+        '''
+            If no server present, cannot map request: raise error
+            Else, return the cyclically next server's hostname
+        '''
+        if len(self.servers) == 0:
+            raise RuntimeError("No servers alive")
+
+        request_hash = self.requestSlot(request_id)
+
+        idx = np.searchsorted(self.positions, np.uint32(request_hash))
+
+        if self.epsilon is not None:
+            return self.findBounded(int(idx))
+
+        return self.hostnames[self.owners[idx % len(self.positions)]]
+
+    # walk clockwise from the position index to the first server below capacity
+    # Time Complexity : O(n_virtual * servers) when all nearer servers are full
+    def findBounded(self, start: int) -> str:
+        capacity = self.capacity()
+        for i in range(len(self.positions)):
+            hostname = self.hostnames[self.owners[(start + i) % len(self.positions)]]
+            if self.belowCapacity(hostname, capacity):
+                return hostname
+
+        # not reached: some server is always below the average load
+        return self.hostnames[self.owners[start % len(self.positions)]]
+
+    # find the servers (by hostname) to which to route a batch of requests
+    # (bounded loads are not applied, since a batch has no requests in flight)
+    # Time Complexity : O(len(request_ids) * log(n_virtual * servers)), vectorized
+    def find_many(self, request_ids: Iterable[int]) -> list[str]:
+        '''
+            If no server present, cannot map requests: raise error
+            Else, hash all the request ids at once and binary search
+            their cyclically next servers in one operation
+        '''
+        if len(self.servers) == 0:
+            raise RuntimeError("No servers alive")
+
+        request_ids = np.asarray(request_ids, dtype=np.int64)
+        request_hash = self.requestSlotMany(request_ids).astype(np.uint32)
+
+        idx = np.searchsorted(self.positions, request_hash) % len(self.positions)
+
+        if self.owner_names is None:
+            self.owner_names = np.array(self.hostnames, dtype=object)
+
+        return self.owner_names[self.owners[idx]].tolist()
+
+    # owners (by hostname) of the given positions, None if no server
+    # Time Complexity : O(len(positions) * log(n_virtual * servers)), vectorized
+    def positionOwners(self, positions: np.ndarray) -> np.ndarray:
+        if len(self.servers) == 0:
+            return np.full(len(positions), None, dtype=object)
+
+        if self.owner_names is None:
+            self.owner_names = np.array(self.hostnames, dtype=object)
+
+        idx = np.searchsorted(self.positions, positions) % len(self.positions)
+        return self.owner_names[self.owners[idx]]
+
+    # hash ranges whose owner differs between this ring and another
+    # Time Complexity : O(n_virtual * servers * log(n_virtual * servers)), vectorized
+    def diff(self, other: 'SparseConsistentHashMap') -> RingDelta:
+        '''
+            If the rings have different keyspaces, cannot compare: raise error
+            Else, return the hash ranges whose owner changes from this ring to the other
+        '''
+        if other.n_slots != self.n_slots:
+            raise ValueError("Rings have different keyspaces")
+
+        # between two consecutive positions of either ring, both rings have one owner
+        bounds = np.union1d(self.positions, other.positions)
+        if len(bounds) == 0:
+            return []
+
+        old = self.positionOwners(bounds)
+        new = other.positionOwners(bounds)
+
+        bounds = bounds.tolist()
+        return compactDelta([
+            (slot_range, old[k], new[k])
+            for k in np.flatnonzero(old != new).tolist()
+            for slot_range in cyclicRanges(bounds[k - 1], bounds[k], self.n_slots)
+        ])
+
+    # get list of all hostnames of servers
+    def getServerList(self):
+        return list(self.servers.keys())
+
+    # get remaining servers, i.e. maximum number of servers that can be added
+    def remaining(self):
+        return (self.n_slots - len(self.positions)) // self.n_virtual
+
+    # memory footprint in bytes
+    def memory(self):
+        return (sys.getsizeof(self.servers) + sys.getsizeof(self.hostnames) +
+                self.positions.nbytes + self.owners.nbytes)
+
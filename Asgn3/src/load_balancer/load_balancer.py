@@ -1,6 +1,7 @@
 from quart import Quart
 
 from endpoints import blueprint as all_blueprints
+from shard_index import load_shard_index
 from utils import *
 
 app = Quart(__name__)
@@ -28,6 +29,12 @@ async def my_startup():
 
         await common.pool
 
+        # Shared http session with keep-alive connections
+        common.session = create_session()
+
+        # Load the shard index [empty until the first `/init`]
+        await load_shard_index()
+
         if DEBUG:
             print(f'{Fore.LIGHTYELLOW_EX}CONNECT | '
                   f'Connected to the database'
@@ -60,8 +67,15 @@ async def my_shutdown():
     2. Stop all server replicas.
     """
 
+    # stop the connection warm ups still in flight
+    for task in list(common.warmups):
+        task.cancel()
+
     # close the pool
     await common.pool.close()
+
+    # close the shared http session
+    await common.session.close()
 # END my_shutdown
 
 
@@ -0,0 +1,459 @@
+from utils import *
+
+
+async def warm_connections(
+    session: aiohttp.ClientSession,
+    server_names: Set[str]
+):
+    """
+    Open a pooled connection to each server with a heartbeat, so that the first
+    reads of the ranges it took over do not wait for a tcp connect.
+    """
+
+    async def heartbeat(server_name: str):
+        async with session.get(f'http://{server_name}:5000/heartbeat') as response:
+            await response.read()
+
+    await asyncio.gather(*(heartbeat(server_name) for server_name in server_names),
+                         return_exceptions=True)
+# END warm_connections
+
+
+async def refresh_routing(
+    session: aiohttp.ClientSession,
+    stale_epoch: int
+):
+    """
+    Fetch the routing table from the shard manager.
+
+    Nothing is fetched if the local copy is already newer than `stale_epoch`,
+    i.e. some other task refreshed it in the meantime.
+    """
+
+    global shard_map
+    global shard_primary
+
+    async with common.routing_lock:
+        if common.epoch > stale_epoch:
+            return
+
+        async with session.get('http://Shard-Manager:5000/routing') as response:
+            await response.read()
+
+        if response.status != 200:
+            raise Exception('Failed to fetch the routing table')
+
+        routing_table = dict(await response.json())
+
+        new_shard_map: Dict[str, ConsistentHashMap] = {}
+        new_shard_primary: Dict[str, str] = {}
+
+        # Interned server ids shared by the new maps, dropped with the old ones
+        server_ids = ServerIds()
+
+        # Servers that took over slots of a ring, whose connections are warmed up
+        new_owners: Set[str] = set()
+
+        for shard, shard_info in routing_table['shards'].items():
+            # A ring of the same servers and weights as on the shard manager
+            # [not the same slots after removes, see /routing on the shard manager]
+            new_shard_map[shard] = newRouter(common.server_inflight, server_ids)
+            for hostname, hostid, weight in shard_info['servers']:
+                new_shard_map[shard].add(hostname, hostid, weight)
+
+            new_shard_primary[shard] = shard_info['primary']
+
+            # only the moved ranges [ring routers only, which report them]
+            old_ring = shard_map.get(shard)
+            if old_ring is not None and hasattr(old_ring, 'diff'):
+                new_owners.update(new_owner for _, _, new_owner
+                                  in old_ring.diff(new_shard_map[shard])
+                                  if new_owner is not None)
+        # END for shard, shard_info in routing_table['shards'].items()
+
+        # Swap the tables in place, without yielding in between
+        shard_map.clear()
+        shard_map.update(new_shard_map)
+        shard_primary.clear()
+        shard_primary.update(new_shard_primary)
+        common.epoch = int(routing_table['epoch'])
+
+        ic(common.epoch, shard_primary, new_owners)
+
+        if len(new_owners) > 0:
+            task = asyncio.create_task(warm_connections(session, new_owners))
+            common.warmups.add(task)
+            task.add_done_callback(common.warmups.discard)
+    # END async with common.routing_lock
+# END refresh_routing
+
+
+def invalidate_routing():
+    """
+    Mark the local routing table as outdated, so that it is fetched on next use.
+    """
+
+    common.epoch = -1
+# END invalidate_routing
+
+
+def replica_score(server_name: str):
+    """
+    Expected wait for a read at the server: its average latency scaled by its queue.
+
+    Servers without any latency yet are taken to answer in `HEDGE_DEFAULT_DELAY`.
+    """
+
+    return (common.server_latency.get(server_name, HEDGE_DEFAULT_DELAY) *
+            (common.server_inflight.get(server_name, 0) + 1))
+# END replica_score
+
+
+def choose_replica(
+    first: str,
+    servers: List[str]
+) -> Tuple[str, List[str]]:
+    """
+    Choose a read replica by power of two choices.
+
+    `first`, the replica found on the consistent hash ring, is compared with
+    another random replica of `servers`, and the one with the lower score wins.
+
+    Returns the chosen replica and the other replicas, the loser first.
+    """
+
+    others = [server for server in servers if server != first]
+
+    if len(others) == 0:
+        return first, []
+
+    second = random.choice(others)
+
+    if replica_score(second) < replica_score(first):
+        first, second = second, first
+
+    return first, [second] + [server for server in others
+                              if server != first and server != second]
+# END choose_replica
+
+
+def record_latency(
+    server_name: str,
+    latency: float,
+    sample: bool = True
+):
+    """
+    Fold a read latency of the server into its moving average.
+
+    If `sample` is set, the latency also counts towards the hedge delay.
+    """
+
+    if server_name in common.server_latency:
+        common.server_latency[server_name] += EWMA_ALPHA * \
+            (latency - common.server_latency[server_name])
+    else:
+        common.server_latency[server_name] = latency
+
+    if sample:
+        common.read_latencies.append(latency)
+# END record_latency
+
+
+def hedge_delay():
+    """
+    Get the time to wait for a read before hedging it to another replica.
+
+    This is the `HEDGE_PERCENTILE` percentile of the recent read latencies.
+    """
+
+    if len(common.read_latencies) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+
+    latencies = sorted(common.read_latencies)
+
+    return latencies[int(HEDGE_PERCENTILE / 100 * (len(latencies) - 1))]
+# END hedge_delay
+
+
+def lookup_shard(
+    shard_id: str,
+    to_primary: bool
+) -> Tuple[str, List[str]]:
+    """
+    Look up the target server of the shard in the local routing table.
+
+    Returns the primary and the secondary servers if `to_primary` is set,
+    else a server replica and the other replicas of the shard.
+    """
+
+    if to_primary:
+        primary = shard_primary.get(shard_id, "")
+
+        if primary == "":
+            raise Exception(f'No primary available for shard `{shard_id}`')
+
+        secondary = [server
+                     for server in shard_map[shard_id].getServerList()
+                     if server != primary]
+
+        return primary, secondary
+
+    if shard_id not in shard_map or len(shard_map[shard_id]) == 0:
+        raise Exception(f'No servers available for shard `{shard_id}`')
+
+    return choose_replica(shard_map[shard_id].find(get_request_id()),
+                          shard_map[shard_id].getServerList())
+# END lookup_shard
+
+
+async def resolve_shards(
+    session: aiohttp.ClientSession,
+    shard_ids: List[str],
+    to_primary: bool = False
+) -> Dict[str, Tuple[str, List[str], int]]:
+    """
+    Resolve the target servers of a batch of shards with at most one call to the shard manager.
+
+    With `LOCAL_ROUTING`, the local routing table is used and refreshed once
+    if it is outdated or misses some shard. Otherwise the whole batch is
+    resolved with a single `/resolve` call to the shard manager.
+
+    Returns shard name -> (server, secondary servers, epoch) if `to_primary` is set,
+    else shard name -> (server, other replicas, epoch).
+    """
+
+    if not LOCAL_ROUTING:
+        mode = 'write' if to_primary else 'read'
+
+        async with session.post('http://Shard-Manager:5000/resolve',
+                                json={'shards': [[shard_id, get_request_id(), mode]
+                                                 for shard_id in shard_ids]}) as response:
+            await response.read()
+
+        if response.status != 200:
+            raise Exception('Failed to resolve shards')
+
+        resolved = dict(await response.json())
+        epoch = int(resolved['epoch'])
+
+        return {
+            str(info['shard']): ((str(info['primary']), list(info['secondary']), epoch)
+                                 if to_primary else
+                                 (*choose_replica(str(info['server']),
+                                                  list(info.get('servers', []))), epoch))
+            for info in resolved['shards']
+        }
+    # END if not LOCAL_ROUTING
+
+    if (common.epoch < 0 or
+            any(shard_id not in shard_map for shard_id in shard_ids)):
+        await refresh_routing(session, common.epoch)
+
+    targets: Dict[str, Tuple[str, List[str], int]] = {}
+
+    for shard_id in shard_ids:
+        server_name, secondary = lookup_shard(shard_id, to_primary)
+        targets[shard_id] = (server_name, secondary, common.epoch)
+    # END for shard_id in shard_ids
+
+    return targets
+# END resolve_shards
+
+
+async def request_server(
+    session: aiohttp.ClientSession,
+    method: str,
+    server_name: str,
+    endpoint: str,
+    json_payload: Dict,
+    stream: bool = False,
+    is_read: bool = True
+):
+    """
+    Send a request to a server, keeping count of its requests in flight.
+
+    If `is_read` is set, the latency of the request is recorded. A failed
+    request counts as `REQUEST_TIMEOUT`. A cancelled one (a lost hedge) only
+    shows that the server is at least as slow as the time until cancelled,
+    so it is recorded only if that raises the average of the server.
+    """
+
+    common.server_inflight[server_name] = \
+        common.server_inflight.get(server_name, 0) + 1
+    start = time.perf_counter()
+    succeeded = False
+    cancelled = False
+
+    try:
+        if stream:
+            response = await session.request(method,
+                                             f'http://{server_name}:5000/{endpoint}',
+                                             json=json_payload)
+            if response.status != 200:
+                await response.read()
+        else:
+            async with session.request(method,
+                                       f'http://{server_name}:5000/{endpoint}',
+                                       json=json_payload) as response:
+                await response.read()
+
+        succeeded = True
+        return response
+
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+
+    except Exception:
+        start = min(start, time.perf_counter() - REQUEST_TIMEOUT)
+        raise
+
+    finally:
+        common.server_inflight[server_name] -= 1
+        latency = time.perf_counter() - start
+
+        if is_read and not (cancelled and
+                            latency <= common.server_latency.get(server_name, 0)):
+            record_latency(server_name, latency, sample=succeeded)
+    # END try-except-finally
+# END request_server
+
+
+async def hedged_request(
+    session: aiohttp.ClientSession,
+    method: str,
+    server_name: str,
+    hedge_server_name: str,
+    endpoint: str,
+    json_payload: Dict
+):
+    """
+    Send a read to a server, and a duplicate to `hedge_server_name` if the
+    first has not answered successfully within the hedge delay.
+
+    The first successful response wins and the other request is cancelled.
+    If both fail, the outcome of the last one is returned or raised.
+    """
+
+    pending = {asyncio.create_task(
+        request_server(session, method, server_name, endpoint, json_payload))}
+    hedged = False
+    last = None
+
+    try:
+        while len(pending) > 0:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if hedged else hedge_delay(),
+                return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                last = task
+                if task.exception() is None and task.result().status == 200:
+                    return task.result()
+            # END for task in done
+
+            # The first request is slow or failed, send the duplicate
+            if not hedged:
+                hedged = True
+                pending.add(asyncio.create_task(
+                    request_server(session, method, hedge_server_name,
+                                   endpoint, json_payload)))
+        # END while len(pending) > 0
+
+        return last.result()
+
+    finally:
+        # Cancel the losing request
+        for task in pending:
+            task.cancel()
+    # END try-finally
+# END hedged_request
+
+
+async def send_to_shard(
+    session: aiohttp.ClientSession,
+    method: str,
+    shard_id: str,
+    endpoint: str,
+    json_payload: Dict,
+    to_primary: bool = False,
+    target: Optional[Tuple[str, List[str], int]] = None,
+    stream: bool = False
+):
+    """
+    Route a request for the shard to a server replica.
+
+    If `to_primary` is set, the request goes to the primary of the shard with
+    the list of secondary servers attached.
+
+    Otherwise the request goes to the chosen replica, and is hedged to the
+    next replica of the shard if it does not answer within the hedge delay.
+
+    `target` is the (server, secondary servers, epoch) already resolved with
+    `resolve_shards`; it is resolved here if not given.
+
+    If the server rejects the request because of a stale epoch, or cannot be
+    reached, the routing table is refreshed and the request is retried once.
+
+    If a replica rejects a read because it is behind the term [write concern
+    other than `all`], the read is retried on the primary of the shard.
+
+    If `stream` is set, the body of a successful response is left unread;
+    the caller must read it and release the response.
+    """
+
+    # To allow other tasks to run
+    await asyncio.sleep(0)
+
+    for attempt in range(2):
+        if target is None:
+            target = (await resolve_shards(session, [shard_id], to_primary))[shard_id]
+
+        server_name, secondary, epoch = target
+        target = None
+
+        if to_primary:
+            json_payload["is_primary"] = True
+            json_payload["secondary_servers"] = secondary
+
+        json_payload["epoch"] = epoch
+
+        try:
+            if (to_primary or stream or
+                    HEDGE_PERCENTILE <= 0 or len(secondary) == 0):
+                response = await request_server(session, method, server_name,
+                                                endpoint, json_payload,
+                                                stream=stream,
+                                                is_read=not to_primary)
+            else:
+                response = await hedged_request(session, method, server_name,
+                                                secondary[0], endpoint,
+                                                json_payload)
+
+        except aiohttp.ClientConnectorError:
+            if attempt > 0:
+                raise
+
+            if LOCAL_ROUTING:
+                await refresh_routing(session, epoch)
+            continue
+        # END try-except
+
+        # 503: the replica has not applied the term yet, while the primary has
+        if response.status == 503 and not to_primary:
+            server_name, _, epoch = (await resolve_shards(session, [shard_id], True))[shard_id]
+            json_payload["epoch"] = epoch
+            return await request_server(session, method, server_name,
+                                        endpoint, json_payload, stream=stream)
+
+        # 409: the server has seen a newer routing epoch
+        if response.status != 409 or attempt > 0:
+            return response
+
+        if LOCAL_ROUTING:
+            await refresh_routing(session, epoch)
+    # END for attempt in range(2)
+
+    raise Exception(f'Failed to route request for shard `{shard_id}`')
+# END send_to_shard
@@ -0,0 +1,141 @@
+from array import array
+from bisect import bisect_right
+
+from utils import *
+
+
+async def load_shard_index():
+    """
+    Load the interval index of the shards from `ShardT`.
+
+    Nothing is loaded if some other task loaded the index in the meantime.
+    The loaded index is not published if it was invalidated during the load.
+    """
+
+    async with common.shard_index_lock:
+        if common.shard_index is not None:
+            return common.shard_index
+
+        version = common.shard_index_version
+
+        async with common.pool.acquire() as conn:
+            records = await conn.fetch(
+                '''--sql
+                SELECT
+                    stud_id_low,
+                    shard_size,
+                    shard_id
+                FROM
+                    ShardT
+                ORDER BY
+                    stud_id_low;
+                ''')
+
+        index = (array('q', (record["stud_id_low"] for record in records)),
+                 array('q', (record["shard_size"] for record in records)),
+                 [str(record["shard_id"]) for record in records])
+
+        if version == common.shard_index_version:
+            common.shard_index = index
+
+        return index
+    # END async with common.shard_index_lock
+# END load_shard_index
+
+
+def invalidate_shard_index():
+    """
+    Mark the interval index as outdated, so that it is loaded on next use.
+    """
+
+    common.shard_index_version += 1
+    common.shard_index = None
+# END invalidate_shard_index
+
+
+async def get_shard_index():
+    """
+    Get the interval index of the shards, loading it if needed.
+    """
+
+    index = common.shard_index
+
+    if index is None:
+        index = await load_shard_index()
+
+    return index
+# END get_shard_index
+
+
+def find_shard(
+    index: Tuple[array, array, List[str]],
+    stud_id: int
+) -> Optional[str]:
+    """
+    Find the shard containing `stud_id`, or None if no shard contains it.
+    """
+
+    lows, sizes, shard_ids = index
+
+    i = bisect_right(lows, stud_id) - 1
+
+    if i >= 0 and stud_id < lows[i] + sizes[i]:
+        return shard_ids[i]
+
+    return None
+# END find_shard
+
+
+def find_shards_in_range(
+    index: Tuple[array, array, List[str]],
+    low: int,
+    high: int
+) -> List[str]:
+    """
+    Find the shards overlapping the range [`low`, `high`], ordered by `stud_id_low`.
+    """
+
+    lows, sizes, shard_ids = index
+
+    # The shard containing `low` may start before it
+    start = max(bisect_right(lows, low) - 1, 0)
+    end = bisect_right(lows, high)
+
+    return [shard_ids[i]
+            for i in range(start, end)
+            if low < lows[i] + sizes[i]]
+# END find_shards_in_range
+
+
+def classify_stud_ids(
+    index: Tuple[array, array, List[str]],
+    stud_ids: List[int]
+) -> List[Optional[str]]:
+    """
+    Find the shard of every student id in one pass over the index.
+
+    The ids are visited in sorted order while a cursor walks the sorted shards,
+    so the batch costs one sort instead of one lookup per id.
+    Returns the shard of each id in input order, None if no shard contains it.
+    """
+
+    lows, sizes, shard_ids = index
+
+    result: List[Optional[str]] = [None] * len(stud_ids)
+
+    if len(lows) == 0:
+        return result
+
+    cursor = 0
+    for pos in sorted(range(len(stud_ids)), key=stud_ids.__getitem__):
+        stud_id = stud_ids[pos]
+
+        while cursor + 1 < len(lows) and lows[cursor + 1] <= stud_id:
+            cursor += 1
+
+        if lows[cursor] <= stud_id < lows[cursor] + sizes[cursor]:
+            result[pos] = shard_ids[cursor]
+    # END for pos in sorted(range(len(stud_ids)), key=stud_ids.__getitem__)
+
+    return result
+# END classify_stud_ids
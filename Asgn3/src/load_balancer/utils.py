@@ -41,3 +41,143 @@ def get_request_id():
 
     return random.randint(100000, 999999)
 # END get_request_id
+
+
+def encode_token(after: int):
+    """
+    Encode the continuation token of a paginated read, resuming after `after`.
+    """
+
+    return base64.urlsafe_b64encode(
+        json.dumps({'after': after}).encode()).decode()
+# END encode_token
+
+
+def decode_token(token: str):
+    """
+    Decode the student id to resume after from a continuation token.
+    """
+
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(token.encode()))['after'])
+    except Exception:
+        raise Exception('Invalid continuation `token`')
+# END decode_token
+
+
+# Connection counts of the shared http session, kept by its trace hooks [see `create_session`]
+session_counts: Dict[str, int] = {
+    'acquired': 0,
+    'queued': 0,
+    'created': 0,
+    'reused': 0,
+}
+
+
+def create_trace_config():
+    """
+    Count the connections of the shared http session with the tracing hooks of aiohttp.
+
+    `acquired` and `queued` are the connections held by requests and the requests
+    waiting for a free connection of the pool, until the request ends [for a streamed
+    response, once its headers are received]. `created` and `reused` are totals.
+    """
+
+    async def on_connection_queued_start(session: aiohttp.ClientSession,
+                                         ctx: Any, params: Any):
+        ctx.queued = True
+        session_counts['queued'] += 1
+
+    async def on_connection_queued_end(session: aiohttp.ClientSession,
+                                       ctx: Any, params: Any):
+        ctx.queued = False
+        session_counts['queued'] -= 1
+
+    async def on_connection_acquired(session: aiohttp.ClientSession,
+                                     ctx: Any, params: Any):
+        # a redirect acquires another connection for the same request
+        if not getattr(ctx, 'acquired', False):
+            session_counts['acquired'] += 1
+        ctx.acquired = True
+
+    async def on_connection_create_end(session: aiohttp.ClientSession,
+                                       ctx: Any, params: Any):
+        session_counts['created'] += 1
+        await on_connection_acquired(session, ctx, params)
+
+    async def on_connection_reuseconn(session: aiohttp.ClientSession,
+                                      ctx: Any, params: Any):
+        session_counts['reused'] += 1
+        await on_connection_acquired(session, ctx, params)
+
+    async def on_request_done(session: aiohttp.ClientSession,
+                              ctx: Any, params: Any):
+        # a request cancelled while queued never gets `queued_end`
+        if getattr(ctx, 'queued', False):
+            session_counts['queued'] -= 1
+        if getattr(ctx, 'acquired', False):
+            session_counts['acquired'] -= 1
+        ctx.queued = ctx.acquired = False
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_queued_start.append(on_connection_queued_start)
+    trace_config.on_connection_queued_end.append(on_connection_queued_end)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_request_end.append(on_request_done)
+    trace_config.on_request_exception.append(on_request_done)
+
+    return trace_config
+# END create_trace_config
+
+
+def create_session():
+    """
+    Create the http session shared by all the requests of this process.
+
+    Connections are kept alive and reused, and hostnames are resolved
+    once per `DNS_CACHE_TTL` seconds.
+    """
+
+    connector = aiohttp.TCPConnector(
+        limit=SESSION_LIMIT,
+        limit_per_host=SESSION_LIMIT_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+
+    return aiohttp.ClientSession(
+        connector=connector,
+        # bounds the tcp connect only, not the wait for a free connection of the pool
+        timeout=aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT),
+        trace_configs=[create_trace_config()],
+    )
+# END create_session
+
+
+def session_stats():
+    """
+    Get the connection stats of the shared http session.
+
+    Idle connections are not counted: aiohttp has no public hook for
+    a connection closed by the keep-alive timeout.
+    """
+
+    connector = common.session.connector
+
+    if connector is None:
+        return {
+            'limit': SESSION_LIMIT,
+            'limit_per_host': SESSION_LIMIT_PER_HOST,
+            'closed': True,
+            **session_counts,
+        }
+
+    return {
+        'limit': connector.limit,
+        'limit_per_host': connector.limit_per_host,
+        'closed': connector.closed,
+        **session_counts,
+    }
+# END session_stats
@@ -15,4 +15,35 @@ DB_PASSWORD = os.environ.get('POSTGRES_PASSWORD', 'postgres')
 DB_NAME = os.environ.get('POSTGRES_DB_NAME', 'postgres')
 
 # Primary to Secondary request timeout
-REQUEST_TIMEOUT = 1
\ No newline at end of file
+REQUEST_TIMEOUT = 1
+
+# acks of the secondaries the primary waits for on a write/update/delete: all, majority or primary
+WRITE_CONCERN = os.environ.get('WRITE_CONCERN', 'all').lower()
+
+# SQLSTATE raised by bookkeeping when a read reaches a replica behind its term
+REPLICA_BEHIND_SQLSTATE = 'LAG01'
+
+# times the primary retries an operation a secondary failed to ack in the background
+REPLICATION_RETRIES = int(os.environ.get('REPLICATION_RETRIES', 5))
+
+# delay before the first retry in seconds, doubled after each retry
+REPLICATION_RETRY_INTERVAL = float(os.environ.get('REPLICATION_RETRY_INTERVAL', 0.5))
+
+# max number of open connections in the shared http session
+SESSION_LIMIT = int(os.environ.get('SESSION_LIMIT', 100))
+
+# max number of open connections to a single host in the shared http session [0 for no limit]
+# [requests over it wait for a free connection, without timing out]
+SESSION_LIMIT_PER_HOST = int(os.environ.get('SESSION_LIMIT_PER_HOST', 10))
+
+# time to cache resolved hostnames in seconds
+DNS_CACHE_TTL = int(os.environ.get('DNS_CACHE_TTL', 10))
+
+# time to keep idle connections alive in seconds
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', 30))
+
+# interval between truncations of LogT below the watermarks in seconds
+LOG_TRUNCATE_INTERVAL = float(os.environ.get('LOG_TRUNCATE_INTERVAL', 10))
+
+# number of rows sent per chunk of a streamed read or copy
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 500))
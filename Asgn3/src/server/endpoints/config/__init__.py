@@ -1,6 +1,10 @@
 from quart import Blueprint
+from .checkpoint import blueprint as checkpoint_blueprint
 from .config import blueprint as config_blueprint
+from .epoch import blueprint as epoch_blueprint
 
 blueprint = Blueprint('config', __name__)
 
-blueprint.register_blueprint(config_blueprint)
\ No newline at end of file
+blueprint.register_blueprint(checkpoint_blueprint)
+blueprint.register_blueprint(config_blueprint)
+blueprint.register_blueprint(epoch_blueprint)
\ No newline at end of file
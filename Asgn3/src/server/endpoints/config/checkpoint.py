@@ -0,0 +1,152 @@
+from quart import Blueprint, jsonify, request
+
+import common
+from common import *
+
+blueprint = Blueprint('checkpoint', __name__)
+
+
+async def log_stats():
+    """
+        Log size and truncation of each shard
+
+        The applied index is the last log index executed on StudT,
+        which the shard manager takes the lowest of across the replicas of a shard
+    """
+
+    records = await common.pool.fetch('''--sql
+        SELECT t.shard_id, t.last_idx, t.executed,
+               COUNT(l.log_idx) AS entries, MIN(l.log_idx) AS first_idx
+        FROM TermT AS t
+        LEFT JOIN LogT AS l
+        ON l.shard_id = t.shard_id
+        GROUP BY t.shard_id, t.last_idx, t.executed;
+    ''')
+
+    return {
+        record['shard_id']: {
+            'applied': record['last_idx'] - (0 if record['executed'] else 1),
+            'entries': record['entries'],
+            'first_idx': record['first_idx'],
+            'last_idx': record['last_idx'],
+            'watermark': common.watermarks.get(record['shard_id'], 0),
+            'truncated': common.log_truncated.get(record['shard_id'], 0),
+            'truncate_rate': common.log_truncate_rate.get(record['shard_id'], 0.0),
+        } for record in records}
+# END log_stats
+
+
+async def truncate_logs():
+    """
+        Background task truncating LogT below the watermark of each shard
+
+        The entry at the watermark is kept, as it may still be the last entry
+        of the shard, which bookkeeping executes or rolls back.
+    """
+
+    await asyncio.sleep(0)
+
+    try:
+        while True:
+            await asyncio.sleep(LOG_TRUNCATE_INTERVAL)
+
+            for shard_id, watermark in list(common.watermarks.items()):
+                try:
+                    status = await common.pool.execute('''--sql
+                        DELETE FROM LogT
+                        WHERE shard_id = $1::TEXT
+                        AND log_idx < $2::INTEGER;
+                    ''', shard_id, watermark)
+
+                    # status is 'DELETE <count>'
+                    n_truncated = int(status.split()[-1])
+                    common.log_truncated[shard_id] = \
+                        common.log_truncated.get(shard_id, 0) + n_truncated
+                    common.log_truncate_rate[shard_id] = n_truncated / LOG_TRUNCATE_INTERVAL
+
+                    if DEBUG and n_truncated > 0:
+                        print(f'{Fore.CYAN}CHECKPOINT | '
+                              f'Truncated {n_truncated} log entries of {shard_id} '
+                              f'below {watermark}'
+                              f'{Style.RESET_ALL}',
+                              file=sys.stderr)
+
+                except Exception as e:
+                    err_payload(e)
+                # END try-except
+            # END for shard_id, watermark in list(common.watermarks.items())
+        # END while
+
+    except asyncio.CancelledError:
+        pass
+    # END try-except
+# END truncate_logs
+
+
+@blueprint.route('/checkpoint', methods=["POST"])
+async def checkpoint():
+    """
+        Sets the log watermarks published by the shard manager,
+        below which LogT is truncated in the background
+
+        Request payload:
+            "watermarks" : {"sh1": <log_idx1>, "sh2": <log_idx2>, ...}
+
+        Response payload:
+            "shards" : {"sh1": {"applied": <log_idx>, "entries": <count>, ...}, ...}
+            "status" : "success"
+
+        Error payload:
+            "status" : "error"
+            "message" : "error message"
+    """
+
+    try:
+        payload: dict = await request.get_json()
+        ic(payload)
+
+        # watermarks only move forward
+        for shard_id, watermark in dict(payload.get('watermarks', {})).items():
+            common.watermarks[shard_id] = max(common.watermarks.get(shard_id, 0),
+                                              int(watermark))
+
+        response_payload = {
+            'shards': await log_stats(),
+            'status': 'success'
+        }
+
+        return jsonify(ic(response_payload)), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
+# END checkpoint
+
+
+@blueprint.route('/log_stats', methods=["GET"])
+async def get_log_stats():
+    """
+        Returns the log size and truncation of each shard
+
+        Response payload:
+            "shards" : {"sh1": {"applied": <log_idx>, "entries": <count>,
+                                "first_idx": <log_idx>, "last_idx": <log_idx>,
+                                "watermark": <log_idx>, "truncated": <count>,
+                                "truncate_rate": <entries per second>}, ...}
+            "status" : "success"
+
+        Error payload:
+            "status" : "error"
+            "message" : "error message"
+    """
+
+    try:
+        response_payload = {
+            'shards': await log_stats(),
+            'status': 'success'
+        }
+
+        return jsonify(ic(response_payload)), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
+# END get_log_stats
@@ -10,11 +10,13 @@ blueprint = Blueprint('config', __name__)
 async def server_config():
     """
         Assigns the list of shards whose data the server must store
+        Shards already stored [the server restarted on its data volume] are kept
 
         Request payload:
             "shards" : ["sh0" , "sh1" , "sh2" ...]
 
         Response payload:
+            "terms"  : {"sh0": {"last_idx": <last_idx>, "executed": true/false}, ...}
             "status" : "success"
 
         Error payload:
@@ -35,11 +37,26 @@ async def server_config():
             async with conn.transaction():
                 stmt = await conn.prepare('''--sql
                     INSERT INTO TermT (shard_id)
-                    VALUES ($1::TEXT);
+                    VALUES ($1::TEXT)
+                    ON CONFLICT (shard_id) DO NOTHING;
                 ''')
 
                 await stmt.executemany((shard,) for shard in shard_list)
 
+                # report the log position of each shard, for the shard manager
+                # to catch the shards up from the log of another replica
+                records = await conn.fetch('''--sql
+                    SELECT shard_id, last_idx, executed
+                    FROM TermT
+                    WHERE shard_id = ANY($1::TEXT[]);
+                ''', shard_list)
+
+                response_payload['terms'] = {
+                    record['shard_id']: {
+                        'last_idx': record['last_idx'],
+                        'executed': record['executed']
+                    } for record in records}
+
         response_payload['status'] = 'success'
 
         return jsonify(ic(response_payload)), 200
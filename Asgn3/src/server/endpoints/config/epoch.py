@@ -0,0 +1,41 @@
+from quart import Blueprint, jsonify, request
+
+import common
+from common import *
+
+blueprint = Blueprint('epoch', __name__)
+
+
+@blueprint.route('/epoch', methods=["POST"])
+async def server_epoch():
+    """
+        Sets the latest routing epoch published by the shard manager
+
+        Request payload:
+            "epoch" : <epoch>
+
+        Response payload:
+            "epoch"  : <epoch>
+            "status" : "success"
+
+        Error payload:
+            "status" : "error"
+            "message" : "error message"
+    """
+
+    try:
+        payload: dict = await request.get_json()
+        ic(payload)
+
+        # epochs only move forward
+        common.epoch = max(common.epoch, int(payload.get("epoch", -1)))
+
+        response_payload = {
+            'epoch': common.epoch,
+            'status': 'success'
+        }
+
+        return jsonify(ic(response_payload)), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
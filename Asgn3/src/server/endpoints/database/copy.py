@@ -1,4 +1,4 @@
-from quart import Blueprint, jsonify, request
+from quart import Blueprint, Response, jsonify, request
 import common
 from common import *
 from .rules import bookkeeping
@@ -6,20 +6,108 @@ from .rules import bookkeeping
 blueprint = Blueprint('copy', __name__)
 
 
+def ndjson_line(obj: Dict[str, Any]):
+    return (json.dumps(obj) + '\n').encode()
+
+
+async def stream_shards(
+    shards: List[str],
+    terms: List[int],
+    since: List[Optional[int]]
+):
+    """
+        Stream the shards as NDJSON, one line per batch of `STREAM_CHUNK_SIZE` rows
+
+        For each shard, a header line followed by its batches of LogT rows and,
+        if copied in full, of StudT rows. The `end` line closes a complete stream.
+    """
+
+    # a single snapshot of all the shards
+    async with common.pool.acquire() as conn:
+        async with conn.transaction(isolation='repeatable_read', readonly=True):
+
+            for shard_id, term, log_idx in zip(shards, terms, since):
+                # the log holds every index after `log_idx`: catch up from it
+                if log_idx is not None:
+                    n_logs = await conn.fetchval('''--sql
+                        SELECT COUNT(*)
+                        FROM LogT
+                        WHERE shard_id = $1::TEXT
+                        AND log_idx > $2::INTEGER
+                        AND log_idx <= $3::INTEGER
+                        ''', shard_id, log_idx, term)
+
+                    if n_logs != term - log_idx:
+                        log_idx = None
+
+                yield ndjson_line({"shard": shard_id, "term": term, "since": log_idx})
+
+                cursor = await conn.cursor('''--sql
+                    SELECT log_idx, operation, stud_id, content
+                    FROM LogT
+                    WHERE shard_id = $1::TEXT
+                    AND log_idx > $2::INTEGER
+                    AND log_idx <= $3::INTEGER
+                    ORDER BY log_idx
+                    ''', shard_id, -1 if log_idx is None else log_idx, term)
+
+                while True:
+                    records = await cursor.fetch(STREAM_CHUNK_SIZE)
+                    if len(records) == 0:
+                        break
+
+                    yield ndjson_line({"shard": shard_id, "table": "LogT",
+                                       "rows": [list(record) for record in records]})
+
+                if log_idx is not None:
+                    continue
+
+                cursor = await conn.cursor('''--sql
+                    SELECT stud_id, stud_name, stud_marks
+                    FROM StudT
+                    WHERE shard_id = $1::TEXT
+                    ''', shard_id)
+
+                while True:
+                    records = await cursor.fetch(STREAM_CHUNK_SIZE)
+                    if len(records) == 0:
+                        break
+
+                    yield ndjson_line({"shard": shard_id, "table": "StudT",
+                                       "rows": [list(record) for record in records]})
+            # END for shard_id, term, log_idx in zip(shards, terms, since)
+
+    yield ndjson_line({"end": True})
+# END stream_shards
+
+
 @blueprint.route('/copy', methods=['GET'])
 async def copy():
     """
         Returns all data entries and log entries corresponding to the requested shard tables in the server container
+        A shard with a log index in `since` only gets its log entries after that index,
+        if the log still holds all of them, else all its data entries and log entries
 
         Request payload:
             "shards": ["sh1", "sh2", ...]
             "terms": [<term1>, <term2>, ...]
+            "since": [<log_idx1>/null, <log_idx2>/null, ...] (optional)
+            "stream": true/false (optional)
 
         Response payload:
-            "data"  : {"sh1": [data], "sh2": [data]}
+            "data"  : {"sh1": [data], ...} [only of the shards copied in full]
             "log"   : {"sh1": [log], "sh2": [log]}
+            "since" : {"sh2": <log_idx2>, ...} [only of the shards copied from the log]
             "status": "success"
 
+        Response payload [stream]:
+            NDJSON, one line per shard and per batch of rows (see `stream_shards`)
+            {"shard": "sh1", "term": <term1>, "since": null}
+            {"shard": "sh1", "table": "LogT", "rows": [[log_idx, operation, stud_id, content], ...]}
+            {"shard": "sh1", "table": "StudT", "rows": [[stud_id, stud_name, stud_marks], ...]}
+            ...
+            {"end": true}
+
         Error payload:
             "status": "error"
             "message": "error message"
@@ -32,16 +120,15 @@ async def copy():
         # decode payload
         shards: list[str] = list(payload.get('shards', []))
         terms: list[int] = list(payload.get('terms', []))
+        since: list[Optional[int]] = list(payload.get('since', [None] * len(shards)))
+        stream = str(payload.get('stream', 'false')).lower() == 'true'
 
         response_payload: Dict[str, Any] = {
             "data": {},
-            "log": {}
+            "log": {},
+            "since": {}
         }
 
-        for shard_id in shards:
-            response_payload["data"][shard_id] = []
-            response_payload["log"][shard_id] = []
-        
         tasks = [asyncio.create_task(bookkeeping(shard_id, term, "r"))
                  for shard_id, term in zip(shards, terms)]
 
@@ -50,31 +137,50 @@ async def copy():
         if any(res):
             raise Exception(f'Error in performing bookkeeping: {res}')
 
-        # perform bookkeeping on all shards, then get data from StudT and logs from LogT
+        if stream:
+            return Response(stream_shards(shards, terms, since), status=200,
+                            mimetype='application/x-ndjson')
+
+        # perform bookkeeping on all shards, then get logs from LogT and,
+        # for the shards not caught up from the log, data from StudT
         async with common.pool.acquire() as conn:
             async with conn.transaction():
 
                 stmt = await conn.prepare('''--sql
-                    SELECT stud_id, stud_name, stud_marks
-                    FROM StudT
+                    SELECT log_idx, operation, stud_id, content
+                    FROM LogT
                     WHERE shard_id = $1::TEXT
+                    AND log_idx > $2::INTEGER
+                    AND log_idx <= $3::INTEGER
+                    ORDER BY log_idx
                     ''')
 
-                for shard_id in shards:
-                    async for record in stmt.cursor(shard_id):
-                        record = dict(record)
-                        response_payload["data"][shard_id].append(record)
+                for shard_id, term, log_idx in zip(shards, terms, since):
+                    logs = [dict(log) for log in await stmt.fetch(
+                        shard_id, -1 if log_idx is None else log_idx, term)]
+
+                    # the log holds every index after `log_idx`: catch up from it
+                    if log_idx is not None and len(logs) == term - log_idx:
+                        response_payload["since"][shard_id] = log_idx
+                    elif log_idx is not None:
+                        logs = [dict(log) for log in await stmt.fetch(shard_id, -1, term)]
+
+                    response_payload["log"][shard_id] = logs
 
                 stmt = await conn.prepare('''--sql
-                    SELECT log_idx, operation, stud_id, content
-                    FROM LogT
+                    SELECT stud_id, stud_name, stud_marks
+                    FROM StudT
                     WHERE shard_id = $1::TEXT
                     ''')
 
                 for shard_id in shards:
-                    async for log in stmt.cursor(shard_id):
-                        log = dict(log)
-                        response_payload["log"][shard_id].append(log)
+                    if shard_id in response_payload["since"]:
+                        continue
+
+                    response_payload["data"][shard_id] = []
+                    async for record in stmt.cursor(shard_id):
+                        record = dict(record)
+                        response_payload["data"][shard_id].append(record)
 
         response_payload['status'] = 'success'
         return jsonify(ic(response_payload)), 200
@@ -0,0 +1,53 @@
+from quart import Blueprint, jsonify, request
+import common
+from common import *
+
+blueprint = Blueprint('log', __name__)
+
+
+@blueprint.route('/log', methods=['GET'])
+async def log():
+    """
+        Returns the committed log entries of a shard in a range of log indices, ordered by log_idx
+        Without bookkeeping, so that it neither executes nor rolls back an operation still replicating
+
+        Request payload:
+            "shard" : <shard_id>
+            "since" : <log_idx> [exclusive]
+            "until" : <log_idx> [inclusive]
+
+        Response payload:
+            "log"   : [[log_idx, operation, stud_id, content], ...]
+            "status": "success"
+
+        Error payload:
+            "status": "error"
+            "message": "error message"
+    """
+
+    try:
+        payload: dict = await request.get_json()
+        ic(payload)
+
+        # decode payload
+        shard_id = str(payload.get('shard', ""))
+        since = int(payload.get('since', -1))
+        until = int(payload.get('until', -1))
+
+        records = await common.pool.fetch('''--sql
+            SELECT log_idx, operation, stud_id, content
+            FROM LogT
+            WHERE shard_id = $1::TEXT
+            AND log_idx > $2::INTEGER
+            AND log_idx <= $3::INTEGER
+            ORDER BY log_idx;
+        ''', shard_id, since, until)
+
+        response_payload = {
+            "log": [list(record) for record in records],
+            "status": "success"
+        }
+        return jsonify(ic(response_payload)), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
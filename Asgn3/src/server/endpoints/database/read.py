@@ -1,4 +1,4 @@
-from quart import Blueprint, jsonify, request
+from quart import Blueprint, Response, jsonify, request
 import common
 from common import *
 from .rules import bookkeeping
@@ -9,12 +9,15 @@ blueprint = Blueprint('read', __name__)
 @blueprint.route('/read', methods=['GET'])
 async def read():
     """
-        Returns requested data entries from the server container
+        Returns requested data entries from the server container, ordered by stud_id
 
         Request payload:
             "shard"     : <shard_id>
             "term"      : <term>
             "stud_id"   : {"low": <low>, "high": <high>}
+            "limit"     : <max number of entries> (optional)
+            "stream"    : true/false (optional)
+            "epoch"     : <routing epoch> (optional)
 
         Response payload:
             "data"  : [{"Stud_id": <low>, ...},
@@ -22,6 +25,13 @@ async def read():
                       ...
                       {"Stud_id": <high>, ...}]
             "status": "success"
+
+        Response payload [stream]:
+            NDJSON, one {"stud_id": <id>, ...} entry per line
+
+        Error payload [503 if the replica is behind the term, 400 otherwise]:
+            "status": "failure"
+            "message": "error message"
     """
 
     try:
@@ -34,25 +44,61 @@ async def read():
         stud_id = dict(payload.get('stud_id', {}))
         id_low = int(stud_id.get('low', -1))
         id_high = int(stud_id.get('high', -1))
+        limit = payload.get('limit', None)
+        limit = None if limit is None else int(limit)
+        stream = str(payload.get('stream', 'false')).lower() == 'true'
+
+        # reject requests routed with an outdated routing table
+        if is_stale_epoch(payload):
+            return jsonify(ic(stale_epoch_payload())), 409
+
+        if stream:
+            # perform bookkeeping before streaming, so that errors are still reported
+            await bookkeeping(shard_id, term, "r")
+
+            async def stream_rows():
+                # pipe the rows from the cursor, a chunk at a time
+                async with common.pool.acquire() as conn:
+                    async with conn.transaction():
 
-        # perform bookkeeping
-        await bookkeeping(shard_id, term, "r")
+                        cursor = await conn.cursor('''--sql
+                            SELECT stud_id, stud_name, stud_marks
+                            FROM StudT
+                            WHERE shard_id = $1::TEXT
+                            AND stud_id BETWEEN $2::INTEGER AND $3::INTEGER
+                            ORDER BY stud_id
+                            LIMIT $4::INTEGER;
+                        ''', shard_id, id_low, id_high, limit)
 
-        # get data from StudT
+                        while True:
+                            records = await cursor.fetch(STREAM_CHUNK_SIZE)
+                            if len(records) == 0:
+                                break
+
+                            yield ''.join(json.dumps(dict(record)) + '\n'
+                                          for record in records).encode()
+
+            return Response(stream_rows(), status=200,
+                            mimetype='application/x-ndjson')
+
+        # perform bookkeeping, then get data from StudT
         response_payload = {'data': [], 'status': 'success'}
         async with common.pool.acquire() as conn:
             async with conn.transaction():
 
                 async for record in conn.cursor('''--sql
                     SELECT stud_id, stud_name, stud_marks
-                    FROM StudT
-                    WHERE shard_id = $1::TEXT
-                    AND stud_id BETWEEN $2::INTEGER AND $3::INTEGER;
-                ''', shard_id, id_low, id_high):
+                    FROM read_shard($1::TEXT, $2::INTEGER, $3::INTEGER, $4::INTEGER)
+                    LIMIT $5::INTEGER;
+                ''', shard_id, term, id_low, id_high, limit):
 
                     response_payload['data'].append(dict(record))
 
         return jsonify(ic(response_payload)), 200
 
     except Exception as e:
+        # the load balancer retries the read on the primary
+        if is_replica_behind(e):
+            return jsonify(ic(err_payload(e))), 503
+
         return jsonify(ic(err_payload(e))), 400
@@ -5,15 +5,50 @@ from common import *
 blueprint = Blueprint('recover', __name__)
 
 
+async def ndjson_lines(body: AsyncIterator[bytes]):
+    """
+        Split a streamed body into its NDJSON lines, as they arrive
+    """
+
+    # the chunks of the line not yet complete, joined only once it is
+    parts: List[bytes] = []
+    async for chunk in body:
+        if b'\n' not in chunk:
+            parts.append(chunk)
+            continue
+
+        head, *lines, tail = chunk.split(b'\n')
+        lines.insert(0, b''.join(parts) + head)
+        parts = [tail]
+
+        for line in lines:
+            if len(line) > 0:
+                yield line
+    # END async for chunk in body
+
+    line = b''.join(parts)
+    if len(line) > 0:
+        yield line
+# END ndjson_lines
+
+
 @blueprint.route('/recover', methods=['POST'])
 async def recover():
     """
         Copy entire StudT, LogT and accordingly update TermT
+        A shard with a log index in `since` keeps its entries up to that index, and
+        is caught up by applying the log entries after it in order
 
-        Request payload:
-            "data"  : {"sh1": [data], "sh2": [data], ...}
-            "log"   : {"sh1": [log], "sh2": [log], ...}
-            "term"  : {"sh1": <term>, "sh2": <term>, ...}
+        Each batch is bulk loaded with the COPY protocol as it arrives,
+        all in one transaction, which is only committed on the `end` line
+
+        Request payload [stream]:
+            NDJSON, as streamed by /copy
+            {"shard": "sh1", "term": <term1>, "since": <log_idx1>/null}
+            {"shard": "sh1", "table": "LogT", "rows": [[log_idx, operation, stud_id, content], ...]}
+            {"shard": "sh1", "table": "StudT", "rows": [[stud_id, stud_name, stud_marks], ...]}
+            ...
+            {"end": true}
 
         Response payload:
             "status": "success"
@@ -25,60 +60,74 @@ async def recover():
     """
 
     try:
-        payload: dict = await request.get_json()
-        ic(payload)
-
-        # decode payload
-        payload_data: dict = dict(payload.get("data", {}))
-        payload_log: dict = dict(payload.get("log", {}))
-        payload_term: dict = dict(payload.get("term", {}))
-
-        all_data = []
-        for shard_id, records in payload_data.items():
-            for record in records:
-                all_data.append(
-                    (record["stud_id"], record["stud_name"],
-                     record["stud_marks"], shard_id))
-
-        all_logs = []
-        for shard_id, logs in payload_log.items():
-            for log in logs:
-                all_logs.append(
-                    (log["log_idx"], shard_id,
-                     log["operation"], log["stud_id"],
-                     log["content"]))
-
-        # copy full StudT and LogT, update TermT accordingly
+        # header of each shard [shard_id -> {"term": <term>, "since": <log_idx>/null}]
+        headers: Dict[str, Dict[str, Any]] = {}
+        ended = False
+
         async with common.pool.acquire() as conn:
             async with conn.transaction():
-                # copy StudT
-                stmt = await conn.prepare('''--sql
-                    INSERT INTO StudT
-                    VALUES ($1::INTEGER,
-                            $2::TEXT,
-                            $3::INTEGER,
-                            $4::TEXT);
-                    ''')
-                await stmt.executemany(all_data)
-
-                # copy LogT
-                stmt = await conn.prepare('''--sql
-                    INSERT INTO LogT
-                    VALUES ($1::INTEGER,
-                            $2::TEXT,
-                            $3::TEXT,
-                            $4::INTEGER,
-                            $5::JSON);                
-                    ''')
-                await stmt.executemany(all_logs)
-
-                stmt = await conn.prepare('''--sql
+                async for line in ndjson_lines(request.body):
+                    item: Dict[str, Any] = json.loads(line)
+
+                    # only a stream whose last line is the end line is complete
+                    ended = bool(item.get('end', False))
+                    if ended:
+                        continue
+
+                    shard_id = str(item['shard'])
+
+                    if 'table' not in item:
+                        headers[shard_id] = item
+
+                        # drop what is left of a shard copied in full [from the data volume]
+                        # and the log entries after `since` [never executed]
+                        if item['since'] is None:
+                            await conn.execute('''--sql
+                                DELETE FROM StudT
+                                WHERE shard_id = $1::TEXT;
+                                ''', shard_id)
+
+                        await conn.execute('''--sql
+                            DELETE FROM LogT
+                            WHERE shard_id = $1::TEXT
+                            AND log_idx > $2::INTEGER;
+                            ''', shard_id, -1 if item['since'] is None else item['since'])
+
+                    elif item['table'] == 'LogT':
+                        # copy LogT
+                        await conn.copy_records_to_table(
+                            'logt',
+                            records=[(log_idx, shard_id, operation, stud_id, content)
+                                     for log_idx, operation, stud_id, content in item['rows']],
+                            columns=['log_idx', 'shard_id', 'operation', 'stud_id', 'content'])
+
+                        # apply the log entries of a shard caught up from the log
+                        if headers[shard_id]['since'] is not None:
+                            await conn.executemany('''--sql
+                                SELECT apply_op($1::TEXT, $2::TEXT, $3::INTEGER,
+                                                COALESCE($4::JSON, '{}'::JSON));
+                                ''', [(shard_id, operation, stud_id, content)
+                                      for _, operation, stud_id, content in item['rows']])
+
+                    elif item['table'] == 'StudT':
+                        # copy StudT
+                        await conn.copy_records_to_table(
+                            'studt',
+                            records=[(stud_id, stud_name, stud_marks, shard_id)
+                                     for stud_id, stud_name, stud_marks in item['rows']],
+                            columns=['stud_id', 'stud_name', 'stud_marks', 'shard_id'])
+                # END async for line in ndjson_lines(request.body)
+
+                # a stream cut short must not be committed
+                if not ended:
+                    raise Exception('Stream ended before the end line')
+
+                await conn.executemany('''--sql
                     UPDATE TermT
                     SET last_idx = $2::INTEGER,
                         executed = TRUE
                     WHERE shard_id = $1::TEXT;
-                    ''')
-                await stmt.executemany(payload_term.items())
+                    ''', [(shard_id, header['term']) for shard_id, header in headers.items()])
 
         response_payload = {
             "status": 200,
@@ -0,0 +1,264 @@
+import aiohttp
+
+import common
+from common import *
+
+
+def required_acks(n_secondaries: int):
+    """
+        Number of secondary acks the primary waits for, as per `WRITE_CONCERN`
+
+        all      : every secondary
+        majority : a majority of the replicas, counting the primary itself
+        primary  : none
+    """
+
+    if WRITE_CONCERN == 'primary':
+        return 0
+
+    if WRITE_CONCERN == 'majority':
+        return (n_secondaries + 1) // 2
+
+    return n_secondaries
+# END required_acks
+
+
+def replication_done(task: asyncio.Task[None]):
+    common.replications.discard(task)
+    if not task.cancelled():
+        task.exception()
+
+
+async def redeliver(
+    send: Callable[[str], Awaitable[aiohttp.ClientResponse]],
+    server_name: str,
+    task: asyncio.Task[aiohttp.ClientResponse]
+):
+    """
+        Wait for the request to a secondary the primary did not wait for,
+        and retry it with backoff until the secondary acks
+
+        A secondary left behind fails the reads of the terms it missed, so it is
+        caught up here rather than on the next operation on the shard, which may
+        never come. A secondary that is still down after the retries is caught up
+        by the next operation, or by the copy when the shard manager respawns it.
+    """
+
+    for attempt in range(REPLICATION_RETRIES + 1):
+        try:
+            response = await (task if attempt == 0 else send(server_name))
+            if response.status == 200:
+                return
+
+        except Exception:
+            pass
+
+        await asyncio.sleep(REPLICATION_RETRY_INTERVAL * 2 ** attempt)
+    # END for attempt in range(REPLICATION_RETRIES + 1)
+
+    if DEBUG:
+        print(f'{Fore.RED}REPLICATE | '
+              f'Gave up on {server_name} after {REPLICATION_RETRIES} retries'
+              f'{Style.RESET_ALL}',
+              file=sys.stderr)
+# END redeliver
+
+
+async def replicate(
+    send: Callable[[str], Awaitable[aiohttp.ClientResponse]],
+    secondary_servers: List[str]
+):
+    """
+        Send the operation to the secondaries with `send`, and wait for
+        the acks required by the write concern
+
+        The other requests go on in the background, so that the secondaries
+        still get the operation, but the primary does not wait for them.
+        A secondary that fails to ack is retried in the background [see redeliver].
+
+        Raises an exception as soon as too many secondaries failed to ack,
+        and cancels the requests left.
+    """
+
+    tasks = {asyncio.create_task(send(server_name)): server_name
+             for server_name in secondary_servers}
+
+    n_required = required_acks(len(tasks))
+    acks = 0
+    pending: Set[asyncio.Task[aiohttp.ClientResponse]] = set(tasks)
+
+    try:
+        while acks < n_required:
+            if acks + len(pending) < n_required:
+                raise Exception(
+                    f'Failed to write to {n_required} secondary servers ({WRITE_CONCERN})')
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result().status == 200:
+                    acks += 1
+        # END while acks < n_required
+
+    except BaseException:
+        # the next operation on the shard reuses the term, so the requests
+        # left must not reach a secondary after it
+        for task in pending:
+            task.cancel()
+        raise
+
+    # keep a reference to the requests left and to the retries, until they are done
+    for task, server_name in tasks.items():
+        if task.done() and task.exception() is None and task.result().status == 200:
+            continue
+
+        retry = asyncio.create_task(redeliver(send, server_name, task))
+        common.replications.add(retry)
+        retry.add_done_callback(replication_done)
+# END replicate
+
+
+async def log_digest(
+    conn: asyncpg.Connection,
+    shard_id: str,
+    log_idx: int
+) -> Optional[str]:
+    """
+        Digest of the log entry at `log_idx`, null if there is none
+    """
+
+    return await conn.fetchval('''--sql
+        SELECT log_digest($1::TEXT, $2::INTEGER);
+    ''', shard_id, log_idx)
+# END log_digest
+
+
+async def get_log_wrapper(
+    session: aiohttp.ClientSession,
+    server_name: str,
+    json_payload: dict
+):
+    # To allow other tasks to run
+    await asyncio.sleep(0)
+
+    async with session.get(f'http://{server_name}:5000/log',
+                           json=json_payload) as response:
+        await response.read()
+
+    return response
+
+
+async def catch_up(
+    conn: asyncpg.Connection,
+    shard_id: str,
+    term: int,
+    sources: List[str],
+    prev_digest: Optional[str],
+    is_primary: bool
+):
+    """
+        Catch a replica up with the log of the other replicas before logging `term`
+
+        A secondary left behind by a write concern other than `all` may have
+        missed entries before `term`, or logged an attempt that was retried
+        without it. The entries after the last one applied are then replaced
+        by those of the primary [`sources`] and applied, so that the bookkeeping
+        of `term` finds the shard at `term - 1`, as it does on the primary.
+
+        A primary elected among such replicas only catches up the entries it
+        missed, from the first of the secondaries [`sources`] that has them all.
+
+        Returns false if a secondary already has `term` in its log, i.e. the operation
+        arrived after a later one had caught it up.
+
+        Runs inside the transaction of the operation, with the row of the shard
+        in TermT locked, so that a single catch up runs at a time.
+    """
+
+    record = await conn.fetchrow('''--sql
+        SELECT last_idx, executed, log_digest(shard_id, last_idx) AS digest
+        FROM TermT
+        WHERE shard_id = $1::TEXT
+        FOR UPDATE;
+    ''', shard_id)
+
+    if record is None:
+        raise Exception(f'Shard {shard_id} not found')
+
+    last_idx: int = record['last_idx']
+    executed: bool = record['executed']
+
+    # already caught up past `term`
+    if term < last_idx and not is_primary:
+        return False
+
+    # a retry of the last entry, which bookkeeping rolls back, or the next entry
+    # after one that is either applied or the same as on the primary
+    if term <= last_idx or (term == last_idx + 1 and
+                            (executed or is_primary or record['digest'] == prev_digest)):
+        return True
+
+    since = last_idx if executed else last_idx - 1
+
+    # read the log without bookkeeping, which would roll back the entry of `term`
+    # committed on the primary [entries up to `term - 1` are committed by the load balancer]
+    logs: Optional[List[List[Any]]] = None
+    for source in sources:
+        try:
+            response = await get_log_wrapper(
+                session=common.session,
+                server_name=source,
+                json_payload={
+                    "shard": shard_id,
+                    "since": since,
+                    "until": term - 1
+                }
+            )
+
+            if response.status == 200:
+                logs = (await response.json())['log']
+
+        except Exception:
+            logs = None
+
+        if logs is not None and len(logs) == term - 1 - since:
+            break
+
+        logs = None
+    # END for source in sources
+
+    if logs is None:
+        raise Exception(f'Failed to get the log of {shard_id} after {since} from {sources}')
+
+    if DEBUG:
+        print(f'{Fore.LIGHTYELLOW_EX}CATCHUP | '
+              f'{shard_id} from {source}: {since} -> {term - 1}'
+              f'{Style.RESET_ALL}',
+              file=sys.stderr)
+
+    await conn.execute('''--sql
+        DELETE FROM LogT
+        WHERE shard_id = $1::TEXT
+        AND log_idx > $2::INTEGER;
+    ''', shard_id, since)
+
+    await conn.copy_records_to_table(
+        'logt',
+        records=[(log_idx, shard_id, operation, stud_id, content)
+                 for log_idx, operation, stud_id, content in logs],
+        columns=['log_idx', 'shard_id', 'operation', 'stud_id', 'content'])
+
+    await conn.executemany('''--sql
+        SELECT apply_op($1::TEXT, $2::TEXT, $3::INTEGER,
+                        COALESCE($4::JSON, '{}'::JSON));
+    ''', [(shard_id, operation, stud_id, content)
+          for _, operation, stud_id, content in logs])
+
+    await conn.execute('''--sql
+        UPDATE TermT
+        SET last_idx = $2::INTEGER,
+            executed = TRUE
+        WHERE shard_id = $1::TEXT;
+    ''', shard_id, term - 1)
+
+    return True
+# END catch_up
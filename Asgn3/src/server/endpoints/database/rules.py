@@ -16,111 +16,15 @@ async def bookkeeping(
                 Else If ((term < last_idx) || (term == last_idx && op != "r")){
                     rollback
                 }
+
+        The rule runs inside the database as the `bookkeeping` function
+        (see init/init-db.sql), so it costs a single round trip.
     """
 
     try:
-        async with common.pool.acquire() as conn:
-            async with conn.transaction():  # perform bookkeeping by executing database operations
-
-                # get the term from TermT
-                term_row = await conn.fetchrow('''--sql
-                    SELECT *
-                    FROM TermT
-                    WHERE shard_id = $1::TEXT
-                    FOR UPDATE;  -- lock the row for update
-                ''', shard_id)
-
-                if term_row is None:
-                    raise Exception(f"Failed to performing bookkeeping")
-                last_idx = term_row["last_idx"]
-                executed = term_row["executed"]
-
-                # last write/update/delete was successful was not executed on database, so execute now
-                if (((term > last_idx) or (term == last_idx and op == "r")) and executed == False):
-
-                    # update TermT executed to True
-                    await conn.execute('''--sql
-                        UPDATE TermT
-                        SET executed = TRUE
-                        WHERE shard_id = $1::TEXT
-                    ''', shard_id)
-
-                    # get the log from LogT
-                    log_row = await conn.fetchrow('''--sql
-                        SELECT *
-                        FROM LogT
-                        WHERE shard_id = $1::TEXT
-                        AND log_idx = $2::INTEGER
-                    ''', shard_id, last_idx)
-
-                    if log_row is None:
-                        raise Exception(f"Failed to perform bookkeeping")
-
-                    ic(dict(log_row))
-
-                    operation = log_row["operation"]
-                    stud_id = log_row.get("stud_id")
-                    if stud_id is None:
-                        stud_id = -1
-                    content = log_row.get("content")
-                    if content is None:
-                        content = "{}"
-                    content = json.loads(content)
-
-                    # do different things for different operations
-                    # write
-                    if (operation == "w"):
-                        stmt = await conn.prepare('''--sql
-                            INSERT INTO StudT (stud_id , stud_name , stud_marks , shard_id)
-                            VALUES ($1::INTEGER,
-                                    $2::TEXT,
-                                    $3::INTEGER,
-                                    $4::TEXT);
-                        ''')
-                        await stmt.executemany([(
-                            int(key),
-                            str(content[key][0]),
-                            int(content[key][1]),
-                            shard_id
-                        ) for key in content])
-                    # update
-                    elif (operation == "u"):
-                        await conn.execute(
-                            '''--sql
-                            UPDATE StudT
-                            SET stud_name = $3::TEXT , stud_marks = $4::INTEGER
-                            WHERE shard_id = $1::TEXT
-                            AND stud_id = $2::INTEGER
-                        ''',
-                            shard_id, stud_id,
-                            str(content[str(stud_id)][0]),
-                            int(content[str(stud_id)][1]))
-                    # delete
-                    elif (operation == "d"):
-                        await conn.execute('''--sql
-                            DELETE FROM StudT
-                            WHERE stud_id = $1::INTEGER
-                        ''', stud_id)
-                    # read
-                    else:   # operation == "r"
-                        pass
-
-                # last write/update/delete was not successful, so rollback
-                elif ((term < last_idx) or (term == last_idx and op != "r")):
-
-                    # update TermT last_idx to last_idx-1 and executed to True
-                    await conn.execute('''--sql
-                        UPDATE TermT
-                        SET last_idx = $2::INTEGER , executed = TRUE
-                        WHERE shard_id = $1::TEXT
-                    ''', shard_id, last_idx-1)
-
-                    # delete last_idx log from LogT
-                    await conn.execute('''--sql
-                        DELETE FROM LogT
-                        WHERE shard_id = $1::TEXT
-                        AND log_idx = $2::INTEGER
-                    ''', shard_id, last_idx)
+        await common.pool.execute('''--sql
+            SELECT bookkeeping($1::TEXT, $2::INTEGER, $3::TEXT);
+        ''', shard_id, term, op)
 
     except Exception as e:
         raise e
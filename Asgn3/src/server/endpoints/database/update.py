@@ -3,8 +3,8 @@ from quart import Blueprint, jsonify, request
 
 import common
 from common import *
+from .replication import catch_up, log_digest, replicate
 
-from .rules import bookkeeping
 
 blueprint = Blueprint('update', __name__)
 
@@ -37,6 +37,9 @@ async def data_write():
             "data"              : {"stud_id": <stud_id>, "stud_name": <stud_name>, "stud_marks": <stud_marks>}
             "is_primary"        : true/false (optional)
             "secondary_servers" : ["server1", ...]
+            "primary"           : <hostname of the primary> (optional, set by the primary)
+            "prev_digest"       : <digest of the entry at term - 1 on the primary> (optional)
+            "epoch"             : <routing epoch> (optional)
 
         Response payload:
             "message": Data entry for stud_id:<stud_id> updated
@@ -53,76 +56,53 @@ async def data_write():
         data = dict(payload.get('data', {}))
         is_primary = str(payload.get('is_primary', 'false')).lower() == 'true'
         secondary_servers = list(payload.get('secondary_servers', []))
+        primary = payload.get('primary', None)
+        prev_digest = payload.get('prev_digest', None)
         stud_id = int(payload.get('stud_id', -1))
 
         content = {
             str(stud_id): [str(data["stud_name"]), int(data["stud_marks"])]}
 
-        # perform bookkeeping
-        await bookkeeping(shard_id, term, "u")
+        # reject requests routed with an outdated routing table
+        if is_stale_epoch(payload):
+            return jsonify(ic(stale_epoch_payload())), 409
 
-        # insert log into LogT and update TermT
+        # perform bookkeeping, then insert log into LogT and update TermT
         async with common.pool.acquire() as conn:
             async with conn.transaction():
 
-                check = conn.transaction()
-                await check.start()
-                try:
+                # a replica behind catches up first: a secondary from the primary,
+                # the primary from the secondaries, and a secondary skips an operation
+                # already in its log
+                sources = secondary_servers if is_primary else [] if primary is None else [str(primary)]
+                if len(sources) == 0 or await catch_up(conn, shard_id, term, sources,
+                                                       prev_digest, is_primary):
                     await conn.execute('''--sql
-                            UPDATE StudT
-                            SET stud_name = $3::TEXT , stud_marks = $4::INTEGER
-                            WHERE shard_id = $1::TEXT
-                            AND stud_id = $2::INTEGER
-                        ''',
-                        shard_id, stud_id,
-                        str(content[str(stud_id)][0]),
-                        int(content[str(stud_id)][1]))
-                finally:
-                    await check.rollback()
-
-                # add unexecuted term to TermT
-                await conn.execute('''--sql
-                    UPDATE TermT
-                    SET last_idx = $2 , executed = FALSE
-                    WHERE shard_id = $1
-                ''', shard_id, term)
-
-                # add latest log to LogT
-                await conn.execute('''--sql
-                    INSERT INTO LogT (log_idx , shard_id , operation , stud_id , content)
-                    VALUES ($1::INTEGER,
-                            $2::TEXT,
-                            $3::TEXT,
-                            $4::INTEGER,
-                            $5::JSON);
-                    ''', term, shard_id, "u", stud_id, json.dumps(content))
+                        SELECT log_operation($1::TEXT, $2::INTEGER, $3::TEXT, $4::INTEGER, $5::JSON);
+                    ''', shard_id, term, "u", stud_id, json.dumps(content))
 
                 if is_primary:
-                    timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
-                        tasks = [asyncio.create_task(
-                            update_put_wrapper(
-                                session=session,
-                                server_name=server_name,
-                                json_payload={
-                                    "shard": shard_id,
-                                    "term": term,
-                                    "stud_id": stud_id,
-                                    "data": data,
-                                    "is_primary": False
-                                }
-                            )
-                        ) for server_name in secondary_servers]
-
-                        serv_response = await asyncio.gather(*tasks, return_exceptions=True)
-                        serv_response = [None if isinstance(r, BaseException)
-                                         else r for r in serv_response]
-
-                        # If not all replicas are updated, then return an error
-                        for r in serv_response:
-                            if r is None or r.status != 200:
-                                raise Exception(
-                                    'Failed to write all data entries')
+                    prev_digest = await log_digest(conn, shard_id, term - 1)
+
+        # replicate once the entry is committed [see write]
+        if is_primary:
+            def send(server_name: str):
+                return update_put_wrapper(
+                    session=common.session,
+                    server_name=server_name,
+                    json_payload={
+                        "shard": shard_id,
+                        "term": term,
+                        "stud_id": stud_id,
+                        "data": data,
+                        "is_primary": False,
+                        "primary": HOSTNAME,
+                        "prev_digest": prev_digest
+                    }
+                )
+
+            # wait for the acks required by the write concern
+            await replicate(send, secondary_servers)
 
         # Send the response
         response_payload = {
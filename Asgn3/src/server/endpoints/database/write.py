@@ -3,8 +3,8 @@ from quart import Blueprint, jsonify, request
 
 import common
 from common import *
+from .replication import catch_up, log_digest, replicate
 
-from .rules import bookkeeping
 
 blueprint = Blueprint('write', __name__)
 
@@ -38,6 +38,9 @@ async def write():
                                    {"stud_id": <idn>, ...}]
             "is_primary"        : true/false (optional)
             "secondary_servers" : ["server1", ...]
+            "primary"           : <hostname of the primary> (optional, set by the primary)
+            "prev_digest"       : <digest of the entry at term - 1 on the primary> (optional)
+            "epoch"             : <routing epoch> (optional)
 
         Response payload:
             "message"   : Data entries added
@@ -54,80 +57,55 @@ async def write():
         data = list(payload.get('data', []))
         is_primary = str(payload.get('is_primary', 'false')).lower() == 'true'
         secondary_servers = list(payload.get('secondary_servers', []))
+        primary = payload.get('primary', None)
+        prev_digest = payload.get('prev_digest', None)
         content = {}
         for _data in data:
             content[str(_data["stud_id"])] = [
                 str(_data["stud_name"]), int(_data["stud_marks"])]
 
-        # perform bookkeeping
-        await bookkeeping(shard_id, term, "w")
+        # reject requests routed with an outdated routing table
+        if is_stale_epoch(payload):
+            return jsonify(ic(stale_epoch_payload())), 409
 
-        # insert log into LogT and update TermT
+        # perform bookkeeping, then insert log into LogT and update TermT
         async with common.pool.acquire() as conn:
             async with conn.transaction():
 
-                check = conn.transaction()
-                await check.start()
-                try:
-                    stmt = await conn.prepare('''--sql
-                            INSERT INTO StudT (stud_id , stud_name , stud_marks , shard_id)
-                            VALUES ($1::INTEGER,
-                                    $2::TEXT,
-                                    $3::INTEGER,
-                                    $4::TEXT);
-                        ''')
-
-                    await stmt.executemany([(
-                        int(key),
-                        str(content[key][0]),
-                        int(content[key][1]),
-                        shard_id
-                    ) for key in content])
-                finally:
-                    await check.rollback()
-
-                # add unexecuted term to TermT
-                await conn.execute('''--sql
-                    UPDATE TermT
-                    SET last_idx = $2 , executed = FALSE
-                    WHERE shard_id = $1
-                ''', shard_id, term)
-
-                # add latest log to LogT
-                await conn.execute('''--sql
-                    INSERT INTO LogT (log_idx , shard_id , operation , stud_id , content)
-                    VALUES ($1::INTEGER,
-                            $2::TEXT,
-                            $3::TEXT,
-                            NULL,
-                            $4::JSON);
-                    ''', term, shard_id, "w", json.dumps(content))
+                # a replica behind catches up first: a secondary from the primary,
+                # the primary from the secondaries, and a secondary skips an operation
+                # already in its log
+                sources = secondary_servers if is_primary else [] if primary is None else [str(primary)]
+                if len(sources) == 0 or await catch_up(conn, shard_id, term, sources,
+                                                       prev_digest, is_primary):
+                    await conn.execute('''--sql
+                        SELECT log_operation($1::TEXT, $2::INTEGER, $3::TEXT, NULL, $4::JSON);
+                    ''', shard_id, term, "w", json.dumps(content))
 
                 if is_primary:
-                    timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
-                        tasks = [asyncio.create_task(
-                            write_post_wrapper(
-                                session=session,
-                                server_name=server_name,
-                                json_payload={
-                                    "shard": shard_id,
-                                    "term": term,
-                                    "data": data,
-                                    "is_primary": False
-                                }
-                            )
-                        ) for server_name in secondary_servers]
-
-                        serv_response = await asyncio.gather(*tasks, return_exceptions=True)
-                        serv_response = [None if isinstance(r, BaseException)
-                                         else r for r in serv_response]
-
-                        # If not all replicas are updated, then return an error
-                        for r in serv_response:
-                            if r is None or r.status != 200:
-                                raise Exception(
-                                    'Failed to write all data entries')
+                    prev_digest = await log_digest(conn, shard_id, term - 1)
+
+        # replicate once the entry is committed, so that neither the connection nor
+        # the lock of the shard in TermT is held across the requests to the secondaries
+        # [the entry stays unexecuted until a later term, and bookkeeping rolls it back
+        # when the next operation on the shard reuses the term of a failed one]
+        if is_primary:
+            def send(server_name: str):
+                return write_post_wrapper(
+                    session=common.session,
+                    server_name=server_name,
+                    json_payload={
+                        "shard": shard_id,
+                        "term": term,
+                        "data": data,
+                        "is_primary": False,
+                        "primary": HOSTNAME,
+                        "prev_digest": prev_digest
+                    }
+                )
+
+            # wait for the acks required by the write concern
+            await replicate(send, secondary_servers)
 
         # send success response
         response_payload = {
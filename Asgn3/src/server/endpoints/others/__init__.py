@@ -1,10 +1,12 @@
 from quart import Blueprint
 
+from .connections import blueprint as connections_blueprint
 from .heartbeat import blueprint as heartbeat_blueprint
 from .home import blueprint as home_blueprint
 
 blueprint = Blueprint('others', __name__)
 
 # Register blueprints
+blueprint.register_blueprint(connections_blueprint)
 blueprint.register_blueprint(heartbeat_blueprint)
 blueprint.register_blueprint(home_blueprint)
\ No newline at end of file
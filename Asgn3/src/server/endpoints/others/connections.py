@@ -0,0 +1,23 @@
+from quart import Blueprint, jsonify
+
+from common import *
+
+blueprint = Blueprint('connections', __name__)
+
+
+@blueprint.route('/connections', methods=['GET'])
+async def connections():
+    """
+    Return the connection stats of the shared http session.
+
+    Response payload:
+        limit: max number of open connections
+        limit_per_host: max number of open connections to a single host
+        closed: if the session is closed
+        acquired: number of connections held by requests
+        queued: number of requests waiting for a free connection
+        created: number of connections opened in total
+        reused: number of keep-alive connections reused in total
+    """
+
+    return jsonify(ic(session_stats())), 200
@@ -33,4 +33,191 @@ CREATE INDEX IF NOT EXISTS idx_studt_shard_id ON StudT (shard_id);
 
 -- Create the index for the log
 -- CREATE INDEX IF NOT EXISTS idx_logt_shard_id ON LogT (shard_id);
+
+-- Apply an operation of the log on StudT
+CREATE OR REPLACE FUNCTION apply_op(
+	p_shard_id TEXT,
+	p_op TEXT,
+	p_stud_id INTEGER,
+	p_content JSON
+) RETURNS VOID AS $$
+BEGIN
+	-- write
+	IF p_op = 'w' THEN
+		INSERT INTO StudT (stud_id, stud_name, stud_marks, shard_id)
+		SELECT entry.key::INTEGER,
+			entry.value->>0,
+			(entry.value->>1)::INTEGER,
+			p_shard_id
+		FROM json_each(p_content) AS entry;
+	-- update
+	ELSIF p_op = 'u' THEN
+		UPDATE StudT
+		SET stud_name = p_content->(p_stud_id::TEXT)->>0,
+			stud_marks = (p_content->(p_stud_id::TEXT)->>1)::INTEGER
+		WHERE shard_id = p_shard_id
+		AND stud_id = p_stud_id;
+	-- delete
+	ELSIF p_op = 'd' THEN
+		DELETE FROM StudT
+		WHERE stud_id = p_stud_id;
+	END IF;
+	-- read: nothing to apply
+END;
+$$ LANGUAGE plpgsql;
+
+-- Execute the last logged operation of the shard on StudT
+CREATE OR REPLACE FUNCTION execute_log(
+	p_shard_id TEXT,
+	p_log_idx INTEGER
+) RETURNS VOID AS $$
+DECLARE
+	log_row LogT%ROWTYPE;
+BEGIN
+	SELECT * INTO log_row
+	FROM LogT
+	WHERE shard_id = p_shard_id
+	AND log_idx = p_log_idx;
+
+	IF NOT FOUND THEN
+		RAISE EXCEPTION 'Failed to perform bookkeeping';
+	END IF;
+
+	PERFORM apply_op(p_shard_id, log_row.operation, log_row.stud_id, COALESCE(log_row.content, '{}'::JSON));
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bookkeeping for enforcing synchronization between shard replicas across servers
+-- If ((term > last_idx) || (term == last_idx && op == "r")) and not executed: execute
+-- Else If ((term < last_idx) || (term == last_idx && op != "r")): rollback
+CREATE OR REPLACE FUNCTION bookkeeping(
+	p_shard_id TEXT,
+	p_term INTEGER,
+	p_op TEXT
+) RETURNS VOID AS $$
+DECLARE
+	term_row TermT%ROWTYPE;
+BEGIN
+	-- fast path: check the term without locking the row
+	SELECT * INTO term_row
+	FROM TermT
+	WHERE shard_id = p_shard_id;
+
+	IF NOT FOUND THEN
+		RAISE EXCEPTION 'Failed to perform bookkeeping';
+	END IF;
+
+	-- a replica left behind by the write concern misses entries up to the term, so it
+	-- does not serve reads until the primary redelivers the operation or the next one
+	-- catches it up [the load balancer reads from the primary meanwhile]
+	IF p_op = 'r' AND p_term > term_row.last_idx THEN
+		RAISE EXCEPTION 'Replica is behind term % of the shard', p_term
+			USING ERRCODE = 'LAG01';
+	END IF;
+
+	IF NOT ((((p_term > term_row.last_idx) OR (p_term = term_row.last_idx AND p_op = 'r')) AND NOT term_row.executed)
+		OR (p_term < term_row.last_idx) OR (p_term = term_row.last_idx AND p_op <> 'r')) THEN
+		RETURN;
+	END IF;
+
+	-- slow path: lock the row and check again, as it may have changed in the meantime
+	SELECT * INTO term_row
+	FROM TermT
+	WHERE shard_id = p_shard_id
+	FOR UPDATE;
+
+	-- last write/update/delete was successful but not executed on database, so execute now
+	IF ((p_term > term_row.last_idx) OR (p_term = term_row.last_idx AND p_op = 'r')) AND NOT term_row.executed THEN
+		UPDATE TermT
+		SET executed = TRUE
+		WHERE shard_id = p_shard_id;
+
+		PERFORM execute_log(p_shard_id, term_row.last_idx);
+
+	-- last write/update/delete was not successful, so rollback
+	ELSIF (p_term < term_row.last_idx) OR (p_term = term_row.last_idx AND p_op <> 'r') THEN
+		UPDATE TermT
+		SET last_idx = term_row.last_idx - 1, executed = TRUE
+		WHERE shard_id = p_shard_id;
+
+		DELETE FROM LogT
+		WHERE shard_id = p_shard_id
+		AND log_idx = term_row.last_idx;
+	END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Append an unexecuted operation to the log of the shard
+-- The operation is dry run first, so that it fails now rather than on execution
+CREATE OR REPLACE FUNCTION append_log(
+	p_shard_id TEXT,
+	p_term INTEGER,
+	p_op TEXT,
+	p_stud_id INTEGER,
+	p_content JSON
+) RETURNS VOID AS $$
+BEGIN
+	-- dry run in a subtransaction, undone by raising a private error code
+	BEGIN
+		PERFORM apply_op(p_shard_id, p_op, p_stud_id, p_content);
+		RAISE SQLSTATE 'DRY01';
+	EXCEPTION
+		WHEN SQLSTATE 'DRY01' THEN
+			NULL;
+	END;
+
+	-- add unexecuted term to TermT
+	UPDATE TermT
+	SET last_idx = p_term, executed = FALSE
+	WHERE shard_id = p_shard_id;
+
+	-- add latest log to LogT
+	INSERT INTO LogT (log_idx, shard_id, operation, stud_id, content)
+	VALUES (p_term, p_shard_id, p_op, p_stud_id, p_content);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Digest of the log entry at an index, to check that two replicas logged the same operation
+CREATE OR REPLACE FUNCTION log_digest(
+	p_shard_id TEXT,
+	p_log_idx INTEGER
+) RETURNS TEXT AS $$
+	SELECT md5(operation || ':' || COALESCE(stud_id::TEXT, '') || ':' || COALESCE(content::TEXT, ''))
+	FROM LogT
+	WHERE shard_id = p_shard_id
+	AND log_idx = p_log_idx;
+$$ LANGUAGE sql STABLE;
+
+-- Bookkeeping and logging of a write/update/delete in one call
+CREATE OR REPLACE FUNCTION log_operation(
+	p_shard_id TEXT,
+	p_term INTEGER,
+	p_op TEXT,
+	p_stud_id INTEGER,
+	p_content JSON
+) RETURNS VOID AS $$
+BEGIN
+	PERFORM bookkeeping(p_shard_id, p_term, p_op);
+	PERFORM append_log(p_shard_id, p_term, p_op, p_stud_id, p_content);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bookkeeping and reading of a range of student ids in one call
+CREATE OR REPLACE FUNCTION read_shard(
+	p_shard_id TEXT,
+	p_term INTEGER,
+	p_low INTEGER,
+	p_high INTEGER
+) RETURNS TABLE (stud_id INTEGER, stud_name TEXT, stud_marks INTEGER) AS $$
+BEGIN
+	PERFORM bookkeeping(p_shard_id, p_term, 'r');
+
+	RETURN QUERY
+	SELECT s.stud_id, s.stud_name, s.stud_marks
+	FROM StudT AS s
+	WHERE s.shard_id = p_shard_id
+	AND s.stud_id BETWEEN p_low AND p_high
+	ORDER BY s.stud_id;
+END;
+$$ LANGUAGE plpgsql;
 COMMIT TRANSACTION;
@@ -3,6 +3,7 @@ from quart import Quart
 import common
 from common import *
 from endpoints import blueprint as endpoints_blueprint
+from endpoints.config.checkpoint import truncate_logs
 
 app = Quart(__name__)
 
@@ -17,6 +18,9 @@ async def my_startup():
         # Register blueprints
         app.register_blueprint(endpoints_blueprint)
 
+        # Truncate LogT below the watermarks in the background
+        app.add_background_task(truncate_logs)
+
         # Connect to the database
         common.pool = asyncpg.create_pool(
             user=DB_USER,
@@ -28,6 +32,9 @@ async def my_startup():
 
         await common.pool
 
+        # Shared http session with keep-alive connections
+        common.session = create_session()
+
     except Exception as e:
         print(f'{Fore.RED}ERROR | '
               f'{e.__class__.__name__}: {e}'
@@ -49,9 +56,20 @@ async def my_shutdown():
         Run shutdown tasks
     '''
 
+    # Stop the log truncation background task [if not already cancelled by quart]
+    while len(app.background_tasks) > 0:
+        app.background_tasks.pop().cancel()
+
+    # Stop the requests to the secondaries still in flight, and their retries
+    for task in list(common.replications):
+        task.cancel()
+
     # Close the database connection
     await common.pool.close()
 
+    # Close the shared http session
+    await common.session.close()
+
 
 if __name__ == '__main__':
     # Take port number from argument if provided
@@ -0,0 +1,115 @@
+from utils import *
+
+
+def compute_watermarks():
+    """
+    Compute the log watermark of each shard from the last reported log stats.
+
+    The watermark of a shard is the lowest applied log index across its replicas.
+    A shard with a replica that has not reported it yet gets no watermark.
+
+    Must be called with `common.lock` held.
+    """
+
+    shard_watermark.clear()
+
+    for shard, servers in shard_map.items():
+        applied = [log_stats.get(server, {}).get(shard, {}).get('applied')
+                   for server in servers.getServerList()]
+
+        if len(applied) > 0 and None not in applied:
+            shard_watermark[shard] = min(applied)
+    # END for shard, servers in shard_map.items()
+# END compute_watermarks
+
+
+async def checkpoint_logs():
+    """
+    Periodically publish the log watermarks to all the server replicas,
+    which truncate their logs below them, and collect their log stats.
+    """
+
+    global replicas
+
+    if DEBUG:
+        print(f'{Fore.CYAN}CHECKPOINT | '
+              'Log checkpoint background task started'
+              f'{Style.RESET_ALL}',
+              file=sys.stderr)
+
+    await asyncio.sleep(0)
+
+    async def post_checkpoint_wrapper(
+        semaphore: asyncio.Semaphore,
+        session: aiohttp.ClientSession,
+        server_name: str,
+        payload: Dict
+    ):
+        # Allow other tasks to run
+        await asyncio.sleep(0)
+
+        async with semaphore:
+            async with session.post(f'http://{server_name}:5000/checkpoint',
+                                    json=payload) as response:
+                await response.read()
+
+            return response
+        # END async with semaphore
+    # END post_checkpoint_wrapper
+
+    try:
+        while True:
+            # publish the watermarks every `CHECKPOINT_INTERVAL` seconds
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+
+            async with common.lock(Read):
+                compute_watermarks()
+
+                # Watermarks of the shards of each server replica
+                payloads = {
+                    server: {
+                        'watermarks': {shard: shard_watermark[shard]
+                                       for shard in server_shards.get(server, [])
+                                       if shard in shard_watermark}
+                    } for server in replicas.getServerList()}
+            # END async with common.lock(Read)
+
+            semaphore = asyncio.Semaphore(REQUEST_BATCH_SIZE)
+            session = common.session
+            tasks = [asyncio.create_task(
+                post_checkpoint_wrapper(
+                    semaphore,
+                    session,
+                    server_name,
+                    payload
+                )
+            ) for server_name, payload in payloads.items()]
+
+            responses = await asyncio.gather(*tasks, return_exceptions=True)
+            responses = [None if isinstance(response, BaseException)
+                         else response
+                         for response in responses]
+
+            async with common.lock(Write):
+                for server_name, response in zip(payloads.keys(), responses):
+                    # Keep the last stats of a server that did not answer
+                    # or was removed in the meantime
+                    if (response is None or response.status != 200 or
+                            server_name not in serv_ids):
+                        continue
+
+                    log_stats[server_name] = dict((await response.json())['shards'])
+                # END for server_name, response in zip(payloads.keys(), responses)
+            # END async with common.lock(Write)
+
+            ic(shard_watermark)
+        # END while
+
+    except asyncio.CancelledError:
+        if DEBUG:
+            print(f'{Fore.CYAN}CHECKPOINT | '
+                  'Log checkpoint background task stopped'
+                  f'{Style.RESET_ALL}',
+                  file=sys.stderr)
+    # END try-except
+# END checkpoint_logs
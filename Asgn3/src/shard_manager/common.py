@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+import math
 import random
 import sys
 import time
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
 import aiohttp
 import asyncpg
@@ -14,7 +15,7 @@ from fifolock import FifoLock
 from icecream import ic
 
 from consts import *
-from hash import ConsistentHashMap
+from hash import ConsistentHashMap, RingDelta, ServerIds, newRouter
 
 
 # Lock to protect the replicas list
@@ -25,6 +26,10 @@ lock = FifoLock()
 pool: asyncpg.Pool[asyncpg.Record]
 
 
+# Shared http session [created in `before_serving`]
+session: aiohttp.ClientSession
+
+
 # Configure icecream output
 ic.configureOutput(prefix='[LB] | ')
 
@@ -39,8 +44,17 @@ if DEBUG:
     random.seed(RANDOM_SEED)
 
 
+# Requests in flight to each server replica [for bounded loads]
+# Shared by `replicas` and all the maps in `shard_map`
+server_load: Dict[str, int] = {}
+
+
+# Interned server ids [16-bit], shared by `replicas` and all the maps in `shard_map`
+server_ids = ServerIds()
+
+
 # List to store web server replica hostnames
-replicas = ConsistentHashMap()
+replicas = newRouter(server_load, server_ids)
 
 
 # Map to store heartbeat fail counts for each server replica.
@@ -57,5 +71,23 @@ serv_ids: Dict[str, int] = {}
 shard_map: Dict[str, ConsistentHashMap] = {}
 
 
+# Server Name to the shards it holds [reverse index of `shard_map`]
+server_shards: Dict[str, List[str]] = {}
+
+
 # primary server for each shard
 shard_primary: Dict[str, str] = {}
+
+
+# Log stats last reported by each server replica for each of its shards
+# [server -> shard -> {"applied": <log_idx>, "entries": <count>, ...}]
+# Kept for a flatlined server, whose log entries are needed to catch it up
+log_stats: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+
+# Log watermark of each shard: lowest applied log index across its replicas
+shard_watermark: Dict[str, int] = {}
+
+
+# Routing epoch, bumped on every change to `shard_map` or `shard_primary`
+epoch: int = 0
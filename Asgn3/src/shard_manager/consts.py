@@ -6,6 +6,25 @@ DEBUG = os.environ.get('DEBUG', 'false').lower() == 'true'
 # which hash function to use
 HASH_NUM = int(os.environ.get('HASH_NUM', 0))
 
+# router mapping requests to servers: 'ring', 'rendezvous' or 'jump'
+ROUTER = os.environ.get('ROUTER', 'ring').lower()
+
+# consistent hash ring [router 'ring']: 'dense' (512 slots) or 'sparse' (2^32 keyspace)
+RING_MODE = os.environ.get('RING_MODE', 'dense').lower()
+
+# number of virtual copies of each server on the sparse ring
+SPARSE_VIRTUAL = int(os.environ.get('SPARSE_VIRTUAL', 100))
+
+# if consistent hashing with bounded loads is enabled
+BOUNDED_LOAD = os.environ.get('BOUNDED_LOAD', 'false').lower() == 'true'
+
+# a server takes at most (1 + LOAD_EPSILON) times the average load
+LOAD_EPSILON = float(os.environ.get('LOAD_EPSILON', 0.25))
+
+# max number of cached request id -> slot entries of the SHA-256 hash function,
+# per ring configuration [0 disables the cache]
+SLOT_CACHE_SIZE = int(os.environ.get('SLOT_CACHE_SIZE', 2**16))
+
 # max number of consecutive heartbeat fails
 MAX_HEARTBEAT_FAIL_COUNT = 5
 
@@ -24,6 +43,33 @@ STOP_TIMEOUT = 5
 # timeout for requests in seconds
 REQUEST_TIMEOUT = 1
 
+# max number of open connections in the shared http session
+SESSION_LIMIT = int(os.environ.get('SESSION_LIMIT', 100))
+
+# max number of open connections to a single host in the shared http session [0 for no limit]
+# [requests over it wait for a free connection, without timing out]
+SESSION_LIMIT_PER_HOST = int(os.environ.get('SESSION_LIMIT_PER_HOST', 10))
+
+# time to cache resolved hostnames in seconds
+DNS_CACHE_TTL = int(os.environ.get('DNS_CACHE_TTL', 10))
+
+# time to keep idle connections alive in seconds
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', 30))
+
+# max number of log entries a respawned replica may be behind on a shard
+# to catch up from the log of another replica, else the shard is copied in full
+CATCHUP_MAX_LOG = int(os.environ.get('CATCHUP_MAX_LOG', 1000))
+
+# last line of a complete NDJSON stream of /copy on a server
+STREAM_END_LINE = b'{"end": true}\n'
+
+# acks of the secondaries a primary waits for on a write/update/delete: all, majority or primary
+# [passed on to the servers]
+WRITE_CONCERN = os.environ.get('WRITE_CONCERN', 'all').lower()
+
+# interval between publishing the log watermarks to the servers in seconds
+CHECKPOINT_INTERVAL = float(os.environ.get('CHECKPOINT_INTERVAL', 30))
+
 # number of requests to send in a batch
 REQUEST_BATCH_SIZE = 20
 
@@ -28,6 +28,10 @@ async def add():
         Return an error message.
     If `n > remaining slots`:
         Return an error message.
+    If some weight in `weights` is not positive or not of a server in `servers`:
+        Return an error message.
+    If some shard has no slots left for its new servers by weight:
+        Return an error message.
     If `hostname` in `servers` already exists in `replicas`:
         Do not add any replicas to the list.
         Return an error message.
@@ -43,11 +47,13 @@ async def add():
             `shard_id: name of the shard`
             `shard_size: size of the shard`
         `servers: dict of server hostname -> list of shard names to add [new shard names must be define in `new_shards`]`
+        `weights: dict of server hostname -> capacity weight [optional, default 1]`
 
     `Response payload:`
         `message:`
             `N: number of replicas`
             `replicas: list of replica servers`
+            `moved: dict of shard name -> fraction of its ring that moved [ring routers only]`
         `status: status of the request`
 
     `Error payload:`
@@ -59,6 +65,7 @@ async def add():
     global heartbeat_fail_count
     global serv_ids
     global shard_map
+    global server_shards
     global shard_primary
 
     # Allow other tasks to run
@@ -82,6 +89,9 @@ async def add():
         servers: Dict[str, List[str]] = dict(payload.get('servers', {}))
         hostnames = list(servers.keys())
 
+        # Get the capacity weights of the servers
+        weights = get_weights(payload, hostnames)
+
         new_shards: List[Dict[str, Any]] = list(payload.get('new_shards', []))
 
         if len(hostnames) != n:
@@ -127,12 +137,15 @@ async def add():
                 raise Exception(
                     f'Shards `{problems}` are not defined in shard_map or new_shards')
 
+            # Check if the shards have the slots for the servers by weight
+            check_shard_slots(servers, weights)
+
             ic("To add: ", hostnames, new_shards)
 
             # Add the shards to the shard_locks and shard_map
             for shard in new_shard_ids:
                 # Change to ConsistentHashMap
-                shard_map[shard] = ConsistentHashMap()
+                shard_map[shard] = newRouter(common.server_load, common.server_ids)
 
                 shard_primary[shard] = ""
             # END for shard in new_shards
@@ -192,11 +205,18 @@ async def add():
             await asyncio.gather(*tasks, return_exceptions=True)
 
             # Update the shard_map with the new replicas
+            # and count the slots of each ring that move
+            moved: Dict[str, float] = {}
             for hostname in hostnames:
                 for shard in servers[hostname]:
-                    shard_map[shard].add(hostname, serv_ids[hostname])
+                    delta = shard_map[shard].add(hostname, serv_ids[hostname],
+                                                 weights[hostname])
+                    record_moved(moved, shard, delta)
+                    server_shards.setdefault(hostname, []).append(shard)
                 # END for shard in servers[hostname]
             # END for hostname in hostnames
+
+            log_moved(moved)
             
             elect_primary()
             ic(shard_primary)
@@ -225,6 +245,10 @@ async def add():
                 # END async with common.pool.acquire() as conn
             # END if len(new_shards) > 0
 
+            # Publish the new routing table
+            bump_epoch()
+            await broadcast_epoch()
+
             final_hostnames = ic(replicas.getServerList())
         # END async with common.lock(Write)
 
@@ -233,6 +257,7 @@ async def add():
             'message': {
                 'N': len(replicas),
                 'replicas': final_hostnames,
+                'moved': moved,
             },
             'status': 'success'
         })), 200
@@ -68,7 +68,10 @@ async def copy_shards_to_container(
     1. For each shard K in `shards`:
         1. Get server A from `shard_map` for the shard K
         1. Call /copy on server A to copy the shard K
-        1. Call /write on server S to write the shard K
+           [only the log entries after the last index of K on S, if S is
+           at most `CATCHUP_MAX_LOG` entries behind, e.g. a respawned server]
+        1. Call /recover on server S to write the shard K
+           [streamed from /copy to /recover in batches, never held whole]
 
     Args:
         - hostname: hostname of the server
@@ -114,34 +117,46 @@ async def copy_shards_to_container(
         # END async with semaphore
     # END post_config_wrapper
 
-    async def get_copy_wrapper(
+    async def stream_copies(
         session: aiohttp.ClientSession,
-        hostname: str,
-        payload: Dict,
+        payloads: Dict[str, Dict],
     ):
-        # Allow other tasks to run
-        await asyncio.sleep(0)
+        # Pipe the NDJSON streams of /copy of the servers A one after the other,
+        # a chunk at a time, without parsing them
+        for server, payload in payloads.items():
+            # Allow other tasks to run
+            await asyncio.sleep(0)
 
-        async with semaphore:
-            async with session.get(f'http://{hostname}:5000/copy',
+            async with session.get(f'http://{server}:5000/copy',
                                    json=payload) as response:
-                await response.read()
-
-            return response
-        # END async with semaphore
-    # END get_copy_wrapper
+                if response.status != 200:
+                    raise Exception(f'Failed to copy shards from {server}')
+
+                tail = b''
+                async for chunk in response.content.iter_any():
+                    tail = (tail + chunk)[-len(STREAM_END_LINE):]
+                    yield chunk
+
+                # A stream cut short ends the body before its end line,
+                # so that the server S does not commit it
+                if tail != STREAM_END_LINE:
+                    raise Exception(f'Incomplete copy of shards from {server}')
+            # END async with session.get
+        # END for server, payload in payloads.items()
+    # END stream_copies
 
     async def post_recover_wrapper(
         session: aiohttp.ClientSession,
         hostname: str,
-        payload: Dict,
+        data: AsyncIterator[bytes],
     ):
         # Allow other tasks to run
         await asyncio.sleep(0)
 
         async with semaphore:
             async with session.post(f'http://{hostname}:5000/recover',
-                                    json=payload) as response:
+                                    data=data,
+                                    headers={'Content-Type': 'application/x-ndjson'}) as response:
                 await response.read()
 
             return response
@@ -175,6 +190,12 @@ async def copy_shards_to_container(
                     while server in servers_flatlined:
                         server = shard_map[shard].find(get_request_id())
 
+                # only the primary is sure to have every entry, unless all the replicas ack
+                primary = shard_primary.get(shard, "")
+                if (WRITE_CONCERN != 'all' and primary not in ('', hostname)
+                        and primary not in servers_flatlined):
+                    server = primary
+
                 shard_valid_at: int = await stmt.fetchval(shard)
 
                 if server not in call_server_shards:
@@ -187,87 +208,81 @@ async def copy_shards_to_container(
 
     ic(call_server_shards)
 
-    timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        # Call /config endpoint on the server S with the hostname
-        config_task = asyncio.create_task(
-            post_config_wrapper(
-                session,
-                hostname,
-                payload={
-                    "shards": shards
-                }
-            )
+    session = common.session
+    # Call /config endpoint on the server S with the hostname
+    config_task = asyncio.create_task(
+        post_config_wrapper(
+            session,
+            hostname,
+            payload={
+                "shards": shards
+            }
         )
-        config_response = await asyncio.gather(*[config_task], return_exceptions=True)
-        config_response = (None if isinstance(config_response[0], BaseException)
-                           else config_response[0])
-
-        if config_response is None or config_response.status != 200:
-            raise Exception(f'Failed to add shards to {hostname}')
-
-        # Call /copy on server A to copy the shard K
-        # Define tasks
-        tasks = [asyncio.create_task(
-            get_copy_wrapper(
-                session,
-                server,
-                payload={
-                    "shards": [shard[0] for shard in shards],
-                    "terms": [shard[1] for shard in shards],
-                }
-            )
-        ) for server, shards in call_server_shards.items()]
-
-        # Wait for all tasks to complete
-        copy_responses = await asyncio.gather(*tasks, return_exceptions=True)
-        copy_responses = [None if isinstance(response, BaseException)
-                          else response
-                          for response in copy_responses]
-
-        # Get the data from the copy_responses [shard_id -> (list of data, valid_at)]
-        # all_data: Dict[str, Tuple[List, int]] = {}
-        all_data: Dict[str, Dict[str, Any]] = {
-            "data": {},
-            "log": {},
-            "term": {},
-        }
-
-        for (response, server_shards) in zip(copy_responses,
-                                             call_server_shards.values()):
-            if response is None or response.status != 200:
-                raise Exception(f'Failed to copy shards to {hostname}')
-
-            data: Dict = await response.json()
-
-            for shard_id, valid_at in server_shards:
-                # all_data[shard_id] = (data[shard_id], valid_at)
-                all_data["data"][shard_id] = data["data"][shard_id]
-                all_data["log"][shard_id] = data["log"][shard_id]
-                all_data["term"][shard_id] = valid_at
-        # END for (response, shards) in zip(copy_responses, call_server_shards.values())
-
-        ic(all_data)
-
-        # Call /write on server S to write the shard K
-        # Define tasks
-        tasks = [asyncio.create_task(
-            post_recover_wrapper(
-                session=session,
-                hostname=hostname,
-                payload=all_data,
-            )
-        )]
+    )
+    config_response = await asyncio.gather(*[config_task], return_exceptions=True)
+    config_response = (None if isinstance(config_response[0], BaseException)
+                       else config_response[0])
+
+    if config_response is None or config_response.status != 200:
+        raise Exception(f'Failed to add shards to {hostname}')
+
+    # Last log index of each shard on the server S [shard_id -> log index]
+    # An entry that was not executed may not have been committed, so it is fetched again
+    terms: Dict[str, Dict[str, Any]] = (await config_response.json()).get('terms', {})
+    last_idx: Dict[str, int] = {
+        shard_id: term['last_idx'] - (0 if term['executed'] else 1)
+        for shard_id, term in terms.items()}
+
+    def get_since(shard_id: str, valid_at: int):
+        # Copy in full if the server is too far behind or ahead of the shard
+        since = last_idx.get(shard_id, 0)
+        if since > valid_at or valid_at - since > CATCHUP_MAX_LOG:
+            return None
+
+        return since
+    # END get_since
+
+    # Call /copy on server A to copy the shard K
+    # and stream it to /recover on server S to write the shard K
+    payloads = {
+        server: {
+            "shards": [shard[0] for shard in shards],
+            "terms": [shard[1] for shard in shards],
+            "since": [get_since(*shard) for shard in shards],
+            "stream": True,
+        } for server, shards in call_server_shards.items()}
+
+    ic(payloads)
+
+    if len(payloads) == 0:
+        return
+
+    if DEBUG:
+        n_since = sum(since is not None
+                      for payload in payloads.values()
+                      for since in payload["since"])
+        print(f'{Fore.CYAN}CATCHUP | '
+              f'{hostname}: {n_since} of {len(shards)} shards asked from the log'
+              f'{Style.RESET_ALL}',
+              file=sys.stderr)
+
+    # Define tasks
+    tasks = [asyncio.create_task(
+        post_recover_wrapper(
+            session=session,
+            hostname=hostname,
+            data=stream_copies(session, payloads),
+        )
+    )]
 
-        # Wait for all tasks to complete
-        write_responses = await asyncio.gather(*tasks, return_exceptions=True)
-        write_responses = [None if isinstance(response, BaseException)
-                           else response
-                           for response in write_responses]
-        write_response = write_responses[0]
+    # Wait for all tasks to complete
+    write_responses = await asyncio.gather(*tasks, return_exceptions=True)
+    write_responses = [None if isinstance(response, BaseException)
+                       else response
+                       for response in write_responses]
+    write_response = write_responses[0]
 
-        if write_response is None or write_response.status != 200:
-            raise Exception(f'Failed to write shards to {hostname}')
+    if write_response is None or write_response.status != 200:
+        raise Exception(f'Failed to write shards to {hostname}')
 
-    # END async with aiohttp.ClientSession
 # END copy_shards_to_container
@@ -24,6 +24,10 @@ async def init():
         Return an error message.
     If `n > remaining slots`:
         Return an error message.
+    If some weight in `weights` is not positive or not of a server in `servers`:
+        Return an error message.
+    If some shard has no slots left for its new servers by weight:
+        Return an error message.
     If some shard for some server in `servers` does not exist in `shards`:
         Return an error message.
 
@@ -34,6 +38,7 @@ async def init():
             `shard_id: name of the shard`
             `shard_size: size of the shard`
         `servers: dict of server hostname -> list of shard names to add [new shard names must be define in `shards`]`
+        `weights: dict of server hostname -> capacity weight [optional, default 1]`
 
     `Response payload:`
         `message:`
@@ -50,6 +55,7 @@ async def init():
     global heartbeat_fail_count
     global serv_ids
     global shard_map
+    global server_shards
     global shard_primary
 
     # Allow other tasks to run
@@ -104,6 +110,9 @@ async def init():
         servers: Dict[str, List[str]] = dict(payload.get('servers', {}))
         hostnames = list(servers.keys())
 
+        # Get the capacity weights of the servers
+        weights = get_weights(payload, hostnames)
+
         new_shards: List[Dict[str, Any]] = list(payload.get('shards', []))
 
         if len(hostnames) != n:
@@ -136,12 +145,15 @@ async def init():
                 raise Exception(
                     f'Shards `{problems}` are not defined in new_shards')
 
+            # Check if the shards have the slots for the servers by weight
+            check_shard_slots(servers, weights)
+
             ic("To add: ", hostnames, new_shards)
 
             # Add the shards to the shard_locks and shard_map
             for shard in new_shard_ids:
                 # Change to ConsistentHashMap
-                shard_map[shard] = ConsistentHashMap()
+                shard_map[shard] = newRouter(common.server_load, common.server_ids)
 
                 shard_primary[shard] = ""
             # END for shard in new_shards
@@ -167,7 +179,8 @@ async def init():
 
                     # Update the shard_map with the new replicas
                     for shard in servers[hostname]:
-                        shard_map[shard].add(hostname, serv_id)
+                        shard_map[shard].add(hostname, serv_id, weights[hostname])
+                        server_shards.setdefault(hostname, []).append(shard)
                     # END for shard in servers[hostname]
 
                     tasks.append(
@@ -197,29 +210,28 @@ async def init():
 
             # config the new shards
             req_semaphore = asyncio.Semaphore(REQUEST_BATCH_SIZE)
-            timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                # Define tasks
-                tasks = [asyncio.create_task(
-                    post_config_wrapper(
-                        semaphore=req_semaphore,
-                        session=session,
-                        hostname=hostname,
-                        payload={
-                            "shards": servers[hostname]
-                        }
-                    )
-                ) for hostname in hostnames]
-
-                # Wait for all tasks to complete
-                config_responses = await asyncio.gather(*tasks, return_exceptions=True)
-                config_responses = [None if isinstance(response, BaseException)
-                                    else response
-                                    for response in config_responses]
-
-                for (hostname, response) in zip(hostnames, config_responses):
-                    if response is None or response.status != 200:
-                        raise Exception(f'Failed to add shards to {hostname}')
+            session = common.session
+            # Define tasks
+            tasks = [asyncio.create_task(
+                post_config_wrapper(
+                    semaphore=req_semaphore,
+                    session=session,
+                    hostname=hostname,
+                    payload={
+                        "shards": servers[hostname]
+                    }
+                )
+            ) for hostname in hostnames]
+
+            # Wait for all tasks to complete
+            config_responses = await asyncio.gather(*tasks, return_exceptions=True)
+            config_responses = [None if isinstance(response, BaseException)
+                                else response
+                                for response in config_responses]
+
+            for (hostname, response) in zip(hostnames, config_responses):
+                if response is None or response.status != 200:
+                    raise Exception(f'Failed to add shards to {hostname}')
 
             async with common.pool.acquire() as conn:
                 async with conn.transaction():
@@ -243,6 +255,10 @@ async def init():
                 # END async with conn.transaction()
             # END async with common.pool.acquire() as conn
 
+            # Publish the new routing table
+            bump_epoch()
+            await broadcast_epoch()
+
             final_hostnames = ic(replicas.getServerList())
         # END async with common.lock(Write)
 
@@ -39,6 +39,7 @@ async def rm():
         `message:`
             `N: number of replicas`
             `replicas: list of replica hostnames`
+            `moved: dict of shard name -> fraction of its ring that moved [ring routers only]`
         `status: status of the request`
 
     `Error payload:`
@@ -49,6 +50,7 @@ async def rm():
     global replicas
     global heartbeat_fail_count
     global shard_primary
+    global server_shards
 
     # Allow other tasks to run
     await asyncio.sleep(0)
@@ -89,9 +91,15 @@ async def rm():
 
         async with common.lock(Write):
 
-            for shard, servers in shard_map.items():
-                remaining = set(servers.getServerList()) - hostnames_set
-                if len(remaining) == 0:
+            # Count the servers to delete of each shard they hold
+            deleted: Dict[str, int] = {}
+            for hostname in hostnames:
+                for shard in server_shards.get(hostname, []):
+                    deleted[shard] = deleted.get(shard, 0) + 1
+            # END for hostname in hostnames
+
+            for shard, count in deleted.items():
+                if count == len(shard_map[shard]):
                     raise Exception(f'Cannot delete all servers. '
                                     f'Shard `{shard}` will be left without any server.')
 
@@ -105,6 +113,7 @@ async def rm():
 
             async def remove_container(
                 docker: Docker,
+                serv_id: int,
                 hostname: str
             ):
                 # Allow other tasks to run
@@ -125,6 +134,8 @@ async def rm():
                                   f'{Style.RESET_ALL}',
                                   file=sys.stderr)
 
+                        await delete_volume(docker, serv_id, hostname)
+
                     except Exception as e:
                         if DEBUG:
                             print(f'{Fore.RED}ERROR | '
@@ -139,6 +150,9 @@ async def rm():
                 # Define tasks
                 tasks = []
 
+                # Fraction of the ring of each shard that moves
+                moved: Dict[str, float] = {}
+
                 # Delete the hostnames from the list
                 for hostname in hostnames:
                     # Remove the server from the list
@@ -148,18 +162,20 @@ async def rm():
                     heartbeat_fail_count.pop(hostname, None)
 
                     # Remove the server id
-                    serv_ids.pop(hostname, None)
+                    serv_id = serv_ids.pop(hostname)
+
+                    # Forget the log of the server
+                    log_stats.pop(hostname, None)
 
                     # Remove server from shard_map
-                    for servers in shard_map.values():
-                        _servers = servers.getServerList().copy()
-                        if hostname in _servers:
-                            servers.remove(hostname)
+                    for shard in server_shards.pop(hostname, []):
+                        record_moved(moved, shard, shard_map[shard].remove(hostname))
 
                     tasks.append(
                         asyncio.create_task(
                             remove_container(
                                 docker,
+                                serv_id,
                                 hostname
                             )
                         )
@@ -170,17 +186,24 @@ async def rm():
                 await asyncio.gather(*tasks, return_exceptions=True)
             # END async with Docker
 
+            log_moved(moved)
+
+            elect_primary()
+            ic(shard_primary)
+
+            # Publish the new routing table
+            bump_epoch()
+            await broadcast_epoch()
+
             final_hostnames = ic(replicas.getServerList())
         # END async with common.lock(Write)
 
-        elect_primary()
-        ic(shard_primary)
-
         # Return the response payload
         return jsonify(ic({
             'message': {
                 'N': len(replicas),
-                'replicas': final_hostnames
+                'replicas': final_hostnames,
+                'moved': moved
             },
             'status': 'success'
         })), 200
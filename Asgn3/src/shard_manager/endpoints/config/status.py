@@ -20,6 +20,7 @@ async def status():
     global replicas
     global shard_map
     global serv_ids
+    global server_shards
 
     await asyncio.sleep(0)
 
@@ -48,18 +49,9 @@ async def status():
             for shard_info in shards:
                 shard_info['primary'] = shard_primary[shard_info['shard_id']]
 
-            servers_to_shards: Dict[str, List[str]] = {}
-            _shard_map = {k: v.getServerList() for k, v in shard_map.items()}
-
-            ic(_shard_map)
-
-            for shard, servers in _shard_map.items():
-                for server in servers:
-                    if server not in servers_to_shards.keys():
-                        servers_to_shards[server] = []
-                    servers_to_shards[server].append(shard)
-                # END for server in servers
-            # END for shard, servers in shard_map.items()
+            servers_to_shards: Dict[str, List[str]] = {
+                server: shards.copy()
+                for server, shards in server_shards.items()}
 
             ic(servers_to_shards)
 
@@ -1,12 +1,22 @@
 from quart import Blueprint
 
+from .connections import blueprint as connections_blueprint
 from .get_primary import blueprint as get_primary_blueprint
 from .get_server import blueprint as get_server_blueprint
 from .get_server_from_id import blueprint as get_server_from_id_blueprint
+from .log_stats import blueprint as log_stats_blueprint
+from .release_server import blueprint as release_server_blueprint
+from .resolve import blueprint as resolve_blueprint
+from .routing import blueprint as routing_blueprint
 
 blueprint = Blueprint('other', __name__)
 
 # Register the blueprints
+blueprint.register_blueprint(connections_blueprint)
 blueprint.register_blueprint(get_primary_blueprint)
 blueprint.register_blueprint(get_server_blueprint)
 blueprint.register_blueprint(get_server_from_id_blueprint)
+blueprint.register_blueprint(log_stats_blueprint)
+blueprint.register_blueprint(release_server_blueprint)
+blueprint.register_blueprint(resolve_blueprint)
+blueprint.register_blueprint(routing_blueprint)
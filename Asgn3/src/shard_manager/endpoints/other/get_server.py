@@ -8,6 +8,10 @@ blueprint = Blueprint('get_server', __name__)
 @blueprint.route('/get_server', methods=['GET'])
 async def get_server():
     """
+    If bounded loads are enabled:
+        The server is counted as having one more request in flight,
+        until the request is released with `/release_server`.
+
     `Request Payload`
         `shard`: str
         `request_id`: int
@@ -15,6 +19,7 @@ async def get_server():
     `Response Payload`
         `shard`: str
         `server`: str
+        `acquired`: bool [true if the request must be released]
 
     """
 
@@ -42,13 +47,19 @@ async def get_server():
 
     try:
         async with common.lock(Read):
+            hash_map = replicas if shard == "__all__" else shard_map[shard]
+            server = hash_map.find(request_id)
+
+            if BOUNDED_LOAD:
+                hash_map.acquire(server)
+
             if shard == "__all__":
-                server = replicas.find(request_id)
                 payload = {'server': server}
             else:
-                server = shard_map[shard].find(request_id)
                 payload = {'shard': shard, 'server': server}
 
+            payload['acquired'] = BOUNDED_LOAD
+
         return jsonify(ic(payload)), 200
 
     except Exception as e:
@@ -16,6 +16,7 @@ async def get_server_from_id(server_id: int):
 
     global serv_ids
     global shard_map
+    global server_shards
 
     await asyncio.sleep(0)
 
@@ -30,9 +31,7 @@ async def get_server_from_id(server_id: int):
             if server is None:
                 raise Exception('Server not found')
 
-            shards = [shard
-                      for shard, shard_map in shard_map.items()
-                      if server in set(shard_map.getServerList())]
+            shards = server_shards.get(server, []).copy()
 
             payload = {
                 'server_id': server_id,
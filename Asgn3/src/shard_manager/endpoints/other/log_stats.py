@@ -0,0 +1,48 @@
+from quart import Blueprint, jsonify
+
+from utils import *
+
+blueprint = Blueprint('log_stats', __name__)
+
+
+@blueprint.route('/log_stats', methods=['GET'])
+async def get_log_stats():
+    """
+    Return the log watermark of each shard and the log stats its replicas last reported.
+
+    `Response Payload`
+        `shards`: dict of shard name ->
+            `watermark`: lowest applied log index across the replicas [null if unknown]
+            `entries`: max number of log entries on a replica
+            `truncate_rate`: log entries truncated per second, summed over the replicas
+            `servers`: dict of server name ->
+                `applied`, `entries`, `first_idx`, `last_idx`,
+                `watermark`, `truncated`, `truncate_rate`
+    """
+
+    global shard_map
+
+    await asyncio.sleep(0)
+
+    try:
+        async with common.lock(Read):
+            shards: Dict[str, Dict[str, Any]] = {}
+
+            for shard, servers in shard_map.items():
+                stats = {server: log_stats[server][shard]
+                         for server in servers.getServerList()
+                         if shard in log_stats.get(server, {})}
+
+                shards[shard] = {
+                    'watermark': shard_watermark.get(shard),
+                    'entries': max((s['entries'] for s in stats.values()), default=0),
+                    'truncate_rate': sum(s['truncate_rate'] for s in stats.values()),
+                    'servers': stats,
+                }
+            # END for shard, servers in shard_map.items()
+
+        return jsonify(ic({'shards': shards})), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
+# END get_log_stats
@@ -0,0 +1,51 @@
+from quart import Blueprint, jsonify, request
+
+from utils import *
+
+blueprint = Blueprint('release_server', __name__)
+
+
+@blueprint.route('/release_server', methods=['POST'])
+async def release_server():
+    """
+    Count a request routed by `/get_server` as done [for bounded loads].
+
+    `Request Payload`
+        `server`: str
+
+    `Response Payload`
+        `server`: str
+        `load`: int [requests still in flight to the server]
+    """
+
+    await asyncio.sleep(0)
+
+    try:
+        request_json = await request.get_json()
+        if request_json is None:
+            raise Exception('Payload is empty')
+
+        # Convert the json response to dictionary
+        payload = dict(request_json)
+        ic(payload)
+
+        server = payload.get('server')
+
+        if server is None:
+            raise Exception('`server` field is required')
+
+        server = str(server)
+
+        # The load is shared by all the maps, so any map can release it
+        async with common.lock(Read):
+            replicas.release(server)
+            load = common.server_load.get(server, 0)
+
+        return jsonify(ic({
+            'server': server,
+            'load': load,
+        })), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
+# END release_server
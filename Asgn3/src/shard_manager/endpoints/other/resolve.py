@@ -0,0 +1,92 @@
+from quart import Blueprint, jsonify, request
+
+from utils import *
+
+blueprint = Blueprint('resolve', __name__)
+
+
+@blueprint.route('/resolve', methods=['POST'])
+async def resolve():
+    """
+    Resolve the servers for a batch of shards in one call.
+
+    If `mode` is `read`:
+        Return a server replica for the shard chosen with `request_id`,
+        and all the replicas of the shard.
+    If `mode` is `write`:
+        Return the primary and the secondary servers for the shard.
+
+    If some shard does not exist in `shard_map`:
+        Return an error message.
+    If some `mode` is not `read` or `write`:
+        Return an error message.
+
+    `Request Payload`
+        `shards`: list of [shard, request_id, mode]
+
+    `Response Payload`
+        `epoch`: int
+        `shards`: list of
+            `shard`: str
+            `server`: str [read mode]
+            `servers`: list of str [read mode]
+            `primary`: str [write mode]
+            `secondary`: list of str [write mode]
+    """
+
+    global shard_map
+    global shard_primary
+
+    await asyncio.sleep(0)
+
+    try:
+        request_json = await request.get_json()
+        if request_json is None:
+            raise Exception('Payload is empty')
+
+        # Convert the json response to dictionary
+        payload = dict(request_json)
+        ic(payload)
+
+        queries: List[Tuple[str, int, str]] = [
+            (str(shard), int(request_id), str(mode).lower())
+            for shard, request_id, mode in payload.get('shards', [])]
+
+        results: List[Dict[str, Any]] = []
+
+        # Take the lock once for the whole batch
+        async with common.lock(Read):
+            for shard, request_id, mode in queries:
+                if shard not in shard_map:
+                    raise Exception(f'Shard `{shard}` does not exist')
+
+                if mode == 'read':
+                    results.append({
+                        'shard': shard,
+                        'server': shard_map[shard].find(request_id),
+                        'servers': shard_map[shard].getServerList(),
+                    })
+                elif mode == 'write':
+                    primary = shard_primary[shard]
+                    results.append({
+                        'shard': shard,
+                        'primary': primary,
+                        'secondary': [server
+                                      for server in shard_map[shard].getServerList()
+                                      if server != primary],
+                    })
+                else:
+                    raise Exception(f'Invalid mode `{mode}`')
+            # END for shard, request_id, mode in queries
+
+            epoch = common.epoch
+        # END async with common.lock(Read)
+
+        return jsonify(ic({
+            'epoch': epoch,
+            'shards': results,
+        })), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
+# END resolve
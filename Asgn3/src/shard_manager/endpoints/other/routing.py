@@ -0,0 +1,49 @@
+from quart import Blueprint, jsonify
+
+from utils import *
+
+blueprint = Blueprint('routing', __name__)
+
+
+@blueprint.route('/routing', methods=['GET'])
+async def routing():
+    """
+    Return a snapshot of the routing table for the load balancer.
+
+    The servers of each shard are listed with their ids and weights, from which
+    the load balancer builds a ring of the same members. The slots of a server
+    depend on the slots probed past when it was added, so once servers were
+    removed the ring rebuilt by the load balancer may differ from this one, and
+    pick another replica for the same request id. Nothing relies on them picking
+    the same: reads are routed with random request ids, and writes to `primary`.
+
+    `Response Payload`
+        `epoch`: int
+        `shards`: dict of shard name ->
+            `primary`: str
+            `servers`: list of [hostname, server id, weight]
+    """
+
+    global shard_map
+    global shard_primary
+
+    await asyncio.sleep(0)
+
+    try:
+        async with common.lock(Read):
+            payload = {
+                'epoch': common.epoch,
+                'shards': {
+                    shard: {
+                        'primary': shard_primary[shard],
+                        'servers': [[hostname, hostid, servers.weights.get(hostname, 1)]
+                                    for hostname, hostid in servers.servers.items()],
+                    } for shard, servers in shard_map.items()
+                },
+            }
+
+        return jsonify(ic(payload)), 200
+
+    except Exception as e:
+        return jsonify(ic(err_payload(e))), 400
+# END routing
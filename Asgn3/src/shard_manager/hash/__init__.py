@@ -1,2 +1,4 @@
 from .hash_ds import *
+from .sparse_ds import *
+from .routers import *
 from .hash_functions import requestHashList, serverHashList
\ No newline at end of file
@@ -0,0 +1,246 @@
+# benchmark of batch lookups (find_many) against scalar lookups (find),
+# of adding/removing servers on growing rings, of the routers
+# of the hash functions and of the rings of thousands of shards
+# run from the service directory: python -m hash.benchmark
+
+
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+from consts import SLOT_CACHE_SIZE
+from .hash_ds import ConsistentHashMap, ServerIds
+from .hash_functions import requestHashList, serverHashList
+from .routers import JumpHashMap, RendezvousHashMap, routerMetrics
+from .sparse_ds import SparseConsistentHashMap
+
+
+N_SERVERS = 6
+SIZES = [10**3, 10**4, 10**5, 10**6]
+
+ADD_REMOVE_SLOTS = 2**16
+ADD_REMOVE_VIRTUAL = 9
+ADD_REMOVE_SERVERS = [10, 100, 500, 1000]
+
+ROUTER_SERVERS = [3, 6, 12, 24]
+ROUTER_REQUESTS = 20000
+
+HASH_REQUESTS = 100000
+# distinct ids of the repeated workload, which fits in the slot cache
+HASH_REPEATED_IDS = 10000
+
+SHARDS = 10000
+SHARD_REPLICAS = 5
+SHARD_SERVERS = 50
+SHARD_REQUESTS = 100000
+
+
+def lookupsPerSecond(lookup, request_ids: list[int]) -> float:
+    start = time.perf_counter()
+    lookup(request_ids)
+    return len(request_ids) / (time.perf_counter() - start)
+
+
+def benchmarkLookups():
+    random.seed(0)
+
+    for hash_num in range(len(requestHashList)):
+        ds = ConsistentHashMap(request_hash=requestHashList[hash_num],
+                               server_hash=serverHashList[hash_num])
+        for server_idx in range(N_SERVERS):
+            ds.add(f'Server-{server_idx + 1}', random.randint(100000, 999999))
+
+        print(f'Hash functions: Batch {hash_num}')
+        print(f'{"ids":>10} {"find (/s)":>14} {"find_many (/s)":>16} {"speedup":>9}')
+
+        for size in SIZES:
+            request_ids = [random.randint(100000, 999999) for _ in range(size)]
+
+            scalar = lookupsPerSecond(
+                lambda ids: [ds.find(request_id) for request_id in ids], request_ids)
+            batch = lookupsPerSecond(ds.find_many, request_ids)
+
+            print(f'{size:>10} {scalar:>14,.0f} {batch:>16,.0f} {batch / scalar:>8.1f}x')
+
+        print()
+
+
+def benchmarkAddRemove():
+    random.seed(0)
+
+    print('Add/remove of servers (linear probing, '
+          f'{ADD_REMOVE_SLOTS} slots, {ADD_REMOVE_VIRTUAL} virtual copies)')
+    print(f'{"servers":>10} {"vnodes":>10} {"add (ms)":>10} {"remove (ms)":>12}')
+
+    for n_servers in ADD_REMOVE_SERVERS:
+        ds = ConsistentHashMap(n_slots=ADD_REMOVE_SLOTS,
+                               n_virtual=ADD_REMOVE_VIRTUAL,
+                               probing='linear')
+        hostids = random.sample(range(100000, 999999), n_servers)
+
+        start = time.perf_counter()
+        for server_idx, hostid in enumerate(hostids):
+            ds.add(f'Server-{server_idx + 1}', hostid)
+        add_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for server_idx in range(n_servers):
+            ds.remove(f'Server-{server_idx + 1}')
+        remove_time = time.perf_counter() - start
+
+        print(f'{n_servers:>10} {n_servers * ADD_REMOVE_VIRTUAL:>10} '
+              f'{add_time * 1000 / n_servers:>10.3f} {remove_time * 1000 / n_servers:>12.3f}')
+
+    print()
+
+
+def benchmarkRouters():
+    random.seed(0)
+
+    # the rings with the SHA-256 pair, the others mix the request ids themselves
+    routers = {
+        'ring': lambda: ConsistentHashMap(request_hash=requestHashList[2],
+                                          server_hash=serverHashList[2]),
+        'sparse': lambda: SparseConsistentHashMap(request_hash=requestHashList[2],
+                                                  server_hash=serverHashList[2]),
+        'rendezvous': RendezvousHashMap,
+        'jump': JumpHashMap,
+    }
+
+    request_ids = [random.randint(100000, 999999) for _ in range(ROUTER_REQUESTS)]
+
+    print(f'Routers ({ROUTER_REQUESTS} request ids, moved = fraction of ids '
+          'changing server when adding one server, then removing another)')
+    print(f'{"router":>10} {"servers":>8} {"find (ns)":>10} {"find_many (ns)":>15} '
+          f'{"memory (B)":>11} {"moved add":>10} {"moved rm":>9}')
+
+    for n_servers in ROUTER_SERVERS:
+        for name, new_router in routers.items():
+            metrics = routerMetrics(new_router, n_servers, request_ids)
+            print(f'{name:>10} {n_servers:>8} {metrics["find_ns"]:>10.0f} '
+                  f'{metrics["find_many_ns"]:>15.0f} {metrics["memory"]:>11} '
+                  f'{metrics["moved_on_add"]:>10.3f} {metrics["moved_on_remove"]:>9.3f}')
+
+    print()
+
+
+def benchmarkHashes():
+    random.seed(0)
+
+    # random 6-digit ids as generated for the requests, and a workload
+    # repeating a smaller set of ids, as when clients retry or poll
+    request_ids = [random.randint(100000, 999999) for _ in range(HASH_REQUESTS)]
+    pool = random.sample(range(100000, 999999), HASH_REPEATED_IDS)
+    repeated_ids = [random.choice(pool) for _ in range(HASH_REQUESTS)]
+
+    print(f'Hash functions ({N_SERVERS} servers, {HASH_REQUESTS} lookups, '
+          'std = standard deviation of the requests per server or per slot / mean)')
+    print(f'{"batch":>14} {"find (ns)":>10} {"repeated (ns)":>14} '
+          f'{"load std":>9} {"slot std":>9}')
+
+    hashes = [(f'{hash_num}', hash_num, SLOT_CACHE_SIZE)
+              for hash_num in range(len(requestHashList))]
+    hashes.insert(2, ('2 (no cache)', 2, 0))
+
+    for name, hash_num, slot_cache in hashes:
+        ds = ConsistentHashMap(request_hash=requestHashList[hash_num],
+                               server_hash=serverHashList[hash_num],
+                               probing='linear',
+                               slot_cache=slot_cache)
+        for server_idx in range(N_SERVERS):
+            ds.add(f'Server-{server_idx + 1}', random.randint(100000, 999999))
+
+        times = []
+        for ids in (request_ids, repeated_ids):
+            # a fresh cache for each workload
+            if hasattr(ds.requestSlot, 'cache_clear'):
+                ds.requestSlot.cache_clear()
+
+            start = time.perf_counter()
+            for request_id in ids:
+                ds.find(request_id)
+            times.append((time.perf_counter() - start) * 1e9 / len(ids))
+
+        counts = [0] * N_SERVERS
+        for hostname in ds.find_many(request_ids):
+            counts[int(hostname.split('-')[1]) - 1] += 1
+        load_std = statistics.pstdev(counts) / statistics.mean(counts)
+
+        # spread of the requests over the slots, independent of the servers
+        slot_counts = [0] * ds.n_slots
+        for slot in ds.requestSlotMany(np.array(request_ids)).tolist():
+            slot_counts[slot] += 1
+        slot_std = statistics.pstdev(slot_counts) / statistics.mean(slot_counts)
+
+        print(f'{name:>14} {times[0]:>10.0f} {times[1]:>14.0f} '
+              f'{load_std:>9.3f} {slot_std:>9.3f}')
+
+    print()
+
+
+# the rings of the shard manager, one per shard, over a pool of servers
+def buildShards(servers: list[tuple[str, int]], server_ids: None | ServerIds):
+    load: dict[str, int] = {}
+    shard_map = {}
+    for shard_idx in range(SHARDS):
+        ring = ConsistentHashMap(load=load, server_ids=server_ids)
+        for hostname, hostid in random.sample(servers, SHARD_REPLICAS):
+            ring.add(hostname, hostid)
+        shard_map[f'sh{shard_idx}'] = ring
+
+    return shard_map
+
+
+def benchmarkShards():
+    random.seed(0)
+
+    servers = [(f'Server-{server_idx + 1}', hostid) for server_idx, hostid
+               in enumerate(random.sample(range(100000, 999999), SHARD_SERVERS))]
+    request_ids = [random.randint(100000, 999999) for _ in range(SHARD_REQUESTS)]
+
+    print(f'Shard maps ({SHARDS} shards, {SHARD_REPLICAS} of {SHARD_SERVERS} servers each, '
+          'memory = bytes allocated for the maps)')
+    print(f'{"server ids":>11} {"build (s)":>10} {"memory (MB)":>12} '
+          f'{"per shard (B)":>14} {"find (ns)":>10}')
+
+    for name, shared in (('shared', True), ('per ring', False)):
+        start = time.perf_counter()
+        shard_map = buildShards(servers, ServerIds() if shared else None)
+        build_time = time.perf_counter() - start
+
+        rings = list(shard_map.values())
+        start = time.perf_counter()
+        for request_id in request_ids:
+            rings[request_id % SHARDS].find(request_id)
+        find_ns = (time.perf_counter() - start) * 1e9 / len(request_ids)
+        del shard_map, rings
+
+        # built again with tracing, which slows the build down
+        tracemalloc.start()
+        shard_map = buildShards(servers, ServerIds() if shared else None)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del shard_map
+
+        print(f'{name:>11} {build_time:>10.2f} {memory / 1e6:>12.1f} '
+              f'{memory / SHARDS:>14.0f} {find_ns:>10.0f}')
+
+    # ru_maxrss is in KiB on Linux
+    print(f'peak resident memory {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3:.1f} MB')
+    print()
+
+
+def main():
+    benchmarkLookups()
+    benchmarkAddRemove()
+    benchmarkRouters()
+    benchmarkHashes()
+    benchmarkShards()
+
+
+if __name__ == '__main__':
+    main()
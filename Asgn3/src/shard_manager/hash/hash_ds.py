@@ -1,12 +1,205 @@
-from typing import Callable
+from array import array
+from typing import Callable, Iterable
 import bisect
+import math
+import sys
+
+import numpy as np
+
+from consts import HASH_NUM, SLOT_CACHE_SIZE
+from .hash_functions import (requestHashList, requestSlot, requestSlotMany,
+                             serverHashList, serverSlots)
+
+# in-flight load tracking for consistent hashing with bounded loads
+# a server may take at most ceil((1 + epsilon) * average load) requests,
+# requests beyond that walk clockwise to the next server below the bound
+# a server of weight w takes w times the share of a server of weight 1
+
+class BoundedLoads:
+
+    __slots__ = ('epsilon', 'load', 'weights')
+
+    # constructor
+    def __init__(
+        self,
+        epsilon: None | float = None,
+        load: None | dict[str, int] = None
+    ):
+        # allowed excess over the average load, None to disable the bound
+        self.epsilon = epsilon
+        # map: server-name -> requests in flight (may be shared between maps)
+        self.load: dict[str, int] = {} if load is None else load
+        # map: server-name -> capacity weight (only of the weights other than 1)
+        self.weights: dict[str, float] = {}
+
+    # count a request in flight to the server
+    def acquire(self, hostname: str):
+        self.load[hostname] = self.load.get(hostname, 0) + 1
+
+    # count a request to the server as done
+    def release(self, hostname: str):
+        if self.load.get(hostname, 0) > 0:
+            self.load[hostname] -= 1
+
+    # max number of requests in flight per unit weight a server may have to take one more
+    # Time Complexity : O(servers)
+    def capacity(self) -> float:
+        total = sum(self.load.get(hostname, 0) for hostname in self.servers)
+        total_weight = sum(self.weights.get(hostname, 1) for hostname in self.servers)
+        return (1 + self.epsilon) * (total + 1) / total_weight
+
+    # check if the server can take one more request, given the capacity per unit weight
+    def belowCapacity(self, hostname: str, capacity: float) -> bool:
+        return self.load.get(hostname, 0) < math.ceil(capacity * self.weights.get(hostname, 1))
+
+
+# owner id of the slots of an empty ring
+NO_OWNER = 0xFFFF
+
+
+# number of virtual copies of a server of the given capacity weight, at least one
+def virtualCopies(n_virtual: int, weight: float) -> int:
+    if weight <= 0:
+        raise ValueError("Weight must be positive")
+    return max(1, round(n_virtual * weight))
+
+
+# interned server ids, which may be shared by all the rings of a process
+# a hostname keeps the same small integer id for as long as some ring holds it,
+# so that the rings store 16-bit ids and every hostname is stored only once
+
+class ServerIds:
+
+    __slots__ = ('ids', 'by_hostid', 'names', 'hostids', 'refs', 'free', 'name_array')
+
+    # constructor
+    def __init__(self):
+        # map: server-name -> interned id
+        self.ids: dict[str, int] = {}
+        # map: server-id -> interned id
+        self.by_hostid: dict[int, int] = {}
+        # interned id -> server-name (None if freed), server-id and number of rings holding it
+        self.names: list[None | str] = []
+        self.hostids: list[int] = []
+        self.refs: list[int] = []
+        # interned ids freed by the servers no ring holds, to be reused
+        self.free: list[int] = []
+
+        # interned id -> server-name as an array, for batch lookups, built on demand
+        self.name_array: None | np.ndarray = None
+
+    # length
+    def __len__(self):
+        return len(self.ids)
+
+    # intern a server (by hostname and hostid) for one more ring
+    # Time Complexity : O(1)
+    def intern(self, hostname: str, hostid: int) -> int:
+        '''
+            If hostname or hostid is interned with another hostid or hostname: raise error
+            Else If no free id is left: raise error
+            Else return the interned id of the server, counting one more ring holding it
+        '''
+        server_id = self.ids.get(hostname)
+        if server_id is not None:
+            if self.hostids[server_id] != hostid:
+                raise KeyError("Hostname already present with another hostid")
+            self.refs[server_id] += 1
+            return server_id
+
+        if hostid in self.by_hostid:
+            raise KeyError("Hostid already present")
+
+        if len(self.free) > 0:
+            server_id = self.free.pop()
+            self.names[server_id] = hostname
+            self.hostids[server_id] = hostid
+            self.refs[server_id] = 1
+        elif len(self.names) < NO_OWNER:
+            server_id = len(self.names)
+            self.names.append(hostname)
+            self.hostids.append(hostid)
+            self.refs.append(1)
+        else:
+            raise RuntimeError("No server ids left")
+
+        self.ids[hostname] = server_id
+        self.by_hostid[hostid] = server_id
+        self.name_array = None
+        return server_id
+
+    # count one ring less holding a server, free its id if none holds it
+    # Time Complexity : O(1)
+    def drop(self, server_id: int):
+        self.refs[server_id] -= 1
+        if self.refs[server_id] > 0:
+            return
+
+        self.ids.pop(self.names[server_id])
+        self.by_hostid.pop(self.hostids[server_id])
+        self.names[server_id] = None
+        self.free.append(server_id)
+        self.name_array = None
+
+    # interned id -> server-name as an array
+    # Time Complexity : O(ids) when outdated, else O(1)
+    def nameArray(self) -> np.ndarray:
+        if self.name_array is None:
+            self.name_array = np.array(self.names, dtype=object)
+
+        return self.name_array
+
+    # memory footprint in bytes
+    def memory(self):
+        return (sys.getsizeof(self.ids) + sys.getsizeof(self.by_hostid) +
+                sys.getsizeof(self.names) + sys.getsizeof(self.hostids) +
+                sys.getsizeof(self.refs) + sys.getsizeof(self.free))
+
+
+# change of a ring: the slot ranges that moved, with their old and new owners
+# (None for no server), as returned by add, remove and diff of the rings
+RingDelta = list[tuple[range, None | str, None | str]]
+
+
+# the slots of the cyclic range (low, high] of a ring of n_slots slots,
+# as one range, or two if it wraps around (the whole ring if low == high)
+def cyclicRanges(low: int, high: int, n_slots: int) -> list[range]:
+    low = (low + 1) % n_slots
+    if low <= high:
+        return [range(low, high + 1)]
+
+    return [range(0, high + 1), range(low, n_slots)]
+
+
+# drop the unchanged ranges of a delta, sort the rest by slot
+# and merge the overlapping or adjacent ranges with the same owners
+def compactDelta(delta: RingDelta) -> RingDelta:
+    merged: RingDelta = []
+    for slot_range, old, new in sorted(delta, key=lambda change: change[0].start):
+        if old == new or len(slot_range) == 0:
+            continue
+
+        if len(merged) > 0:
+            last_range, last_old, last_new = merged[-1]
+            if last_old == old and last_new == new and slot_range.start <= last_range.stop:
+                merged[-1] = (range(last_range.start, max(last_range.stop, slot_range.stop)),
+                              old, new)
+                continue
+
+        merged.append((slot_range, old, new))
+
+    return merged
 
-from consts import HASH_NUM
-from .hash_functions import requestHashList, serverHashList
 
 # consistent hashing data structure
+# the servers are stored by their interned ids (ServerIds), 16-bit per slot,
+# with __slots__, so that thousands of rings (one per shard) stay small
+
+class ConsistentHashMap(BoundedLoads):
 
-class ConsistentHashMap:
+    __slots__ = ('requestHash', 'serverHash', 'requestSlot', 'requestSlotMany',
+                 'server_ids', 'members', 'next_server', 'n_slots', 'server_slots',
+                 'occupied', 'probing', 'n_virtual', 'owners')
 
     # constructor
     def __init__(
@@ -15,33 +208,58 @@ class ConsistentHashMap:
         server_hash: Callable[[int, int], int] = serverHashList[HASH_NUM],
         n_slots: int = 512,
         n_virtual: int = 9,
-        probing: str = 'quadratic'
+        probing: str = 'quadratic',
+        epsilon: None | float = None,
+        load: None | dict[str, int] = None,
+        slot_cache: int = SLOT_CACHE_SIZE,
+        server_ids: None | ServerIds = None
     ):
+        super().__init__(epsilon, load)
 
         # assign the hash functions
         self.requestHash = request_hash
         self.serverHash = server_hash
+        # request id(s) -> slot(s), memoized for the SHA-256 hash function
+        self.requestSlot = requestSlot(request_hash, n_slots, slot_cache)
+        self.requestSlotMany = requestSlotMany(request_hash, n_slots, slot_cache)
 
-        # map: server-name -> server-id
-        self.servers: dict[str, int] = {}
-        # map: server-name -> slots of virtual replicas
-        self.replicas: dict[str , list[int]] = {}
+        # interned ids of the servers (shared between rings if given)
+        self.server_ids = ServerIds() if server_ids is None else server_ids
+        # interned ids of the servers of the ring, in insertion order
+        self.members = array('H')
 
-        # id of next server
-        self.next_server: list[None | str] = [None] * n_slots
+        # interned id of next server (NO_OWNER if none)
+        self.next_server = array('H', [NO_OWNER]) * n_slots
         self.n_slots = n_slots
 
-        # slot numbers occupied by servers
-        self.server_slots = []
+        # slot numbers occupied by servers, in sorted order
+        self.server_slots = array('H' if n_slots <= 2**16 else 'L')
+        # occupancy bitmap of the slots
+        self.occupied = bytearray((n_slots + 7) // 8)
 
         self.probing = probing.lower()
 
         # number of virtual copies to keep
         self.n_virtual = n_virtual
 
+        # owner array for batch lookups, built on demand
+        # slot -> interned id of the next server
+        self.owners: None | np.ndarray = None
+
     # length
     def __len__(self):
-        return len(self.servers)
+        return len(self.members)
+
+    # map: server-name -> server-id, in insertion order
+    @property
+    def servers(self) -> dict[str, int]:
+        return {self.server_ids.names[server_id]: self.server_ids.hostids[server_id]
+                for server_id in self.members}
+
+    # check if a server (by hostname) is in the ring
+    def __contains__(self, hostname: str):
+        server_id = self.server_ids.ids.get(hostname)
+        return server_id is not None and server_id in self.members
 
     # probing function
     def probe(self, hashval: int, i: int):
@@ -50,83 +268,115 @@ class ConsistentHashMap:
 
         return hashval + i
 
+    # check if a slot is occupied by a server
+    def isOccupied(self, slot: int) -> bool:
+        return bool(self.occupied[slot >> 3] & (1 << (slot & 7)))
+
+    # mark a slot as occupied or free
+    def setOccupied(self, slot: int, occupied: bool):
+        if occupied:
+            self.occupied[slot >> 3] |= 1 << (slot & 7)
+        else:
+            self.occupied[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    # set the owner of the slots in the cyclic range (low, high]
+    def setOwner(self, low: int, high: int, owner_id: int):
+        low = (low + 1) % self.n_slots
+        if low <= high:
+            self.next_server[low:high + 1] = array('H', [owner_id]) * (high + 1 - low)
+        else:
+            self.next_server[low:] = array('H', [owner_id]) * (self.n_slots - low)
+            self.next_server[:high + 1] = array('H', [owner_id]) * (high + 1)
+
+    # owner (by hostname) of an interned id, None if no server
+    def ownerName(self, owner_id: int) -> None | str:
+        return None if owner_id == NO_OWNER else self.server_ids.names[owner_id]
+
     # add a server (by hostname and hostid)
-    # Time Complexity : O(n_slots * n_virtual)
-    def add(self, hostname: str, hostid: int):
+    # the server gets n_virtual * weight virtual copies
+    # Time Complexity : O(n_virtual * (probes + log(n_slots))) plus the filled slots
+    def add(self, hostname: str, hostid: int, weight: float = 1) -> RingDelta:
         '''
-            If empty slots < n_virtual, cannot add new server: raise error
+            If empty slots < virtual copies, cannot add new server: raise error
             Else If server's hostname or hostid is present, cannot duplicate: raise error
-            Else add all virtual copies of the server to the slots
+            Else add all virtual copies of the server to the slots,
+            return the slot ranges that moved to the server
         '''
-        if self.n_slots - len(self.server_slots) < self.n_virtual:
+        n_copies = virtualCopies(self.n_virtual, weight)
+        if self.n_slots - len(self.server_slots) < n_copies:
             raise RuntimeError("Insufficient slots to add new server")
-        if hostname in self.servers.keys():
+        if hostname in self:
             raise KeyError("Hostname already present")
-        if hostid in self.servers.values():
+        if self.server_ids.by_hostid.get(hostid, NO_OWNER) in self.members:
             raise KeyError("Hostid already present")
 
-        self.servers[hostname] = hostid
-        self.replicas[hostname] = []
+        owner_id = self.server_ids.intern(hostname, hostid)
+        self.members.append(owner_id)
+        if weight != 1:
+            self.weights[hostname] = weight
+        self.owners = None
 
-        for virtual_idx in range(self.n_virtual):
-            server_hash = (self.serverHash(
-                hostid, virtual_idx + 1)) % self.n_slots
+        delta: RingDelta = []
+        for server_hash in serverSlots(self.serverHash, hostid, n_copies, self.n_slots):
             # Probe if there is collision
             i = 0
             slot = server_hash
-            while slot in self.server_slots:
+            while self.isOccupied(slot):
                 i += 1
                 slot = self.probe(server_hash, i) % self.n_slots
-            # insert in sorted ordered server_slots and list of virtual slots
-            bisect.insort(self.server_slots, slot)
-            self.replicas[hostname].append(slot)
-            i = 0
-            while self.server_slots[i] != slot:
-                i += 1
-            i -= 1
-            if i == -1:
-                i = len(self.server_slots) - 1
-            i = (self.server_slots[i]+1) % self.n_slots
-            while i != slot:
-                self.next_server[i] = hostname
-                i = (i+1) % self.n_slots
-            self.next_server[slot] = hostname
+            # insert in sorted ordered server_slots
+            idx = bisect.bisect_left(self.server_slots, slot)
+            self.server_slots.insert(idx, slot)
+            self.setOccupied(slot, True)
+            # the slots after the cyclically previous server now route here
+            prev_slot = self.server_slots[idx - 1]
+            delta.extend((slot_range, self.ownerName(self.next_server[slot]), hostname)
+                         for slot_range in cyclicRanges(prev_slot, slot, self.n_slots))
+            self.setOwner(prev_slot, slot, owner_id)
+
+        return compactDelta(delta)
 
     # remove a server (by hostname)
-    # Time Complexity : O(n_slots * n_virtual)
-    def remove(self, hostname: str):
+    # Time Complexity : O(server slots + n_virtual * log(n_slots)) plus the filled slots
+    def remove(self, hostname: str) -> RingDelta:
         '''
             If server's hostname is not found, cannot remove: raise error
-            Else remove all virtual copies of the server from the slots
+            Else remove all virtual copies of the server from the slots,
+            return the slot ranges that moved away from the server
         '''
-        if hostname not in self.servers.keys():
+        if hostname not in self:
             raise KeyError("Hostname not found")
-        hostid = self.servers[hostname]
-        self.servers.pop(hostname)
+        owner_id = self.server_ids.ids[hostname]
+        self.members.remove(owner_id)
+        self.weights.pop(hostname, None)
+        self.owners = None
 
-        if (len(self.servers) == 0):
-            self.next_server = [None] * self.n_slots
-            self.server_slots = []
-            self.replicas.pop(hostname)
-            return
+        # the slots of the virtual copies are those the server owns itself;
+        # take them all out first, so that none of them
+        # is taken as the next server of another
+        slots = [slot for slot in self.server_slots if self.next_server[slot] == owner_id]
+        for slot in slots:
+            del self.server_slots[bisect.bisect_left(self.server_slots, slot)]
+            self.setOccupied(slot, False)
 
-        for slot in self.replicas[hostname]:
-            i = 0
-            while self.server_slots[i] != slot:
-                i += 1
-            i -= 1
-            if i == -1:
-                i = len(self.server_slots) - 1
-            i = self.server_slots[i]
-            other_hostname = self.next_server[i]
-            i = (i+1) % self.n_slots
-            while i != slot:
-                self.next_server[i] = other_hostname
-                i = (i+1) % self.n_slots
-            self.next_server[slot] = other_hostname
-            self.server_slots.remove(slot)
-
-        self.replicas.pop(hostname)
+        if len(self.server_slots) == 0:
+            self.next_server = array('H', [NO_OWNER]) * self.n_slots
+            self.server_ids.drop(owner_id)
+            return [(range(0, self.n_slots), hostname, None)]
+
+        # the slots of each virtual copy now route to the cyclically next server
+        delta: RingDelta = []
+        for slot in slots:
+            idx = bisect.bisect_left(self.server_slots, slot)
+            next_slot = self.server_slots[idx % len(self.server_slots)]
+            delta.extend((slot_range, hostname, self.ownerName(self.next_server[next_slot]))
+                         for slot_range in cyclicRanges(self.server_slots[idx - 1], slot,
+                                                        self.n_slots))
+            self.setOwner(self.server_slots[idx - 1], slot,
+                          self.next_server[next_slot])
+
+        self.server_ids.drop(owner_id)
+        return compactDelta(delta)
 
     # find the server (by hostname) to which to route the request
     # Time Complexity : O(1)
@@ -135,14 +385,88 @@ class ConsistentHashMap:
             If no server present, cannot map request: raise error
             Else, return the cyclically next server's hostname
         '''
-        request_hash = (self.requestHash(request_id)) % self.n_slots
+        request_hash = self.requestSlot(request_id)
 
         ret = self.next_server[request_hash]
-        if len(self.servers) == 0 or ret is None:
+        if ret == NO_OWNER:
             raise RuntimeError("No servers alive")
 
-        # Here linear probing is necessary since nearest server is required
-        return ret
+        if self.epsilon is not None:
+            return self.findBounded(request_hash)
+
+        # Here linear probing is not necessary since next_server holds the nearest server
+        return self.server_ids.names[ret]
+
+    # walk clockwise from the slot to the first server below capacity
+    # Time Complexity : O(n_virtual * servers) when all nearer servers are full
+    def findBounded(self, request_hash: int) -> str:
+        capacity = self.capacity()
+        names = self.server_ids.names
+        start = bisect.bisect_left(self.server_slots, request_hash)
+        for i in range(len(self.server_slots)):
+            slot = self.server_slots[(start + i) % len(self.server_slots)]
+            hostname = names[self.next_server[slot]]
+            if self.belowCapacity(hostname, capacity):
+                return hostname
+
+        # not reached: some server is always below the average load
+        return names[self.next_server[request_hash]]
+
+    # find the servers (by hostname) to which to route a batch of requests
+    # (bounded loads are not applied, since a batch has no requests in flight)
+    # Time Complexity : O(len(request_ids)), vectorized
+    def find_many(self, request_ids: Iterable[int]) -> list[str]:
+        '''
+            If no server present, cannot map requests: raise error
+            Else, hash all the request ids at once and gather their
+            cyclically next servers from the owner array in one operation
+        '''
+        if len(self.members) == 0:
+            raise RuntimeError("No servers alive")
+
+        request_ids = np.asarray(request_ids, dtype=np.int64)
+        request_hash = self.requestSlotMany(request_ids)
+
+        owners, owner_names = self.ownerArray()
+        return owner_names[owners[request_hash]].tolist()
+
+    # build the owner array from next_server, if outdated
+    # Time Complexity : O(n_slots), a single copy
+    def ownerArray(self) -> tuple[np.ndarray, np.ndarray]:
+        if self.owners is None:
+            self.owners = np.frombuffer(self.next_server, dtype=np.uint16).copy()
+
+        return self.owners, self.server_ids.nameArray()
+
+    # owner (by hostname) of every slot, None if no server
+    # Time Complexity : O(n_slots), vectorized
+    def slotOwners(self) -> np.ndarray:
+        if len(self.members) == 0:
+            return np.full(self.n_slots, None, dtype=object)
+
+        owners, owner_names = self.ownerArray()
+        return owner_names[owners]
+
+    # slot ranges whose owner differs between this ring and another
+    # Time Complexity : O(n_slots), vectorized
+    def diff(self, other: 'ConsistentHashMap') -> RingDelta:
+        '''
+            If the rings have different numbers of slots, cannot compare: raise error
+            Else, return the slot ranges whose owner changes from this ring to the other
+        '''
+        if other.n_slots != self.n_slots:
+            raise ValueError("Rings have different numbers of slots")
+
+        old = self.slotOwners()
+        new = other.slotOwners()
+
+        # runs of slots with the same owners in both rings
+        bounds = (np.flatnonzero((old[1:] != old[:-1]) | (new[1:] != new[:-1])) + 1).tolist()
+        starts = [0] + bounds
+        stops = bounds + [self.n_slots]
+
+        return [(range(start, stop), old[start], new[start])
+                for start, stop in zip(starts, stops) if old[start] != new[start]]
 
     # get list of all hostnames of servers
     def getServerList(self):
@@ -151,3 +475,10 @@ class ConsistentHashMap:
     # get remaining servers, i.e. maximum number of servers that can be added
     def remaining(self):
         return (self.n_slots - len(self.server_slots)) // self.n_virtual
+
+    # memory footprint in bytes
+    def memory(self):
+        # the interned ids are counted once by their owner, not per ring
+        return (sys.getsizeof(self.members) + sys.getsizeof(self.weights) +
+                sys.getsizeof(self.server_slots) + sys.getsizeof(self.occupied) +
+                sys.getsizeof(self.next_server))
@@ -0,0 +1,149 @@
+# offline benchmark suite of the hash functions on the consistent hash ring
+# for every HASH_NUM and 2..64 servers: spread of the load, lookups per second,
+# cost of adding/removing a server and fraction of the keys moved by it
+# run from the service directory: python -m hash.suite [output.json] [--no-timings]
+# the results are plotted by plots/graphs.py
+# apart from the timings, which depend on the machine, the results are deterministic
+
+
+import json
+import random
+import statistics
+import sys
+import time
+
+from .hash_ds import ConsistentHashMap
+from .hash_functions import requestHashList, serverHashList
+
+
+SEED = 42
+SERVERS = list(range(2, 65))
+REQUESTS = 100000
+# number of requests timed with scalar lookups
+TIMED_REQUESTS = 10000
+
+# a ring large enough for 64 servers of 9 virtual copies, with linear probing
+# since quadratic probing may not find the free slots of a crowded ring
+N_SLOTS = 1024
+N_VIRTUAL = 9
+PROBING = 'linear'
+
+# metrics that depend on the machine, left out with --no-timings
+TIMINGS = ['find_per_s', 'find_many_per_s', 'add_ms', 'remove_ms']
+
+
+def newRing(hash_num: int) -> ConsistentHashMap:
+    # uncached, so that the cost of the hash function itself is measured
+    return ConsistentHashMap(request_hash=requestHashList[hash_num],
+                             server_hash=serverHashList[hash_num],
+                             n_slots=N_SLOTS,
+                             n_virtual=N_VIRTUAL,
+                             probing=PROBING,
+                             slot_cache=0)
+
+
+def moved(before: list[str], after: list[str]) -> float:
+    return sum(a != b for a, b in zip(before, after)) / len(before)
+
+
+def measure(hash_num: int, n_servers: int, request_ids: list[int]) -> dict:
+    ring = newRing(hash_num)
+    hostnames = [f'Server-{server_idx + 1}' for server_idx in range(n_servers + 1)]
+    hostids = random.sample(range(100000, 999999), n_servers + 1)
+
+    start = time.perf_counter()
+    for hostname, hostid in zip(hostnames[:n_servers], hostids[:n_servers]):
+        ring.add(hostname, hostid)
+    add_ms = (time.perf_counter() - start) * 1000 / n_servers
+
+    # load of each server
+    start = time.perf_counter()
+    owners = ring.find_many(request_ids)
+    find_many_per_s = len(request_ids) / (time.perf_counter() - start)
+
+    counts = {hostname: 0 for hostname in hostnames[:n_servers]}
+    for hostname in owners:
+        counts[hostname] += 1
+    loads = list(counts.values())
+
+    timed_ids = request_ids[:TIMED_REQUESTS]
+    start = time.perf_counter()
+    for request_id in timed_ids:
+        ring.find(request_id)
+    find_per_s = len(timed_ids) / (time.perf_counter() - start)
+
+    # keys moved by adding one more server, then by removing a random one
+    ring.add(hostnames[n_servers], hostids[n_servers])
+    after_add = ring.find_many(request_ids)
+
+    start = time.perf_counter()
+    ring.remove(random.choice(hostnames[:n_servers + 1]))
+    remove_ms = (time.perf_counter() - start) * 1000
+    after_remove = ring.find_many(request_ids)
+
+    return {
+        'hash_num': hash_num,
+        'servers': n_servers,
+        'loads': loads,
+        'load_std': statistics.pstdev(loads),
+        'load_cv': statistics.pstdev(loads) / statistics.mean(loads),
+        'max_mean': max(loads) / statistics.mean(loads),
+        'find_per_s': find_per_s,
+        'find_many_per_s': find_many_per_s,
+        'add_ms': add_ms,
+        'remove_ms': remove_ms,
+        'moved_add': moved(owners, after_add),
+        'moved_remove': moved(after_add, after_remove),
+    }
+
+
+def runSuite() -> dict:
+    random.seed(SEED)
+
+    # random 6-digit ids, as generated for the requests
+    request_ids = [random.randint(100000, 999999) for _ in range(REQUESTS)]
+
+    results = []
+    for hash_num in range(len(requestHashList)):
+        for n_servers in SERVERS:
+            results.append(measure(hash_num, n_servers, request_ids))
+            print(f'hash {hash_num} servers {n_servers:>2} '
+                  f'max/mean {results[-1]["max_mean"]:.2f}', file=sys.stderr)
+
+    return {
+        'config': {
+            'seed': SEED,
+            'requests': REQUESTS,
+            'timed_requests': TIMED_REQUESTS,
+            'n_slots': N_SLOTS,
+            'n_virtual': N_VIRTUAL,
+            'probing': PROBING,
+            'hash_nums': list(range(len(requestHashList))),
+            'servers': SERVERS,
+        },
+        'results': results,
+    }
+
+
+# one line per configuration, so that reruns diff line by line
+def dumpSuite(suite: dict, timings: bool) -> str:
+    results = [{key: value for key, value in result.items()
+                if timings or key not in TIMINGS}
+               for result in suite['results']]
+
+    return ('{\n "config": ' + json.dumps(suite['config']) + ',\n "results": [\n' +
+            ',\n'.join('  ' + json.dumps(result) for result in results) +
+            '\n ]\n}\n')
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--no-timings']
+    output = args[0] if len(args) > 0 else 'results.json'
+
+    suite = runSuite()
+    with open(output, 'w') as f:
+        f.write(dumpSuite(suite, '--no-timings' not in sys.argv[1:]))
+
+
+if __name__ == '__main__':
+    main()
@@ -59,9 +59,7 @@ async def handle_flatline(
     # END async with docker_semaphore
 
     # Copy shards to the new containers
-    shards = [shard
-              for shard, servers in shard_map.items()
-              if hostname in servers.getServerList()]
+    shards = server_shards.get(hostname, []).copy()
 
     req_semaphore = asyncio.Semaphore(REQUEST_BATCH_SIZE)
 
@@ -161,21 +159,19 @@ async def get_heartbeats():
 
             semaphore = asyncio.Semaphore(REQUEST_BATCH_SIZE)
             # Convert to aiohttp request
-            timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                tasks = [asyncio.create_task(
-                    collect_heartbeat(
-                        semaphore,
-                        session,
-                        server_name
-                    )
-                ) for server_name in hostnames]
-
-                heartbeats = await asyncio.gather(*tasks, return_exceptions=True)
-                heartbeats = [None if isinstance(heartbeat, BaseException)
-                              else heartbeat
-                              for heartbeat in heartbeats]
-            # END async with session
+            session = common.session
+            tasks = [asyncio.create_task(
+                collect_heartbeat(
+                    semaphore,
+                    session,
+                    server_name
+                )
+            ) for server_name in hostnames]
+
+            heartbeats = await asyncio.gather(*tasks, return_exceptions=True)
+            heartbeats = [None if isinstance(heartbeat, BaseException)
+                          else heartbeat
+                          for heartbeat in heartbeats]
 
             # To allow other tasks to run
             await asyncio.sleep(0)
@@ -223,6 +219,10 @@ async def get_heartbeats():
                         ) for serv_name, serv_id in flatlines]
 
                         await asyncio.gather(*tasks, return_exceptions=True)
+
+                    # Publish the new routing table
+                    bump_epoch()
+                    await broadcast_epoch()
             # END async with common.lock(Write)
 
         # END while
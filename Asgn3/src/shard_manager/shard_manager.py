@@ -1,6 +1,7 @@
 from quart import Quart
 
 from endpoints import blueprint as all_blueprints
+from checkpoint import checkpoint_logs
 from heartbeat_flatline import get_heartbeats
 from utils import *
 
@@ -12,7 +13,7 @@ async def my_startup():
     """
     Startup function to be run before the app starts.
 
-    Start heartbeat background task.
+    Start heartbeat and log checkpoint background tasks.
     """
 
     try:
@@ -22,6 +23,9 @@ async def my_startup():
         # Register the heartbeat background task
         app.add_background_task(get_heartbeats)
 
+        # Register the log checkpoint background task
+        app.add_background_task(checkpoint_logs)
+
         common.pool = asyncpg.create_pool(
             user=DB_USER,
             password=DB_PASSWORD,
@@ -32,6 +36,9 @@ async def my_startup():
 
         await common.pool
 
+        # Shared http session with keep-alive connections
+        common.session = create_session()
+
         if DEBUG:
             print(f'{Fore.LIGHTYELLOW_EX}CONNECT | '
                   f'Connected to the database'
@@ -60,14 +67,15 @@ async def my_shutdown():
     """
     Shutdown function to be run after the app stops.
 
-    1. Stop the heartbeat background task.
+    1. Stop the heartbeat and log checkpoint background tasks.
     2. Stop all server replicas.
     """
 
     global replicas
 
-    # Stop the heartbeat background task
-    app.background_tasks.pop().cancel()
+    # Stop the heartbeat and log checkpoint background tasks
+    while len(app.background_tasks) > 0:
+        app.background_tasks.pop().cancel()
 
     # Stop all server replicas
     semaphore = asyncio.Semaphore(DOCKER_TASK_BATCH_SIZE)
@@ -92,6 +100,8 @@ async def my_shutdown():
                           f'Deleted container for {server_name}'
                           f'{Style.RESET_ALL}',
                           file=sys.stderr)
+
+                await delete_volume(docker, serv_ids[server_name], server_name)
             # END async with semaphore
         except Exception as e:
             if DEBUG:
@@ -115,6 +125,9 @@ async def my_shutdown():
 
     # close the pool
     await common.pool.close()
+
+    # close the shared http session
+    await common.session.close()
 # END my_shutdown
 
 
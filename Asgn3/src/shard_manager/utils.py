@@ -48,6 +48,7 @@ def get_container_config(
         'env': [
             f'SERVER_ID={serv_id:06}',
             f'DEBUG={str(DEBUG).lower()}',
+            f'WRITE_CONCERN={WRITE_CONCERN}',
             'POSTGRES_HOST=localhost',
             'POSTGRES_PORT=5432',
             'POSTGRES_USER=postgres',
@@ -56,9 +57,48 @@ def get_container_config(
         ],
         'hostname': hostname,
         'tty': True,
+        'HostConfig': {
+            # keep the database across respawns of the server
+            'Binds': [f'{get_volume_name(serv_id, hostname)}:/var/lib/postgresql/data'],
+        },
     }
 
 
+def get_volume_name(
+    serv_id: int,
+    hostname: str
+):
+    """
+    Get the name of the data volume of the server replica.
+
+    The volume is named by server id too, so that a new server
+    with the hostname of a deleted one starts empty.
+    """
+
+    return f'{hostname}-{serv_id:06}-data'
+# END get_volume_name
+
+
+async def delete_volume(
+    docker: Docker,
+    serv_id: int,
+    hostname: str
+):
+    """
+    Delete the data volume of a deleted server replica.
+    """
+
+    volume = await docker.volumes.get(get_volume_name(serv_id, hostname))
+    await volume.delete()
+
+    if DEBUG:
+        print(f'{Fore.LIGHTYELLOW_EX}REMOVE | '
+              f'Deleted data volume of {hostname}'
+              f'{Style.RESET_ALL}',
+              file=sys.stderr)
+# END delete_volume
+
+
 def get_new_server_id():
     """
     Get a new server id.
@@ -84,3 +124,268 @@ def get_request_id():
 
     return random.randint(100000, 999999)
 # END get_request_id
+
+
+def get_weights(
+    payload: Dict,
+    hostnames: List[str]
+):
+    """
+    Get the capacity weights of the new servers from the payload.
+
+    Servers missing from `weights` get weight 1.
+    """
+
+    weights: Dict[str, float] = {
+        hostname: float(weight)
+        for hostname, weight in dict(payload.get('weights', {})).items()
+    }
+
+    unknown = set(weights.keys()) - set(hostnames)
+    if len(unknown) > 0:
+        raise Exception(f'Weights given for unknown servers `{unknown}`')
+
+    if any(weight <= 0 for weight in weights.values()):
+        raise Exception('Weights must be positive')
+
+    return {hostname: weights.get(hostname, 1.0) for hostname in hostnames}
+# END get_weights
+
+
+def check_shard_slots(
+    servers: Dict[str, List[str]],
+    weights: Dict[str, float]
+):
+    """
+    Check if the shards have the slots for their new servers.
+
+    A server of weight `w` takes at most the slots of `ceil(w)` servers of weight 1.
+    """
+
+    global shard_map
+
+    needed: Dict[str, int] = {}
+    for hostname, shards in servers.items():
+        for shard in shards:
+            needed[shard] = needed.get(shard, 0) + math.ceil(weights[hostname])
+    # END for hostname, shards in servers.items()
+
+    for shard, n_needed in needed.items():
+        remaining = (shard_map[shard] if shard in shard_map
+                     else newRouter()).remaining()
+
+        if n_needed > remaining:
+            raise Exception(
+                f'Insufficient slots in shard `{shard}`. Only {remaining} slots left')
+    # END for shard, n_needed in needed.items()
+# END check_shard_slots
+
+
+def record_moved(
+    moved: Dict[str, float],
+    shard: str,
+    delta: Optional[RingDelta]
+):
+    """
+    Add the fraction of the ring of `shard` moved by a change to `moved`.
+
+    Nothing is recorded for the routers which do not report moved ranges.
+    """
+
+    if delta is None:
+        return
+
+    n_moved = sum(len(slot_range) for slot_range, _, _ in delta)
+    moved[shard] = moved.get(shard, 0) + n_moved / shard_map[shard].n_slots
+# END record_moved
+
+
+def log_moved(
+    moved: Dict[str, float]
+):
+    """
+    Log how much of the ring of each shard a topology change moved.
+    """
+
+    if DEBUG:
+        for shard, fraction in sorted(moved.items()):
+            print(f'{Fore.CYAN}REROUTE | '
+                  f'{fraction:.1%} of the ring of {shard} moved'
+                  f'{Style.RESET_ALL}',
+                  file=sys.stderr)
+        # END for shard, fraction in sorted(moved.items())
+# END log_moved
+
+
+def bump_epoch():
+    """
+    Bump the routing epoch after a change to `shard_map` or `shard_primary`.
+
+    Must be called with `common.lock(Write)` held.
+    """
+
+    common.epoch += 1
+
+    return common.epoch
+# END bump_epoch
+
+
+async def broadcast_epoch():
+    """
+    Push the current routing epoch to all the server replicas.
+
+    Servers reject requests routed with an older epoch, which makes the
+    load balancer refresh its local copy of the routing table.
+    """
+
+    # Allow other tasks to run
+    await asyncio.sleep(0)
+
+    semaphore = asyncio.Semaphore(REQUEST_BATCH_SIZE)
+
+    async def post_epoch_wrapper(
+        session: aiohttp.ClientSession,
+        hostname: str,
+        epoch: int
+    ):
+        # Allow other tasks to run
+        await asyncio.sleep(0)
+
+        async with semaphore:
+            async with session.post(f'http://{hostname}:5000/epoch',
+                                    json={'epoch': epoch}) as response:
+                await response.read()
+
+            return response
+        # END async with semaphore
+    # END post_epoch_wrapper
+
+    session = common.session
+    tasks = [asyncio.create_task(
+        post_epoch_wrapper(
+            session,
+            hostname,
+            common.epoch
+        )
+    ) for hostname in replicas.getServerList()]
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+# END broadcast_epoch
+
+
+# Connection counts of the shared http session, kept by its trace hooks [see `create_session`]
+session_counts: Dict[str, int] = {
+    'acquired': 0,
+    'queued': 0,
+    'created': 0,
+    'reused': 0,
+}
+
+
+def create_trace_config():
+    """
+    Count the connections of the shared http session with the tracing hooks of aiohttp.
+
+    `acquired` and `queued` are the connections held by requests and the requests
+    waiting for a free connection of the pool, until the request ends [for a streamed
+    response, once its headers are received]. `created` and `reused` are totals.
+    """
+
+    async def on_connection_queued_start(session: aiohttp.ClientSession,
+                                         ctx: Any, params: Any):
+        ctx.queued = True
+        session_counts['queued'] += 1
+
+    async def on_connection_queued_end(session: aiohttp.ClientSession,
+                                       ctx: Any, params: Any):
+        ctx.queued = False
+        session_counts['queued'] -= 1
+
+    async def on_connection_acquired(session: aiohttp.ClientSession,
+                                     ctx: Any, params: Any):
+        # a redirect acquires another connection for the same request
+        if not getattr(ctx, 'acquired', False):
+            session_counts['acquired'] += 1
+        ctx.acquired = True
+
+    async def on_connection_create_end(session: aiohttp.ClientSession,
+                                       ctx: Any, params: Any):
+        session_counts['created'] += 1
+        await on_connection_acquired(session, ctx, params)
+
+    async def on_connection_reuseconn(session: aiohttp.ClientSession,
+                                      ctx: Any, params: Any):
+        session_counts['reused'] += 1
+        await on_connection_acquired(session, ctx, params)
+
+    async def on_request_done(session: aiohttp.ClientSession,
+                              ctx: Any, params: Any):
+        # a request cancelled while queued never gets `queued_end`
+        if getattr(ctx, 'queued', False):
+            session_counts['queued'] -= 1
+        if getattr(ctx, 'acquired', False):
+            session_counts['acquired'] -= 1
+        ctx.queued = ctx.acquired = False
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_queued_start.append(on_connection_queued_start)
+    trace_config.on_connection_queued_end.append(on_connection_queued_end)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_request_end.append(on_request_done)
+    trace_config.on_request_exception.append(on_request_done)
+
+    return trace_config
+# END create_trace_config
+
+
+def create_session():
+    """
+    Create the http session shared by all the requests of this process.
+
+    Connections are kept alive and reused, and hostnames are resolved
+    once per `DNS_CACHE_TTL` seconds.
+    """
+
+    connector = aiohttp.TCPConnector(
+        limit=SESSION_LIMIT,
+        limit_per_host=SESSION_LIMIT_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+
+    return aiohttp.ClientSession(
+        connector=connector,
+        # bounds the tcp connect only, not the wait for a free connection of the pool
+        timeout=aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT),
+        trace_configs=[create_trace_config()],
+    )
+# END create_session
+
+
+def session_stats():
+    """
+    Get the connection stats of the shared http session.
+
+    Idle connections are not counted: aiohttp has no public hook for
+    a connection closed by the keep-alive timeout.
+    """
+
+    connector = common.session.connector
+
+    if connector is None:
+        return {
+            'limit': SESSION_LIMIT,
+            'limit_per_host': SESSION_LIMIT_PER_HOST,
+            'closed': True,
+            **session_counts,
+        }
+
+    return {
+        'limit': connector.limit,
+        'limit_per_host': connector.limit_per_host,
+        'closed': connector.closed,
+        **session_counts,
+    }
+# END session_stats